@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import re
+import resource
+
+from core.timing import Timings
+
+try:
+    import asyncssh
+except ImportError:  # optional, only needed by the asyncio runner
+    asyncssh = None
+
+logger = logging.getLogger(__name__)
+
+PROMPT_RE = re.compile(r"^[\w.\-@()/:]+[>#]\s*$")
+# \Z, not $: once answered, the echoed newline must stop the match
+CONFIRM_RE = re.compile(r"(\[confirm\]|\]\?)[ \t]*\Z")
+ASYNCSSH_MISSING = "The asyncio runner requires asyncssh (pip install asyncssh)"
+
+
+def raise_open_file_limit(needed):
+    """Raise the soft RLIMIT_NOFILE towards ``needed``, up to the hard limit."""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft >= needed:
+        return soft
+    target = needed if hard == resource.RLIM_INFINITY else min(needed, hard)
+    try:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+    except (ValueError, OSError) as e:
+        logger.warning(f"Could not raise the open file limit to {target}: {e}")
+        return soft
+    return target
+
+
+class AsyncSSHSession:
+    """Interactive CLI session on a Cisco-style device over asyncssh.
+
+    Talks to the device the way Netmiko does for ``cisco_ios``: it learns the
+    prompt, disables paging, enters enable mode when a secret is given and
+    reads each command's output up to the next prompt. Confirmation prompts
+    such as ``Destination filename [startup-config]?`` are accepted with
+    Enter. Used as a context manager the session connects on the first
+    command, so tasks answered from the result cache never connect.
+    """
+
+    def __init__(
+        self,
+        hostname,
+        port=22,
+        username=None,
+        password=None,
+        secret="",
+        connect_timeout=30,
+        read_timeout=120,
+        name=None,
+    ):
+        self.name = name or hostname
+        self.hostname = hostname
+        self.port = port or 22
+        self.username = username
+        self.password = password
+        self.secret = secret
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.prompt = None
+        self.timings = Timings()
+        self._conn = None
+        self._process = None
+        self._buffer = ""
+
+    @classmethod
+    def from_host(cls, host, connect_timeout=30, read_timeout=120):
+        """Build a session from a Nornir host's netmiko connection options."""
+        params = host.get_connection_parameters("netmiko")
+        extras = params.extras or {}
+        return cls(
+            params.hostname,
+            port=params.port,
+            username=params.username,
+            password=params.password,
+            secret=extras.get("secret", ""),
+            connect_timeout=extras.get("conn_timeout", connect_timeout),
+            read_timeout=extras.get("timeout", read_timeout),
+            name=host.name,
+        )
+
+    async def open(self):
+        if asyncssh is None:
+            raise RuntimeError(ASYNCSSH_MISSING)
+        self._conn = await asyncio.wait_for(
+            asyncssh.connect(
+                self.hostname,
+                port=self.port,
+                username=self.username,
+                password=self.password,
+                known_hosts=None,
+            ),
+            self.connect_timeout,
+        )
+        self._process = await self._conn.create_process(term_type="vt100")
+        await self._read_until(self._at_prompt)
+
+        if self.prompt.endswith(">") and self.secret:
+            self._process.stdin.write("enable\n")
+            await self._read_until(lambda text: text.rstrip().endswith(":"))
+            self._process.stdin.write(self.secret + "\n")
+            self.prompt = None
+            await self._read_until(self._at_prompt)
+        await self._send("terminal length 0")
+        return self
+
+    @property
+    def connected(self):
+        return self._process is not None
+
+    async def send_command(self, command, read_timeout=None):
+        """Run ``command`` and return its output without the echo and prompt."""
+        if self._process is None:
+            await self.open()
+        return await self._send(command, read_timeout)
+
+    async def _send(self, command, read_timeout=None):
+        # Only accept a prompt that follows the echoed command, so a stray
+        # prompt left in the stream can't end the read early.
+        echo = command.strip()[:40]
+        self._process.stdin.write(command + "\n")
+        output = await self._read_until(
+            lambda text: echo in text and self._at_prompt(text), read_timeout
+        )
+        start = output.find(echo)
+        output = output[output.find("\n", start) + 1 :] if "\n" in output else ""
+        return output.rsplit("\n", 1)[0] if "\n" in output else ""
+
+    async def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            try:
+                await asyncio.wait_for(self._conn.wait_closed(), 5)
+            except (asyncio.TimeoutError, OSError):
+                pass
+            self._conn = None
+            self._process = None
+
+    def _at_prompt(self, text):
+        last_line = text.rstrip("\n").rsplit("\n", 1)[-1].strip()
+        if self.prompt is not None:
+            return last_line == self.prompt
+        if PROMPT_RE.match(last_line):
+            self.prompt = last_line
+            return True
+        return False
+
+    async def _read_until(self, done, read_timeout=None):
+        async def read():
+            while True:
+                chunk = await self._process.stdout.read(65536)
+                if not chunk:
+                    raise ConnectionError(f"{self.hostname} closed the session")
+                self._buffer += chunk.replace("\r\n", "\n").replace("\r", "")
+                if done(self._buffer):
+                    text, self._buffer = self._buffer, ""
+                    return text
+                if CONFIRM_RE.search(self._buffer):
+                    self._process.stdin.write("\n")
+
+        return await asyncio.wait_for(read(), read_timeout or self.read_timeout)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
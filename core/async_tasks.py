@@ -0,0 +1,80 @@
+# Async counterparts of core.tasks for the asyncio runner. Each coroutine gets
+# an AsyncSSHSession plus the task's parameters and returns the output. The
+# session connects on its first command, so a result cache hit never opens one.
+# A multi-line custom command returns a tasks.CommandBatch. Phases are timed
+# into the session's Timings, which the runner puts on the host's Result.
+
+import time
+
+from core import tasks
+from core.result_cache import get_result_cache, is_read_only
+from core.timing import Timings
+
+
+async def send_command(session, command, use_cache=True, timings=None):
+    """Async version of core.tasks.send_command."""
+    cache = get_result_cache()
+    timings = timings if timings is not None else session.timings
+
+    async def run():
+        if not session.connected:
+            with timings.measure("connect"):
+                await session.open()
+        with timings.measure("command"):
+            return await session.send_command(command)
+
+    if cache is None:
+        return await run()
+    if not is_read_only(command):
+        try:
+            return await run()
+        finally:
+            cache.invalidate_host(session.name)
+    return await cache.aget_or_run(session.name, command, run, bypass=not use_cache)
+
+
+async def show_ip(session, use_cache=True):
+    return await send_command(session, tasks.TASK_COMMANDS["show_ip"], use_cache)
+
+
+async def save_config(session, use_cache=True):
+    return await send_command(session, tasks.TASK_COMMANDS["save_config"])
+
+
+async def backup_config(session, use_cache=True):
+    return await send_command(session, tasks.TASK_COMMANDS["backup_config"], use_cache)
+
+
+async def run_custom_command(session, command, use_cache=True, stop_on_error=False):
+    commands = tasks.split_commands(command)
+    if len(commands) <= 1:
+        return await send_command(
+            session, commands[0] if commands else command, use_cache
+        )
+
+    # Same rules as core.tasks.run_command_batch
+    batch = tasks.CommandBatch()
+    for i, command in enumerate(commands):
+        timings = Timings()
+        started = time.monotonic()
+        try:
+            output = await send_command(session, command, use_cache, timings)
+        except Exception as e:
+            error = str(e) or e.__class__.__name__
+            batch.add(command, error, True, time.monotonic() - started, timings)
+            batch.skip(commands[i + 1 :])
+            break
+        failed = tasks.rejected(output)
+        batch.add(command, output, failed, time.monotonic() - started, timings)
+        if failed and stop_on_error:
+            batch.skip(commands[i + 1 :])
+            break
+    return batch
+
+
+ASYNC_TASKS = {
+    tasks.show_ip: show_ip,
+    tasks.save_config: save_config,
+    tasks.backup_config: backup_config,
+    tasks.run_custom_command: run_custom_command,
+}
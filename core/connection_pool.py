@@ -0,0 +1,267 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from nornir_netmiko.connections import Netmiko
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SETTINGS = {
+    "enabled": True,
+    "max_size": 200,
+    "max_in_use": 500,
+    "checkout_timeout": 300,
+    "idle_timeout": 300,
+    "health_check": True,
+}
+
+
+class PoolExhausted(Exception):
+    """No session could be checked out before the checkout timeout."""
+
+
+def get_pool_settings():
+    return {**DEFAULT_POOL_SETTINGS, **getattr(settings, "NETMIKO_POOL", {})}
+
+
+class ConnectionPool:
+    """Thread-safe pool of idle Netmiko sessions keyed by host.
+
+    A connection is owned by exactly one caller between ``checkout`` and
+    ``checkin``. Idle connections are probed for a prompt before being handed
+    out, closed once they have been idle longer than ``idle_timeout`` and the
+    least recently used ones are closed when more than ``max_size`` are idle.
+    At most ``max_in_use`` sessions are checked out at once; further callers
+    wait up to ``checkout_timeout`` seconds for one to be returned.
+    """
+
+    def __init__(
+        self,
+        max_size=200,
+        idle_timeout=300,
+        health_check=True,
+        max_in_use=500,
+        checkout_timeout=300,
+    ):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check = health_check
+        self.max_in_use = max_in_use
+        self.checkout_timeout = checkout_timeout
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+        # (key, id(connection)) -> (key, connection, last_used), oldest first
+        self._idle = OrderedDict()
+        self._in_use = 0
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "probe_failures": 0,
+            "expired": 0,
+            "evicted": 0,
+            "waits": 0,
+        }
+
+    def _take_idle(self, key):
+        with self._lock:
+            for idle_key in reversed(self._idle):
+                if idle_key[0] == key:
+                    _, connection, last_used = self._idle.pop(idle_key)
+                    return connection, last_used
+        return None, None
+
+    def _is_healthy(self, connection):
+        if not self.health_check:
+            return True
+        try:
+            connection.find_prompt()
+            return True
+        except Exception as e:
+            logger.info(f"Pooled connection to {connection.host} failed probe: {e}")
+            return False
+
+    def _reserve(self):
+        # Holds a slot for the caller until checkin or discard gives it back
+        with self._lock:
+            if self._in_use >= self.max_in_use:
+                self._stats["waits"] += 1
+                if not self._released.wait_for(
+                    lambda: self._in_use < self.max_in_use, self.checkout_timeout
+                ):
+                    raise PoolExhausted(
+                        f"All {self.max_in_use} sessions stayed in use for "
+                        f"{self.checkout_timeout}s"
+                    )
+            self._in_use += 1
+
+    def _release(self):
+        # Called with the lock held
+        self._in_use -= 1
+        self._released.notify()
+
+    def checkout(self, key, connect):
+        """Return an idle healthy connection for ``key`` or open one with ``connect``.
+
+        Waits while ``max_in_use`` sessions are checked out.
+        """
+        self._reserve()
+        try:
+            while True:
+                connection, last_used = self._take_idle(key)
+                if connection is None:
+                    break
+
+                if time.monotonic() - last_used > self.idle_timeout:
+                    self._count("expired")
+                    self._disconnect(connection)
+                elif self._is_healthy(connection):
+                    self._count("hits")
+                    return connection
+                else:
+                    self._count("probe_failures")
+                    self._disconnect(connection)
+
+            connection = connect()
+        except BaseException:
+            with self._lock:
+                self._release()
+            raise
+        self._count("misses")
+        return connection
+
+    def checkin(self, key, connection):
+        """Return a connection to the pool once the caller is done with it."""
+        with self._lock:
+            self._release()
+            self._idle[(key, id(connection))] = (key, connection, time.monotonic())
+            overflow = []
+            while len(self._idle) > self.max_size:
+                overflow.append(self._idle.popitem(last=False)[1][1])
+            self._stats["evicted"] += len(overflow)
+
+        for stale in overflow:
+            self._disconnect(stale)
+        self.reap()
+
+    def discard(self, connection):
+        """Close a checked-out connection instead of returning it to the pool."""
+        with self._lock:
+            self._release()
+        self._disconnect(connection)
+
+    def reap(self):
+        """Close connections that have been idle longer than ``idle_timeout``."""
+        deadline = time.monotonic() - self.idle_timeout
+        with self._lock:
+            expired = [
+                idle_key
+                for idle_key, (_, _, last_used) in self._idle.items()
+                if last_used < deadline
+            ]
+            connections = [self._idle.pop(idle_key)[1] for idle_key in expired]
+            self._stats["expired"] += len(connections)
+
+        for connection in connections:
+            self._disconnect(connection)
+
+    def close_all(self):
+        with self._lock:
+            connections = [connection for _, connection, _ in self._idle.values()]
+            self._idle.clear()
+        for connection in connections:
+            self._disconnect(connection)
+
+    def stats(self):
+        with self._lock:
+            requests = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "hit_rate": (
+                    round(self._stats["hits"] / requests, 3) if requests else 0.0
+                ),
+            }
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _disconnect(self, connection):
+        try:
+            connection.disconnect()
+        except Exception as e:
+            logger.debug(f"Error closing pooled connection: {e}")
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_connection_pool():
+    """Return the process-wide connection pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            options = get_pool_settings()
+            _pool = ConnectionPool(
+                max_size=options["max_size"],
+                idle_timeout=options["idle_timeout"],
+                health_check=options["health_check"],
+                max_in_use=options["max_in_use"],
+                checkout_timeout=options["checkout_timeout"],
+            )
+        return _pool
+
+
+class PooledNetmiko(Netmiko):
+    """Netmiko connection plugin that borrows sessions from the connection pool.
+
+    ``close`` hands the session back to the pool instead of disconnecting, so
+    the next task or request against the same host skips the SSH handshake.
+    """
+
+    def open(
+        self,
+        hostname,
+        username,
+        password,
+        port,
+        platform,
+        extras=None,
+        configuration=None,
+    ):
+        self.pool = get_connection_pool()
+        self.key = (hostname, port, username, platform)
+
+        def connect():
+            super(PooledNetmiko, self).open(
+                hostname,
+                username,
+                password,
+                port,
+                platform,
+                extras=extras,
+                configuration=configuration,
+            )
+            return self.connection
+
+        self.connection = self.pool.checkout(self.key, connect)
+
+    def close(self):
+        if self.connection.is_alive():
+            self.pool.checkin(self.key, self.connection)
+        else:
+            self.pool.discard(self.connection)
+
+
+def release_connection(host):
+    """Hand ``host``'s pooled Netmiko session back to the pool, if it has one.
+
+    Called as each host's task finishes, so a run holds only the sessions
+    of the hosts still running instead of one per host until it ends.
+    """
+    if isinstance(host.connections.get("netmiko"), PooledNetmiko):
+        host.close_connection("netmiko")
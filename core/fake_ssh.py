@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import random
+
+import yaml
+
+try:
+    import asyncssh
+except ImportError:  # optional, only needed to run the fake devices
+    asyncssh = None
+
+logger = logging.getLogger(__name__)
+
+FAKE_USERNAME = "admin"
+FAKE_PASSWORD = "admin"
+
+
+class FakeDevice:
+    """Canned Cisco IOS CLI served by :func:`serve_fake_devices`.
+
+    ``latency`` seconds are added before every reply, ``interfaces`` sets the
+    size of ``show ip interface brief`` and ``show running-config``, and a
+    ``failure_rate`` share of logins is rejected.
+    """
+
+    def __init__(self, name, latency=0.0, interfaces=4, failure_rate=0.0):
+        self.name = name
+        self.latency = latency
+        self.interfaces = interfaces
+        self.failure_rate = failure_rate
+
+    @property
+    def prompt(self):
+        return f"{self.name}#"
+
+    def show_ip_interface_brief(self):
+        lines = [
+            "Interface              IP-Address      OK? Method Status"
+            "                Protocol"
+        ]
+        for i in range(self.interfaces):
+            lines.append(
+                f"{f'GigabitEthernet0/{i}':<22} {f'10.{i // 250}.{i % 250}.1':<15} "
+                f"YES NVRAM  {'up':<21} up"
+            )
+        return "\n".join(lines)
+
+    def running_config(self):
+        lines = [
+            "Building configuration...",
+            "",
+            "Current configuration : 1024 bytes",
+            "!",
+            "version 15.2",
+            f"hostname {self.name}",
+            "!",
+        ]
+        for i in range(self.interfaces):
+            lines += [
+                f"interface GigabitEthernet0/{i}",
+                f" ip address 10.{i // 250}.{i % 250}.1 255.255.255.0",
+                " no shutdown",
+                "!",
+            ]
+        lines += ["line vty 0 4", " login local", "!", "end"]
+        return "\n".join(lines)
+
+    async def handle(self, process):
+        process.stdout.write(self.prompt)
+        try:
+            async for line in process.stdin:
+                command = line.strip()
+                if command in ("exit", "quit", "logout"):
+                    break
+                if self.latency and command:
+                    await asyncio.sleep(self.latency)
+                if not command:
+                    # Like IOS, an empty line redraws the prompt on a new line.
+                    # Without it netmiko can read several prompts as one.
+                    process.stdout.write("\r\n")
+                elif command == "copy running-config startup-config":
+                    process.stdout.write("Destination filename [startup-config]? ")
+                    await process.stdin.readline()
+                    self.write(process, "Building configuration...\n[OK]")
+                else:
+                    self.write(process, self.reply(command))
+                process.stdout.write(self.prompt)
+        except (asyncssh.BreakReceived, asyncssh.TerminalSizeChanged):
+            pass
+        except (asyncssh.Error, OSError) as e:
+            logger.debug(f"Fake device {self.name} session ended: {e}")
+        process.exit(0)
+
+    def reply(self, command):
+        if not command or command.startswith(("terminal ", "enable")):
+            return ""
+        if command.startswith("show ip int"):
+            return self.show_ip_interface_brief()
+        if command.startswith("show run"):
+            return self.running_config()
+        if command.startswith("show ver"):
+            return f"Cisco IOS Software, fake device {self.name}\n{self.name} uptime is 1 day"
+        return "% Invalid input detected at '^' marker."
+
+    def write(self, process, text):
+        if text:
+            process.stdout.write(text.replace("\n", "\r\n") + "\r\n")
+
+
+class _FakeServer(asyncssh.SSHServer if asyncssh else object):
+    def __init__(self, device):
+        self.device = device
+
+    def begin_auth(self, username):
+        return True
+
+    def password_auth_supported(self):
+        return True
+
+    def validate_password(self, username, password):
+        if random.random() < self.device.failure_rate:
+            return False
+        return username == FAKE_USERNAME and password == FAKE_PASSWORD
+
+
+async def serve_fake_devices(devices, listen="127.0.0.1", base_port=10022):
+    """Serve each device on its own port from ``base_port`` and return the servers."""
+    if asyncssh is None:
+        raise RuntimeError("The fake devices require asyncssh (pip install asyncssh)")
+    host_key = asyncssh.generate_private_key("ssh-ed25519")
+    servers = []
+    for port, device in enumerate(devices, start=base_port):
+        servers.append(
+            await asyncssh.listen(
+                listen,
+                port,
+                server_factory=lambda device=device: _FakeServer(device),
+                server_host_keys=[host_key],
+                process_factory=device.handle,
+                encoding="utf-8",
+            )
+        )
+    return servers
+
+
+def fake_inventory(devices, listen="127.0.0.1", base_port=10022):
+    """Return a SimpleInventory hosts dict pointing at the fake devices."""
+    return {
+        device.name: {
+            "hostname": listen,
+            "port": port,
+            "username": FAKE_USERNAME,
+            "password": FAKE_PASSWORD,
+            "platform": "ios",
+            "groups": ["ios"],
+        }
+        for port, device in enumerate(devices, start=base_port)
+    }
+
+
+def write_fake_inventory(path, devices, listen="127.0.0.1", base_port=10022):
+    with open(path, "w") as f:
+        yaml.safe_dump(fake_inventory(devices, listen, base_port), f, sort_keys=False)
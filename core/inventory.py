@@ -0,0 +1,105 @@
+import logging
+import pathlib
+
+import yaml
+from django.core.exceptions import ValidationError
+from nornir.core.inventory import Group, Groups, Host, Hosts, Inventory, ParentGroups
+from nornir.plugins.inventory.simple import _get_defaults, _get_inventory_element
+
+from network.models import NetworkDevice
+
+logger = logging.getLogger(__name__)
+
+LOOKUP_CHUNK_SIZE = 500
+DEVICE_FIELDS = ("id", "name", "hostname", "port", "platform", "username", "password")
+DATA_FIELDS = ("site", "role", "tags")  # exposed to tasks as host data
+
+
+def load_groups(group_file, defaults):
+    """Load Nornir groups from a SimpleInventory-style group file, if it exists."""
+    groups = Groups()
+    path = pathlib.Path(group_file)
+    if not path.exists():
+        return groups
+    with open(path) as f:
+        raw_groups = yaml.load(f, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+    for name, data in (raw_groups or {}).items():
+        groups[name] = _get_inventory_element(Group, data or {}, name, defaults)
+    for group in groups.values():
+        group.groups = ParentGroups([groups[name] for name in group.groups or []])
+    return groups
+
+
+def device_host(device, groups, defaults):
+    """Build the Nornir Host of a NetworkDevice."""
+    parents = []
+    for name in device.groups:
+        if name in groups:
+            parents.append(groups[name])
+        else:
+            logger.warning(f"Device {device.name} is in unknown group {name}")
+    return Host(
+        name=device.name,
+        hostname=device.hostname,
+        port=device.port,
+        username=device.username,
+        password=device.password,
+        # Blank platforms fall back to the groups and the inventory defaults
+        platform=device.platform or None,
+        groups=ParentGroups(parents),
+        data={field: getattr(device, field) for field in DATA_FIELDS},
+        defaults=defaults,
+    )
+
+
+def load_hosts(names, groups, defaults):
+    """Build Hosts for the devices in ``names``, or for every device.
+
+    Named devices are fetched by name in chunks, so selecting a handful of
+    devices never loads the rest of the table. If several rows share a
+    name the oldest one is used. Devices with malformed groups or tags are
+    logged and left out.
+    """
+    hosts = Hosts()
+    if names is None:
+        querysets = [NetworkDevice.objects.all()]
+    else:
+        names = list(dict.fromkeys(names))
+        querysets = [
+            NetworkDevice.objects.filter(name__in=names[i : i + LOOKUP_CHUNK_SIZE])
+            for i in range(0, len(names), LOOKUP_CHUNK_SIZE)
+        ]
+    for queryset in querysets:
+        devices = queryset.only(*DEVICE_FIELDS, *DATA_FIELDS, "groups").order_by("id")
+        for device in devices.iterator(chunk_size=2000):
+            if device.name in hosts:
+                continue
+            try:
+                device.clean()
+            except ValidationError as e:
+                # Rows saved around the form or sync_devices; skip, don't fail
+                logger.error(f"Skipping device {device.name}: {' '.join(e.messages)}")
+                continue
+            hosts[device.name] = device_host(device, groups, defaults)
+    return hosts
+
+
+class DjangoInventory:
+    """Nornir inventory plugin that builds hosts from NetworkDevice rows.
+
+    Groups are read from ``group_file`` like SimpleInventory does, and each
+    device's ``groups`` field names its parent groups. ``defaults`` holds
+    inventory-wide values such as the platform of devices that don't set
+    one. With ``names`` only those devices are loaded.
+    """
+
+    def __init__(self, names=None, group_file="groups.yaml", defaults=None):
+        self.names = names
+        self.group_file = group_file
+        self.defaults = defaults or {}
+
+    def load(self):
+        defaults = _get_defaults(self.defaults)
+        groups = load_groups(self.group_file, defaults)
+        hosts = load_hosts(self.names, groups, defaults)
+        return Inventory(hosts=hosts, groups=groups, defaults=defaults)
@@ -1,47 +1,98 @@
 import logging
 from pathlib import Path
 import os
-import yaml
+import threading
+import time
+from django.conf import settings
 from nornir import InitNornir
-from nornir.core.inventory import Defaults, Host, Inventory
+from nornir.core import Nornir
+from nornir.core.inventory import Hosts, Inventory
+from nornir.core.plugins.inventory import InventoryPluginRegister
 from nornir.core.plugins.connections import ConnectionPluginRegister
+from nornir.core.plugins.runners import RunnersPluginRegister
+from nornir.core.state import GlobalState
 from nornir_netmiko.connections import Netmiko
 
+from core.connection_pool import PooledNetmiko, get_pool_settings
+from core.inventory import DjangoInventory, load_hosts
+from core.runners import AdaptiveRunner, AsyncioRunner, runner_config
+from network.counters import bump_counter, counter_value
+from network.models import NetworkDevice
+
 logger = logging.getLogger(__name__)
 
+# Get the base directory of the project
+BASE_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_INVENTORY_SETTINGS = {
+    "plugin": "SimpleInventory",
+    "host_file": BASE_DIR / "hosts.yaml",
+    "group_file": BASE_DIR / "groups.yaml",
+    "defaults": {},
+}
+INVENTORY_COUNTER = "inventory"  # ChangeCounter bumped on device changes
 
-def load_inventory_from_yaml(file_path="hosts.yaml"):
-    with open(file_path) as f:
-        raw_inventory = yaml.safe_load(f)
-
-    hosts = {
-        name: Host(
-            name=name,
-            hostname=data["hostname"],
-            platform=data["platform"],
-            username=data["username"],
-            password=data["password"],
-            connection_options={
-                "netmiko": {
-                    "extras": {
-                        "secret": data.get("enable_password", ""),
-                    }
-                }
-            },
-        )
-        for name, data in raw_inventory.items()
-    }
+_nornir_lock = threading.Lock()
+_nornir_cache = {"key": None, "nornir": None, "loaded_at": None}
+_base_cache = {"key": None, "nornir": None}
+NORNIR_CACHE_STATS = {"hits": 0, "misses": 0, "reloads": 0}
+
+
+def get_inventory_settings():
+    """Return NORNIR_INVENTORY merged over the defaults."""
+    return {**DEFAULT_INVENTORY_SETTINGS, **getattr(settings, "NORNIR_INVENTORY", {})}
+
+
+def inventory_version():
+    """Return the device inventory version, bumped by invalidate_inventory().
+
+    Kept in the database, so every process sees changes made by any other.
+    """
+    return counter_value(INVENTORY_COUNTER)
+
+
+def invalidate_inventory():
+    """Mark cached Nornir inventories stale after devices were changed.
 
-    return Inventory(hosts=hosts, groups={}, defaults=Defaults())
+    Call it inside the transaction that writes the devices.
+    """
+    bump_counter(INVENTORY_COUNTER)
 
 
-def init_nornir():
-    """Initialize Nornir with proper configuration and logging."""
-    # Register Netmiko plugin
-    ConnectionPluginRegister.register("netmiko", Netmiko)
+def inventory_attributes():
+    """Yield ``(name, platform, groups, site, role, tags)`` for every device.
 
-    # Get the base directory of the project
-    BASE_DIR = Path(__file__).resolve().parent.parent
+    Read straight from the table with DjangoInventory, so no Host objects
+    are built.
+    """
+    if get_inventory_settings()["plugin"] == "DjangoInventory":
+        yield from NetworkDevice.objects.order_by("id").values_list(
+            "name", "platform", "groups", "site", "role", "tags"
+        )
+        return
+    for name, host in get_nornir().inventory.hosts.items():
+        yield (
+            name,
+            host.platform,
+            [group.name for group in host.groups],
+            host.data.get("site", ""),
+            host.data.get("role", ""),
+            host.data.get("tags", []),
+        )
+
+
+def init_nornir(host_file=None, group_file=None, names=None):
+    """Initialize Nornir with proper configuration and logging.
+
+    The inventory comes from ``host_file`` when given, otherwise from the
+    NORNIR_INVENTORY plugin. With DjangoInventory, ``names`` limits it to
+    those devices.
+    """
+    # Register Netmiko plugin. InitNornir auto-registers the stock plugin from
+    # its entry point, so the pooled one is swapped in once it has run.
+    ConnectionPluginRegister.available["netmiko"] = Netmiko
+    RunnersPluginRegister.available["adaptive"] = AdaptiveRunner
+    RunnersPluginRegister.available["asyncio"] = AsyncioRunner
+    InventoryPluginRegister.available["DjangoInventory"] = DjangoInventory
 
     # Set NET_TEXTFSM environment variable for template loading
     templates_path = os.path.join(
@@ -52,21 +103,130 @@ def init_nornir():
     else:
         logger.info("Using default NET_TEXTFSM path from ntc_templates package")
 
-    nr = InitNornir(
-        inventory={
+    inventory_settings = get_inventory_settings()
+    group_file = str(group_file or inventory_settings["group_file"])
+    if host_file or inventory_settings["plugin"] != "DjangoInventory":
+        inventory = {
             "plugin": "SimpleInventory",
             "options": {
-                "host_file": str(BASE_DIR / "hosts.yaml"),
-                "group_file": str(BASE_DIR / "groups.yaml"),
+                "host_file": str(host_file or inventory_settings["host_file"]),
+                "group_file": group_file,
             },
-        },
-        runner={
-            "plugin": "threaded",
+        }
+    else:
+        inventory = {
+            "plugin": "DjangoInventory",
             "options": {
-                "num_workers": 10,
+                "names": names,
+                "group_file": group_file,
+                "defaults": inventory_settings["defaults"],
             },
-        },
-    )
+        }
+    nr = InitNornir(inventory=inventory, runner=runner_config())
+
+    if get_pool_settings()["enabled"]:
+        ConnectionPluginRegister.available["netmiko"] = PooledNetmiko
 
     logger.info(f"Initialized Nornir with {len(nr.inventory.hosts)} hosts")
     return nr
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def inventory_key():
+    inventory_settings = get_inventory_settings()
+    group_key = _mtime(inventory_settings["group_file"])
+    if inventory_settings["plugin"] == "DjangoInventory":
+        return ("django", inventory_version(), group_key)
+    return (_mtime(inventory_settings["host_file"]), group_key)
+
+
+def get_nornir():
+    """Return the process-wide Nornir instance, reloading it when the inventory changes."""
+    key = inventory_key()
+    with _nornir_lock:
+        if _nornir_cache["nornir"] is not None and _nornir_cache["key"] == key:
+            NORNIR_CACHE_STATS["hits"] += 1
+            return _nornir_cache["nornir"]
+
+        if _nornir_cache["nornir"] is None:
+            NORNIR_CACHE_STATS["misses"] += 1
+        else:
+            NORNIR_CACHE_STATS["reloads"] += 1
+            logger.info("Inventory changed, reloading Nornir")
+
+        nr = init_nornir()
+        _nornir_cache.update(key=key, nornir=nr, loaded_at=time.time())
+        return nr
+
+
+def _get_base_nornir():
+    """Return a cached Nornir with the groups and defaults but no hosts."""
+    key = _mtime(get_inventory_settings()["group_file"])
+    with _nornir_lock:
+        if _base_cache["nornir"] is None or _base_cache["key"] != key:
+            _base_cache.update(key=key, nornir=init_nornir(names=[]))
+        return _base_cache["nornir"]
+
+
+def get_nornir_view(names=None, nr=None):
+    """Return a cheap per-request copy of the cached Nornir (or of ``nr``).
+
+    The copy shares the cached inventory objects but has its own failed-host
+    state. When ``names`` is given only those hosts are selected, by direct
+    lookup instead of evaluating a filter against every host. With
+    DjangoInventory the selected devices are read from the database, so the
+    full inventory is never built and edits are picked up immediately.
+    """
+    if (
+        nr is None
+        and names is not None
+        and get_inventory_settings()["plugin"] == "DjangoInventory"
+    ):
+        # Build just the selected hosts instead of loading every device
+        nr = _get_base_nornir()
+        inventory = Inventory(
+            hosts=load_hosts(names, nr.inventory.groups, nr.inventory.defaults),
+            groups=nr.inventory.groups,
+            defaults=nr.inventory.defaults,
+        )
+    else:
+        nr = nr or get_nornir()
+        inventory = nr.inventory
+    if names is not None and inventory is nr.inventory:
+        hosts = inventory.hosts
+        inventory = Inventory(
+            hosts=Hosts({name: hosts[name] for name in names if name in hosts}),
+            groups=inventory.groups,
+            defaults=inventory.defaults,
+        )
+    return Nornir(
+        inventory=inventory,
+        config=nr.config,
+        data=GlobalState(dry_run=nr.data.dry_run),
+        processors=nr.processors,
+        runner=nr.runner,
+    )
+
+
+def invalidate_nornir_cache():
+    """Drop the cached Nornir so the next caller rebuilds it."""
+    with _nornir_lock:
+        _nornir_cache.update(key=None, nornir=None, loaded_at=None)
+        _base_cache.update(key=None, nornir=None)
+
+
+def nornir_cache_info():
+    """Return hit/miss/reload counters for the cached Nornir instance."""
+    with _nornir_lock:
+        nr = _nornir_cache["nornir"]
+        return {
+            **NORNIR_CACHE_STATS,
+            "hosts": len(nr.inventory.hosts) if nr is not None else 0,
+            "loaded_at": _nornir_cache["loaded_at"],
+        }
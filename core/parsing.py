@@ -0,0 +1,120 @@
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import ntc_templates
+from django.conf import settings
+from textfsm import TextFSM, clitable
+
+logger = logging.getLogger(__name__)
+
+# Compiled templates of this process, by (platform, command). None marks a
+# command without a template so the index isn't searched for it again.
+_templates = {}
+_index = None
+_lock = threading.Lock()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def template_dir():
+    return os.environ.get("NET_TEXTFSM") or os.path.join(
+        os.path.dirname(ntc_templates.__file__), "templates"
+    )
+
+
+def normalize_command(command):
+    return " ".join(command.split()).lower()
+
+
+def get_template(platform, command):
+    """Return the compiled TextFSM template for a command, or None."""
+    global _index
+    key = (platform, normalize_command(command))
+    if key in _templates:
+        return _templates[key]
+
+    if _index is None:
+        _index = clitable.CliTable("index", template_dir())
+    row = _index.index.GetRowMatch({"Platform": platform, "Command": key[1]})
+    template = None
+    if row:
+        # Commands mapped to several templates are parsed with the first one
+        name = _index.index.index[row]["Template"].split(":")[0]
+        with open(os.path.join(template_dir(), name)) as f:
+            template = TextFSM(f)
+    _templates[key] = template
+    return template
+
+
+def parse_output(platform, command, output):
+    """Parse command output into a list of dicts with lowercase keys.
+
+    Returns None when ntc-templates has no template for the platform and
+    command.
+    """
+    with _lock:
+        template = get_template(platform, command)
+        if template is None:
+            return None
+        template.Reset()
+        records = template.ParseText(output)
+        header = [name.lower() for name in template.header]
+    return [dict(zip(header, record)) for record in records]
+
+
+def _ignore_sigint():
+    # Ctrl+C is handled by the parent process
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def get_parse_pool():
+    """Return the process pool for parsing, or None when parsing runs inline."""
+    global _pool
+    with _pool_lock:
+        workers = getattr(settings, "TEXTFSM_PARSE_WORKERS", 2)
+        if _pool is None and workers:
+            # spawn: forking a process full of SSH threads is not safe
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_ignore_sigint,
+            )
+        return _pool
+
+
+def timed_parse_output(platform, command, output):
+    """Return ``(rows, seconds)`` for parse_output, timed where it runs."""
+    started = time.perf_counter()
+    rows = parse_output(platform, command, output)
+    return rows, time.perf_counter() - started
+
+
+def submit_parse(platform, command, output):
+    """Parse output in the process pool.
+
+    Returns a Future of the rows and the seconds spent parsing them.
+    """
+    pool = get_parse_pool()
+    if pool is not None:
+        return pool.submit(timed_parse_output, platform, command, output)
+
+    future = Future()
+    try:
+        future.set_result(timed_parse_output(platform, command, output))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+def shutdown_parse_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
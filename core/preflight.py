@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from core.async_ssh import raise_open_file_limit
+from core.nornir_init import get_nornir_view
+from network.models import HostHealth
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PREFLIGHT_SETTINGS = {
+    "enabled": True,
+    "timeout": 1.0,
+    "concurrency": 500,
+    "failure_threshold": 3,
+    "backoff": 60,
+    "max_backoff": 3600,
+}
+LOOKUP_CHUNK_SIZE = 500
+
+
+def get_preflight_settings():
+    return {**DEFAULT_PREFLIGHT_SETTINGS, **getattr(settings, "PREFLIGHT", {})}
+
+
+async def _probe(address, port, timeout, semaphore):
+    async with semaphore:
+        try:
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection(address, port), timeout
+            )
+        except asyncio.TimeoutError:
+            return f"no answer on {address}:{port} within {timeout:g}s"
+        except socket.gaierror as e:
+            return f"cannot resolve {address}: {e.strerror}"
+        except OSError as e:
+            reason = os.strerror(e.errno) if e.errno else str(e)
+            return f"cannot connect to {address}:{port}: {reason}"
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+        return None
+
+
+async def _probe_all(targets, timeout, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    names = list(targets)
+    errors = await asyncio.gather(
+        *(_probe(*targets[name], timeout, semaphore) for name in names)
+    )
+    return {name: error for name, error in zip(names, errors) if error}
+
+
+def probe_hosts(targets, timeout=1.0, concurrency=500):
+    """Open a TCP connection to every host at once and close it again.
+
+    ``targets`` maps host names to ``(address, port)``. Returns the hosts
+    that couldn't be reached within ``timeout`` seconds, with the reason.
+    At most ``concurrency`` connections are open at a time.
+    """
+    if not targets:
+        return {}
+    raise_open_file_limit(concurrency + 256)
+    return asyncio.run(_probe_all(targets, timeout, concurrency))
+
+
+def backoff_seconds(failures, options):
+    """Return how long a host with ``failures`` failed probes in a row is skipped."""
+    if failures < options["failure_threshold"]:
+        return 0
+    doublings = min(failures - options["failure_threshold"], 32)
+    return min(options["backoff"] * 2**doublings, options["max_backoff"])
+
+
+def _load_health(names):
+    health = {}
+    for i in range(0, len(names), LOOKUP_CHUNK_SIZE):
+        chunk = names[i : i + LOOKUP_CHUNK_SIZE]
+        for row in HostHealth.objects.filter(device_name__in=chunk):
+            health[row.device_name] = row
+    return health
+
+
+def record_probes(targets, errors, health, now, options):
+    """Update the circuit breakers of the probed hosts.
+
+    A failed probe counts against the host and opens its breaker once the
+    threshold is reached; a successful one closes it by deleting the row.
+    """
+    create, update, recovered = [], [], []
+    for name in targets:
+        row = health.get(name)
+        error = errors.get(name)
+        if error is None:
+            if row is not None:
+                recovered.append(row.pk)
+            continue
+        if row is None:
+            row = HostHealth(device_name=name)
+            create.append(row)
+        else:
+            update.append(row)
+        row.consecutive_failures += 1
+        row.last_error = error[:255]
+        row.last_checked_at = now
+        backoff = backoff_seconds(row.consecutive_failures, options)
+        row.open_until = now + timedelta(seconds=backoff) if backoff else None
+
+    with transaction.atomic():
+        HostHealth.objects.bulk_update(
+            update,
+            ["consecutive_failures", "last_error", "last_checked_at", "open_until"],
+            batch_size=LOOKUP_CHUNK_SIZE,
+        )
+        # A row another process created meanwhile keeps its own count
+        HostHealth.objects.bulk_create(
+            create, batch_size=LOOKUP_CHUNK_SIZE, ignore_conflicts=True
+        )
+        for i in range(0, len(recovered), LOOKUP_CHUNK_SIZE):
+            HostHealth.objects.filter(
+                pk__in=recovered[i : i + LOOKUP_CHUNK_SIZE]
+            ).delete()
+    if recovered:
+        logger.info(f"{len(recovered)} hosts are reachable again")
+
+
+def preflight(nr):
+    """Probe the hosts of ``nr`` and hold back the ones that can't answer.
+
+    Returns a Nornir over the hosts worth running and a dict of the others,
+    each with the TaskLog status and output to log for it: "failure" when
+    its probe failed, "skipped" when its circuit breaker is open and it
+    wasn't probed at all.
+    """
+    options = get_preflight_settings()
+    if not options["enabled"] or not nr.inventory.hosts:
+        return nr, {}
+
+    names = list(nr.inventory.hosts)
+    health = _load_health(names)
+    now = timezone.now()
+    unreachable = {}
+    targets = {}
+    for name in names:
+        row = health.get(name)
+        if row is not None and row.open_until is not None and row.open_until > now:
+            retry_at = timezone.localtime(row.open_until)
+            unreachable[name] = (
+                "skipped",
+                f"Skipped: unreachable on the last {row.consecutive_failures} "
+                f"checks ({row.last_error}), next check after {retry_at:%H:%M:%S}",
+            )
+            continue
+        params = nr.inventory.hosts[name].get_connection_parameters("netmiko")
+        targets[name] = (params.hostname or name, params.port or 22)
+
+    started = time.perf_counter()
+    errors = probe_hosts(targets, options["timeout"], options["concurrency"])
+    logger.info(
+        f"Preflight probed {len(targets)} hosts in "
+        f"{time.perf_counter() - started:.2f}s: {len(errors)} unreachable, "
+        f"{len(unreachable)} skipped by their circuit breaker"
+    )
+    record_probes(targets, errors, health, now, options)
+    for name, error in errors.items():
+        unreachable[name] = ("failure", f"Unreachable: {error}")
+
+    if not unreachable:
+        return nr, {}
+    reachable = [name for name in names if name not in unreachable]
+    return get_nornir_view(reachable, nr=nr), unreachable
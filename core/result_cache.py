@@ -0,0 +1,251 @@
+import asyncio
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from network.counters import bump_counters, counter_values
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_SETTINGS = {
+    "enabled": True,
+    "ttl": 30,
+    "max_entries": 10000,
+    # Commands whose output may be reused; anything else is treated as a
+    # change and drops the host's cached results.
+    "read_only": [r"^show\s", r"^sh\s"],
+}
+
+# Output modifiers that write to the device even after a show command
+WRITE_MODIFIERS = re.compile(r"\|\s*(redirect|tee|append)\b", re.IGNORECASE)
+# ChangeCounter of a host, bumped when any process invalidates its results
+COUNTER_PREFIX = "result_cache:"
+
+
+def get_cache_settings():
+    return {**DEFAULT_CACHE_SETTINGS, **getattr(settings, "RESULT_CACHE", {})}
+
+
+def cache_command(command):
+    return " ".join(command.split())
+
+
+def is_read_only(command):
+    """Return True if ``command`` only reads device state."""
+    command = cache_command(command)
+    if WRITE_MODIFIERS.search(command):
+        return False
+    return any(
+        re.match(pattern, command, re.IGNORECASE)
+        for pattern in get_cache_settings()["read_only"]
+    )
+
+
+class ResultCache:
+    """Thread-safe TTL/LRU cache of command output keyed by (host, command).
+
+    Concurrent requests for the same key while it is being fetched wait for
+    that one execution instead of running the command again. A host's
+    entries are dropped by ``invalidate_host``; a fetch that was in flight at
+    the time still answers its waiters but isn't stored.
+
+    Entries and in-flight fetches belong to one process. Invalidations are
+    shared through ``take_changed`` and ``sync_shared``, see
+    shared_result_cache.
+    """
+
+    def __init__(self, ttl=30, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # (host, command) -> (output, expires_at), least recently used first
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._generations = {}
+        self._shared = {}  # host -> shared generation its entries were stored at
+        self._changed = set()  # hosts invalidated since take_changed()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "bypassed": 0,
+            "expired": 0,
+            "evicted": 0,
+            "invalidated": 0,
+        }
+
+    def _claim(self, key, bypass):
+        """Return ("hit", output), ("wait", future) or ("run", (future, generation))."""
+        now = time.monotonic()
+        with self._lock:
+            if bypass:
+                self._stats["bypassed"] += 1
+            else:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    if entry[1] > now:
+                        self._entries.move_to_end(key)
+                        self._stats["hits"] += 1
+                        return "hit", entry[0]
+                    del self._entries[key]
+                    self._stats["expired"] += 1
+                future = self._in_flight.get(key)
+                if future is not None:
+                    self._stats["coalesced"] += 1
+                    return "wait", future
+                self._stats["misses"] += 1
+
+            future = Future()
+            # A bypassing fetch doesn't replace one others are waiting on
+            self._in_flight.setdefault(key, future)
+            return "run", (future, self._generations.get(key[0], 0))
+
+    def _complete(self, key, future, generation, output=None, error=None):
+        with self._lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+            if error is None and self._generations.get(key[0], 0) == generation:
+                self._entries[key] = (output, time.monotonic() + self.ttl)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self._stats["evicted"] += 1
+        if error is None:
+            future.set_result(output)
+        else:
+            future.set_exception(error)
+
+    def get_or_run(self, host, command, run, bypass=False):
+        """Return the output of ``command`` on ``host``, calling ``run()`` on a miss.
+
+        With ``bypass`` the command always runs; its output still refreshes
+        the cache.
+        """
+        key = (host, cache_command(command))
+        state, value = self._claim(key, bypass)
+        if state == "hit":
+            return value
+        if state == "wait":
+            return value.result()
+
+        future, generation = value
+        try:
+            output = run()
+        except BaseException as e:
+            self._complete(key, future, generation, error=e)
+            raise
+        self._complete(key, future, generation, output)
+        return output
+
+    async def aget_or_run(self, host, command, run, bypass=False):
+        """Coroutine version of get_or_run; ``run()`` returns an awaitable."""
+        key = (host, cache_command(command))
+        state, value = self._claim(key, bypass)
+        if state == "hit":
+            return value
+        if state == "wait":
+            return await asyncio.wrap_future(value)
+
+        future, generation = value
+        try:
+            output = await run()
+        except BaseException as e:
+            self._complete(key, future, generation, error=e)
+            raise
+        self._complete(key, future, generation, output)
+        return output
+
+    def _drop_host(self, host):
+        self._generations[host] = self._generations.get(host, 0) + 1
+        stale = [key for key in self._entries if key[0] == host]
+        for key in stale:
+            del self._entries[key]
+        self._stats["invalidated"] += len(stale)
+
+    def invalidate_host(self, host):
+        """Drop every cached result of ``host``."""
+        with self._lock:
+            self._drop_host(host)
+            self._changed.add(host)
+
+    def take_changed(self):
+        """Return and forget the hosts invalidated since the last call."""
+        with self._lock:
+            changed, self._changed = self._changed, set()
+            return changed
+
+    def sync_shared(self, generations):
+        """Drop the results of hosts whose shared generation has moved.
+
+        ``generations`` maps hosts to their current shared generation; a
+        host seen at another generation before is dropped.
+        """
+        with self._lock:
+            for host, generation in generations.items():
+                if self._shared.get(host) != generation:
+                    self._drop_host(host)
+                    self._shared[host] = generation
+
+    def clear(self):
+        with self._lock:
+            for host in {key[0] for key in [*self._entries, *self._in_flight]}:
+                self._generations[host] = self._generations.get(host, 0) + 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            requests = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "in_flight": len(self._in_flight),
+                "hit_rate": (
+                    round(self._stats["hits"] / requests, 3) if requests else 0.0
+                ),
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """Return the process-wide result cache, or None when it is disabled."""
+    global _cache
+    with _cache_lock:
+        options = get_cache_settings()
+        if not options["enabled"]:
+            return None
+        if _cache is None:
+            _cache = ResultCache(ttl=options["ttl"], max_entries=options["max_entries"])
+        return _cache
+
+
+@contextmanager
+def shared_result_cache(hosts):
+    """Keep this process's result cache in step with other processes for a run.
+
+    Before the run, cached results of ``hosts`` that another process has
+    invalidated since are dropped. Afterwards the hosts this process
+    invalidated, by sending them a command that isn't read-only, are
+    published through their ChangeCounter so other processes drop theirs.
+    """
+    cache = get_result_cache()
+    if cache is None:
+        yield
+        return
+    hosts = list(hosts)
+    values = counter_values(COUNTER_PREFIX + host for host in hosts)
+    cache.sync_shared({host: values.get(COUNTER_PREFIX + host, 0) for host in hosts})
+    try:
+        yield
+    finally:
+        changed = cache.take_changed()
+        if changed:
+            bump_counters(COUNTER_PREFIX + host for host in changed)
@@ -0,0 +1,287 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from nornir.core.task import AggregatedResult, Result
+from nornir.plugins.runners import ThreadedRunner
+
+from core.async_ssh import (
+    ASYNCSSH_MISSING,
+    AsyncSSHSession,
+    asyncssh,
+    raise_open_file_limit,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RUNNER_SETTINGS = {
+    "plugin": "threaded",
+    "num_workers": 10,
+    "async_workers": 1000,
+    "min_workers": 2,
+    "initial_workers": 10,
+    "target_latency": 30.0,
+    "max_failure_rate": 0.2,
+    "group_limits": {},
+}
+
+
+def get_runner_settings():
+    return {**DEFAULT_RUNNER_SETTINGS, **getattr(settings, "NORNIR_RUNNER", {})}
+
+
+def runner_config(plugin=None, num_workers=None):
+    """Return the ``runner`` section for InitNornir from settings and overrides."""
+    options = get_runner_settings()
+    plugin = plugin or options["plugin"]
+    if plugin == "adaptive":
+        return {
+            "plugin": "adaptive",
+            "options": {
+                "num_workers": num_workers or options["num_workers"],
+                "min_workers": options["min_workers"],
+                "initial_workers": options["initial_workers"],
+                "target_latency": options["target_latency"],
+                "max_failure_rate": options["max_failure_rate"],
+                "group_limits": options["group_limits"],
+            },
+        }
+    if plugin == "asyncio":
+        if asyncssh is None:
+            raise ImproperlyConfigured(ASYNCSSH_MISSING)
+        return {
+            "plugin": "asyncio",
+            "options": {"num_workers": num_workers or options["async_workers"]},
+        }
+    num_workers = num_workers or options["num_workers"]
+    return {"plugin": plugin, "options": {"num_workers": num_workers}}
+
+
+def build_runner(plugin=None, num_workers=None):
+    """Instantiate a runner for ``nr.with_runner`` from settings and overrides."""
+    config = runner_config(plugin, num_workers)
+    runner_class = RUNNERS.get(config["plugin"], ThreadedRunner)
+    return runner_class(**config["options"])
+
+
+class AdaptiveRunner:
+    """Threaded runner that tunes its concurrency while it runs.
+
+    Concurrency starts at ``initial_workers`` and is adjusted once per window
+    of completed hosts (one window is as many hosts as the current limit):
+    it doubles while hosts answer within ``target_latency`` seconds and fail
+    less often than ``max_failure_rate``, grows by one after the first
+    slowdown, and halves whenever either threshold is crossed. It never goes
+    below ``min_workers`` or above ``num_workers``.
+
+    ``group_limits`` caps how many hosts of an inventory group run at once,
+    e.g. ``{"core": 4}``; a group can also set ``max_sessions`` in its data.
+    """
+
+    def __init__(
+        self,
+        num_workers=20,
+        min_workers=2,
+        initial_workers=10,
+        target_latency=30.0,
+        max_failure_rate=0.2,
+        group_limits=None,
+    ):
+        self.num_workers = num_workers
+        self.min_workers = max(1, min(min_workers, num_workers))
+        self.initial_workers = max(self.min_workers, min(initial_workers, num_workers))
+        self.target_latency = target_latency
+        self.max_failure_rate = max_failure_rate
+        self.group_limits = group_limits or {}
+
+    def _host_limits(self, host):
+        limits = {}
+        for group in host.extended_groups():
+            limit = self.group_limits.get(group.name, group.data.get("max_sessions"))
+            if limit:
+                limits[group.name] = int(limit)
+        return limits
+
+    def run(self, task, hosts):
+        result = AggregatedResult(task.name)
+        pending = deque((host, self._host_limits(host)) for host in hosts)
+        running = {}
+        group_counts = {}
+        limit = self.initial_workers
+        threshold = self.num_workers
+        peak = limit
+        window = []
+
+        with ThreadPoolExecutor(self.num_workers) as pool:
+            while pending or running:
+                # Start as many hosts as the limit allows, skipping hosts whose
+                # groups are at their cap; they keep their place in the queue.
+                for _ in range(len(pending)):
+                    if len(running) >= limit:
+                        break
+                    host, host_limits = pending.popleft()
+                    if any(
+                        group_counts.get(name, 0) >= cap
+                        for name, cap in host_limits.items()
+                    ):
+                        pending.append((host, host_limits))
+                        continue
+                    for name in host_limits:
+                        group_counts[name] = group_counts.get(name, 0) + 1
+                    future = pool.submit(task.copy().start, host)
+                    running[future] = (host, host_limits, time.monotonic())
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    host, host_limits, started = running.pop(future)
+                    for name in host_limits:
+                        group_counts[name] -= 1
+                    worker_result = future.result()
+                    result[worker_result.host.name] = worker_result
+                    window.append((time.monotonic() - started, worker_result.failed))
+
+                if len(window) >= limit:
+                    limit, threshold = self._adjust(limit, threshold, window)
+                    peak = max(peak, limit)
+                    window = []
+
+        logger.info(
+            f"Adaptive runner finished {len(result)} hosts "
+            f"(concurrency {limit}, peak {peak})"
+        )
+        return result
+
+    def _adjust(self, limit, threshold, window):
+        """Return the next (limit, threshold) after a window of (latency, failed)."""
+        failure_rate = sum(1 for _, failed in window if failed) / len(window)
+        latency = sum(latency for latency, _ in window) / len(window)
+        if failure_rate > self.max_failure_rate or latency > self.target_latency:
+            threshold = max(self.min_workers, limit // 2)
+            logger.info(
+                f"Backing off to {threshold} workers "
+                f"(latency {latency:.1f}s, failure rate {failure_rate:.0%})"
+            )
+            return threshold, threshold
+        if limit < threshold:
+            return min(self.num_workers, limit * 2), threshold
+        return min(self.num_workers, limit + 1), threshold
+
+
+class AsyncioRunner:
+    """Run hosts as coroutines on one event loop instead of one thread each.
+
+    Tasks from ``core.tasks`` are replaced by their ``core.async_tasks``
+    counterparts and talk to the device through an asyncssh session, so a
+    single process can keep ``num_workers`` sessions (thousands) open at once.
+    Any other task runs on a thread from the loop's default executor.
+
+    The loop runs on its own thread; processors are called on the caller's
+    thread, so sinks that write to the database never run inside the loop.
+    """
+
+    def __init__(self, num_workers=1000, connect_timeout=30, read_timeout=120):
+        self.num_workers = num_workers
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+    def run(self, task, hosts):
+        from core.async_tasks import ASYNC_TASKS
+
+        # Each session needs a socket; leave room for the database and logs
+        raise_open_file_limit(min(self.num_workers, len(hosts)) + 256)
+
+        result = AggregatedResult(task.name)
+        events = queue.Queue()
+        errors = []
+
+        def loop_main():
+            try:
+                asyncio.run(
+                    self._run_hosts(task, hosts, ASYNC_TASKS.get(task.task), events)
+                )
+            except BaseException as e:
+                errors.append(e)
+            finally:
+                events.put(None)
+
+        loop_thread = threading.Thread(target=loop_main, name="nornir-asyncio")
+        loop_thread.start()
+        while (event := events.get()) is not None:
+            kind, host_task, host = event
+            if kind == "started":
+                host_task.processors.task_instance_started(host_task, host)
+                continue
+            if kind == "completed":
+                host_task.processors.task_instance_completed(
+                    host_task, host, host_task.results
+                )
+            result[host.name] = host_task.results
+        loop_thread.join()
+
+        if errors:
+            raise errors[0]
+        return result
+
+    async def _run_hosts(self, task, hosts, async_task, events):
+        semaphore = asyncio.Semaphore(self.num_workers)
+
+        async def run_host(host):
+            async with semaphore:
+                host_task = task.copy()
+                if async_task is None:
+                    # start() calls the processors itself, from the worker thread
+                    await asyncio.to_thread(host_task.start, host)
+                    events.put(("finished", host_task, host))
+                    return
+                host_task.host = host
+                events.put(("started", host_task, host))
+                host_task.results.insert(
+                    0, await self._run_async_task(host_task, host, async_task)
+                )
+                events.put(("completed", host_task, host))
+
+        await asyncio.gather(*(run_host(host) for host in hosts))
+
+    async def _run_async_task(self, host_task, host, async_task):
+        session = AsyncSSHSession.from_host(
+            host, connect_timeout=self.connect_timeout, read_timeout=self.read_timeout
+        )
+        try:
+            async with session:
+                output = await async_task(session, **host_task.params)
+            logger.info(f"Task {host_task.name} successful on {host.name}")
+            # A command batch fails if any of its commands did
+            result = Result(
+                host=host,
+                result=output,
+                failed=getattr(output, "failed", False),
+                timings=session.timings,
+            )
+        except Exception as e:
+            error = str(e) or e.__class__.__name__
+            logger.error(f"Task {host_task.name} failed on {host.name}: {error}")
+            result = Result(
+                host=host,
+                result=error,
+                exception=e,
+                failed=True,
+                timings=session.timings,
+            )
+        result.name = host_task.name
+        result.severity_level = (
+            logging.ERROR if result.failed else host_task.severity_level
+        )
+        return result
+
+
+RUNNERS = {
+    "threaded": ThreadedRunner,
+    "adaptive": AdaptiveRunner,
+    "asyncio": AsyncioRunner,
+}
@@ -1,46 +1,234 @@
+import functools
 import logging
+import re
+import time
+
 from nornir.core.task import Result, Task
 from nornir_netmiko.tasks import netmiko_send_command
 from network.models import NetworkDevice
 
+from core.connection_pool import release_connection
+from core.result_cache import get_result_cache, is_read_only
+from core.timing import Timings
+
 logger = logging.getLogger(__name__)
 
+# Device command sent by each fixed task
+TASK_COMMANDS = {
+    "show_ip": "show ip interface brief",
+    "save_config": "copy running-config startup-config",
+    "backup_config": "show running-config",
+}
+
+# Cisco-style CLI errors that mark a command in a batch as failed
+COMMAND_ERROR_RE = re.compile(
+    r"^\s*% ?(Invalid input|Incomplete command|Ambiguous command|Unknown command)",
+    re.MULTILINE,
+)
+# Confirmation prompts such as "Destination filename [startup-config]?"
+CONFIRM_PATTERN = r"(\[confirm\]|\]\?)\s*$"
+
+
+def netmiko_send_confirmed(task: Task, command_string: str) -> Result:
+    """Send a command that asks for confirmation and accept the defaults.
+
+    Netmiko only waits for the prompt, so it would time out on the question.
+    """
+    net_connect = task.host.get_connection("netmiko", task.nornir.config)
+    prompt = re.escape(net_connect.base_prompt) + r"[>#]\s*$"
+    expect = f"{CONFIRM_PATTERN}|{prompt}"
+    output = net_connect.send_command(command_string, expect_string=expect)
+    for _ in range(3):
+        if not re.search(CONFIRM_PATTERN, output):
+            break
+        output += "\n" + net_connect.send_command(
+            "\n", expect_string=expect, cmd_verify=False
+        )
+    return Result(host=task.host, result=output)
+
+
+def releases_connection(func):
+    """Hand the host's session back to the pool as soon as ``func`` returns."""
+
+    @functools.wraps(func)
+    def wrapper(task: Task, *args, **kwargs):
+        try:
+            return func(task, *args, **kwargs)
+        finally:
+            release_connection(task.host)
 
-def show_ip(task: Task) -> Result:
+    return wrapper
+
+
+def send_command(
+    task: Task,
+    command: str,
+    use_cache: bool = True,
+    timings: Timings = None,
+    confirm: bool = False,
+) -> str:
+    """Send ``command`` to the task's host through the result cache.
+
+    Read-only commands reuse a recent output of the same command on the host,
+    or wait for a run already in progress, instead of opening a session.
+    Other commands run directly and drop the host's cached results. Opening
+    the session and running the command are timed into ``timings``. With
+    ``confirm`` the device's confirmation prompts are answered.
+    """
+    cache = get_result_cache()
+    timings = timings if timings is not None else Timings()
+
+    def run():
+        if "netmiko" not in task.host.connections:
+            with timings.measure("connect"):
+                task.host.get_connection("netmiko", task.nornir.config)
+        with timings.measure("command"):
+            send = netmiko_send_confirmed if confirm else netmiko_send_command
+            return task.run(task=send, command_string=command).result
+
+    if cache is None:
+        return run()
+    if not is_read_only(command):
+        try:
+            return run()
+        finally:
+            cache.invalidate_host(task.host.name)
+    return cache.get_or_run(task.host.name, command, run, bypass=not use_cache)
+
+
+@releases_connection
+def show_ip(task: Task, use_cache: bool = True) -> Result:
     """Execute 'show ip interface brief' command on device."""
+    timings = Timings()
     try:
-        result = task.run(
-            task=netmiko_send_command, command_string="show ip interface brief"
-        )
+        output = send_command(task, TASK_COMMANDS["show_ip"], use_cache, timings)
         logger.info(f"Successfully retrieved IP interface info from {task.host.name}")
-        return Result(host=task.host, result=result.result)
+        return Result(host=task.host, result=output, timings=timings)
     except Exception as e:
         logger.error(f"Error getting IP interface info from {task.host.name}: {str(e)}")
-        return Result(host=task.host, result=str(e), failed=True)
+        return Result(host=task.host, result=str(e), failed=True, timings=timings)
 
 
-def save_config(task: Task) -> Result:
+@releases_connection
+def save_config(task: Task, use_cache: bool = True) -> Result:
     """Save running configuration to startup config."""
+    timings = Timings()
     try:
-        result = task.run(
-            task=netmiko_send_command,
-            command_string="copy running-config startup-config",
+        output = send_command(
+            task, TASK_COMMANDS["save_config"], timings=timings, confirm=True
         )
         logger.info(f"Successfully saved config on {task.host.name}")
-        return Result(host=task.host, result=result.result)
+        return Result(host=task.host, result=output, timings=timings)
     except Exception as e:
         logger.error(f"Error saving config on {task.host.name}: {str(e)}")
-        return Result(host=task.host, result=str(e), failed=True)
+        return Result(host=task.host, result=str(e), failed=True, timings=timings)
+
+
+@releases_connection
+def backup_config(task: Task, use_cache: bool = True) -> Result:
+    """Retrieve the running configuration for the config history."""
+    timings = Timings()
+    try:
+        output = send_command(task, TASK_COMMANDS["backup_config"], use_cache, timings)
+        logger.info(f"Successfully retrieved running config from {task.host.name}")
+        return Result(host=task.host, result=output, timings=timings)
+    except Exception as e:
+        logger.error(f"Error backing up config on {task.host.name}: {str(e)}")
+        return Result(host=task.host, result=str(e), failed=True, timings=timings)
+
+
+def split_commands(command: str) -> list:
+    """Return the non-blank lines of a custom command, one command each."""
+    return [line.strip() for line in command.splitlines() if line.strip()]
+
+
+def rejected(output: str) -> bool:
+    """Return True if the device answered ``output`` with a CLI error."""
+    return bool(COMMAND_ERROR_RE.search(output or ""))
+
+
+class CommandBatch(list):
+    """Results of a command batch in command order.
+
+    Each item is a dict with the command, its output, its status, its
+    duration in seconds and the Timings of its phases.
+    """
+
+    @property
+    def failed(self):
+        return any(item["status"] != "success" for item in self)
+
+    def add(self, command, output, failed, duration, timings=None):
+        self.append(
+            {
+                "command": command,
+                "output": output,
+                "status": "failure" if failed else "success",
+                "duration": duration,
+                "timings": timings or {},
+            }
+        )
+
+    def skip(self, commands):
+        for command in commands:
+            self.add(command, "Not run: an earlier command failed", True, None)
+
+
+def run_command_batch(task, commands, use_cache=True, stop_on_error=False):
+    """Send ``commands`` one after another over the host's session.
+
+    A command the device rejects fails on its own unless ``stop_on_error``
+    is set; one that raises ends the batch, as the session can't be trusted.
+    """
+    batch = CommandBatch()
+    for i, command in enumerate(commands):
+        timings = Timings()
+        started = time.monotonic()
+        try:
+            output = send_command(task, command, use_cache, timings)
+        except Exception as e:
+            batch.add(command, str(e), True, time.monotonic() - started, timings)
+            batch.skip(commands[i + 1 :])
+            break
+        failed = rejected(output)
+        batch.add(command, output, failed, time.monotonic() - started, timings)
+        if failed and stop_on_error:
+            batch.skip(commands[i + 1 :])
+            break
+    return batch
+
+
+@releases_connection
+def run_custom_command(
+    task: Task, command: str, use_cache: bool = True, stop_on_error: bool = False
+) -> Result:
+    """Execute a custom command on device.
 
+    A command of several lines runs each line in turn over the same session
+    and returns a CommandBatch with every command's output and timing.
+    """
+    commands = split_commands(command)
+    if len(commands) > 1:
+        batch = run_command_batch(task, commands, use_cache, stop_on_error)
+        failures = sum(1 for item in batch if item["status"] != "success")
+        if failures:
+            logger.error(
+                f"{failures} of {len(commands)} commands failed on {task.host.name}"
+            )
+        else:
+            logger.info(
+                f"Successfully executed {len(commands)} commands on {task.host.name}"
+            )
+        return Result(host=task.host, result=batch, failed=batch.failed)
+    command = commands[0] if commands else command
 
-def run_custom_command(task: Task, command: str) -> Result:
-    """Execute a custom command on device."""
+    timings = Timings()
     try:
-        result = task.run(task=netmiko_send_command, command_string=command)
+        output = send_command(task, command, use_cache, timings)
         logger.info(f"Successfully executed command '{command}' on {task.host.name}")
-        return Result(host=task.host, result=result.result)
+        return Result(host=task.host, result=output, timings=timings)
     except Exception as e:
         logger.error(
             f"Error executing command '{command}' on {task.host.name}: {str(e)}"
         )
-        return Result(host=task.host, result=str(e), failed=True)
+        return Result(host=task.host, result=str(e), failed=True, timings=timings)
@@ -0,0 +1,18 @@
+import time
+from contextlib import contextmanager
+
+
+class Timings(dict):
+    """Seconds a host's task spent in each phase, such as connect or command.
+
+    Tasks return it on their Result as ``timings`` and TaskLogSink stores it
+    on the TaskLog row. A phase measured more than once is summed.
+    """
+
+    @contextmanager
+    def measure(self, phase):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self[phase] = self.get(phase, 0.0) + time.perf_counter() - started
@@ -1,6 +1,56 @@
 from django.contrib import admin
-from .models import NetworkDevice, TaskLog
+from django.db import transaction
+
+from core.nornir_init import invalidate_inventory
+
+from .models import (
+    ConfigVersion,
+    DeviceSelector,
+    HostHealth,
+    InterfaceStatus,
+    Job,
+    NetworkDevice,
+    ParsedOutput,
+    ScheduleEntry,
+    TaskLog,
+    TaskLogChoice,
+    TaskStat,
+    TaskTotal,
+    WorkerStats,
+)
 
 # Register your models here.
-admin.site.register(NetworkDevice)
+
+
+@admin.register(NetworkDevice)
+class NetworkDeviceAdmin(admin.ModelAdmin):
+    # Admin edits must reach the Nornir inventories cached by other processes
+
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            super().save_model(request, obj, form, change)
+            invalidate_inventory()
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            super().delete_model(request, obj)
+            invalidate_inventory()
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            super().delete_queryset(request, queryset)
+            invalidate_inventory()
+
+
 admin.site.register(TaskLog)
+admin.site.register(Job)
+admin.site.register(TaskLogChoice)
+admin.site.register(TaskStat)
+admin.site.register(TaskTotal)
+admin.site.register(ParsedOutput)
+admin.site.register(InterfaceStatus)
+admin.site.register(ConfigVersion)
+admin.site.register(ScheduleEntry)
+admin.site.register(DeviceSelector)
+admin.site.register(HostHealth)
+admin.site.register(WorkerStats)
@@ -0,0 +1,482 @@
+import json
+import math
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from importlib import metadata
+from itertools import islice
+from pathlib import Path
+
+import django
+import yaml
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Max
+from django.test import Client
+from django.test.utils import override_settings, setup_databases, teardown_databases
+from django.urls import reverse
+from django.utils import timezone
+
+from core.async_ssh import raise_open_file_limit
+from core.connection_pool import get_connection_pool
+from core.nornir_init import init_nornir, invalidate_nornir_cache
+from core.parsing import shutdown_parse_pool
+from core.preflight import preflight
+from core.result_cache import get_result_cache
+
+from .devices import apply_device_diff, diff_devices, load_hosts_file
+from .jobs import TASK_MAP, claim_job, run_job
+from .models import TaskLog
+from .results import TaskLogSink
+
+DEFAULT_HOST_COUNTS = (10, 100, 1000, 5000)
+# Task type -> custom command it runs
+SCENARIOS = {
+    "show_ip": None,
+    "save_config": None,
+    "custom_command": "show version\nshow ip interface brief",
+}
+# "nornir" runs the task directly like run_nornir_tasks; "view" submits it
+# through the task form and runs the queued Job like a worker would.
+PATHS = ("nornir", "view")
+DEFAULT_BASELINE = settings.BASE_DIR / "benchmarks" / "baseline.json"
+
+# Metric -> True when a higher value is better
+COMPARED_METRICS = {
+    "throughput": True,
+    "p50": False,
+    "p99": False,
+    "peak_rss_mb": False,
+    "write_time": False,
+}
+# Differences smaller than this are noise, whatever the relative change
+NOISE_FLOOR = {"p50": 0.01, "p99": 0.01, "write_time": 0.01, "peak_rss_mb": 5.0}
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+class FakeFarm:
+    """A ``run_fake_devices`` process serving ``count`` devices.
+
+    Used as a context manager: the process is started on entry, ``hosts``
+    then holds the farm's SimpleInventory hosts, and it is stopped on exit.
+    It runs apart from the benchmark so the devices' event loop doesn't
+    compete with the runner for the GIL.
+    """
+
+    def __init__(
+        self, count, base_port=20022, latency=0.0, interfaces=4, failure_rate=0.0
+    ):
+        self.count = count
+        self.base_port = base_port
+        self.latency = latency
+        self.interfaces = interfaces
+        self.failure_rate = failure_rate
+        self.hosts = {}
+        self.process = None
+
+    def __enter__(self):
+        self._dir = tempfile.TemporaryDirectory(prefix="netauto-farm-")
+        self.directory = Path(self._dir.name)
+        inventory = self.directory / "farm.yaml"
+        log_path = self.directory / "farm.log"
+        command = [
+            sys.executable,
+            str(settings.BASE_DIR / "manage.py"),
+            "run_fake_devices",
+            f"--count={self.count}",
+            f"--base-port={self.base_port}",
+            f"--latency={self.latency}",
+            f"--interfaces={self.interfaces}",
+            f"--failure-rate={self.failure_rate}",
+            f"--write-inventory={inventory}",
+        ]
+        # Output goes to a file: a pipe nobody drains would block the farm
+        self._log = open(log_path, "w")
+        self.process = subprocess.Popen(
+            command, stdout=self._log, stderr=subprocess.STDOUT, text=True
+        )
+        try:
+            self._wait_until_serving(log_path)
+        except BaseException:
+            self.__exit__(None, None, None)
+            raise
+        self.hosts = load_hosts_file(inventory)
+        return self
+
+    def _wait_until_serving(self, log_path):
+        deadline = time.monotonic() + 60 + self.count / 50
+        while time.monotonic() < deadline:
+            output = log_path.read_text()
+            if "Serving" in output:
+                return
+            if self.process.poll() is not None:
+                raise BenchmarkError(f"The fake device farm exited:\n{output}")
+            time.sleep(0.1)
+        raise BenchmarkError(f"The fake device farm did not start:\n{output}")
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self._log.close()
+        self._dir.cleanup()
+
+    def write_inventory(self, count):
+        """Write a hosts file with the first ``count`` devices and return it."""
+        path = self.directory / f"hosts-{count}.yaml"
+        with open(path, "w") as f:
+            yaml.safe_dump(first_hosts(self.hosts, count), f, sort_keys=False)
+        return path
+
+
+def first_hosts(hosts, count):
+    return dict(islice(hosts.items(), count))
+
+
+def resident_bytes():
+    """Return the resident set size of this process."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # No procfs: fall back to the peak since the process started
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class PeakMemory:
+    """Track the peak resident set size while the ``with`` block runs."""
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+
+    def _sample(self):
+        self.peak = max(self.peak, resident_bytes())
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self._sample()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+
+def percentile(values, pct):
+    """Return the nearest-rank ``pct`` percentile of ``values``."""
+    if not values:
+        return None
+    values = sorted(values)
+    rank = math.ceil(pct / 100 * len(values))
+    return values[max(rank, 1) - 1]
+
+
+def host_latencies(logs):
+    """Return each host's seconds from its TaskLog rows.
+
+    The commands of a batch are one host, so their durations are added up.
+    """
+    latencies = []
+    batches = {}
+    for batch_id, duration in logs.values_list("batch_id", "duration"):
+        if duration is None:
+            continue
+        if batch_id is None:
+            latencies.append(duration)
+        else:
+            batches[batch_id] = batches.get(batch_id, 0.0) + duration
+    return latencies + list(batches.values())
+
+
+@contextmanager
+def benchmark_database():
+    """Run on a fresh test database so the real TaskLogs and stats are untouched."""
+    test_settings = connection.settings_dict["TEST"]
+    name = test_settings.get("NAME")
+    with tempfile.TemporaryDirectory(prefix="netauto-bench-db-") as directory:
+        if connection.vendor == "sqlite" and not name:
+            # On disk rather than in memory, so write times are realistic
+            test_settings["NAME"] = os.path.join(directory, "benchmark.sqlite3")
+        old_config = setup_databases(
+            verbosity=0, interactive=False, aliases={connection.alias}
+        )
+        try:
+            yield
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            test_settings["NAME"] = name
+
+
+def reset_state():
+    """Start a run cold: no pooled sessions, cached results or Nornir."""
+    get_connection_pool().close_all()
+    cache = get_result_cache()
+    if cache is not None:
+        cache.clear()
+    invalidate_nornir_cache()
+
+
+def run_nornir(hosts_file, task_type, user, parse=False):
+    """Run a task straight through Nornir and the TaskLogSink."""
+    command = SCENARIOS[task_type]
+    kwargs = {"use_cache": False}
+    if command:
+        kwargs["command"] = command
+    first_id = TaskLog.objects.aggregate(last=Max("id"))["last"] or 0
+
+    started = time.perf_counter()
+    nr = init_nornir(host_file=hosts_file)
+    setup_time = time.perf_counter() - started
+    sink = TaskLogSink(
+        task_type,
+        user=user,
+        custom_command=command,
+        release_results=True,
+        parse=parse,
+    )
+    try:
+        with sink:
+            reachable, unreachable = preflight(nr)
+            sink.add_unreachable(unreachable)
+            reachable.with_processors([sink]).run(task=TASK_MAP[task_type], **kwargs)
+    finally:
+        nr.close_connections(on_good=True, on_failed=True)
+    return {
+        "wall": time.perf_counter() - started,
+        "setup_time": setup_time,
+        "status_time": None,
+        "write_time": sink.write_time,
+        "logs": TaskLog.objects.filter(id__gt=first_id),
+    }
+
+
+def run_view(client, task_type, parse=False):
+    """Submit a task through the task form, run its Job and fetch its status."""
+    data = {"task_type": task_type, "selector": "*", "bypass_cache": "on"}
+    if SCENARIOS[task_type]:
+        data["custom_command"] = SCENARIOS[task_type]
+    if parse:
+        data["parse"] = "on"
+
+    started = time.perf_counter()
+    response = client.post(
+        reverse("network_task"), data, HTTP_ACCEPT="application/json"
+    )
+    if response.status_code != 202:
+        raise BenchmarkError(f"The task form rejected {task_type}: {response.content}")
+    setup_time = time.perf_counter() - started
+    job = claim_job("benchmark")
+    if job is None or job.pk != response.json()["job_id"]:
+        raise BenchmarkError("The benchmark job was not first in the queue")
+    run_job(job)
+    wall = time.perf_counter() - started
+    if job.status != "completed":
+        raise BenchmarkError(f"Job {job.pk} failed: {job.error}")
+
+    status_started = time.perf_counter()
+    client.get(response.json()["status_url"])
+    job.refresh_from_db(fields=["write_time"])
+    return {
+        "wall": wall,
+        "setup_time": setup_time,
+        "status_time": time.perf_counter() - status_started,
+        "write_time": job.write_time,
+        "logs": TaskLog.objects.filter(job=job),
+    }
+
+
+def run_scenario(path, task_type, hosts_file, user, client, parse=False):
+    """Run one scenario cold and return its measurements."""
+    reset_state()
+    with PeakMemory() as memory:
+        if path == "view":
+            run = run_view(client, task_type, parse)
+        else:
+            run = run_nornir(hosts_file, task_type, user, parse)
+    logs = run["logs"]
+    latencies = host_latencies(logs)
+    hosts = len(latencies)
+    return {
+        "path": path,
+        "task": task_type,
+        "hosts": hosts,
+        "failed": logs.exclude(status="success")
+        .values("device_name")
+        .distinct()
+        .count(),
+        "wall": round(run["wall"], 4),
+        "throughput": round(hosts / run["wall"], 2) if run["wall"] else None,
+        "p50": _round(percentile(latencies, 50)),
+        "p99": _round(percentile(latencies, 99)),
+        "peak_rss_mb": round(memory.peak / 2**20, 1),
+        "write_time": round(run["write_time"], 4),
+        "setup_time": _round(run["setup_time"]),
+        "status_time": _round(run["status_time"]),
+    }
+
+
+def _round(value):
+    return round(value, 4) if value is not None else None
+
+
+def runner_overrides(runner=None, workers=None):
+    options = dict(getattr(settings, "NORNIR_RUNNER", {}))
+    if runner:
+        options["plugin"] = runner
+    if workers:
+        options["num_workers"] = workers
+        options["async_workers"] = workers
+    return options
+
+
+def run_benchmarks(
+    host_counts=DEFAULT_HOST_COUNTS,
+    tasks=tuple(SCENARIOS),
+    paths=PATHS,
+    farm_options=None,
+    runner=None,
+    workers=None,
+    parse=False,
+    progress=None,
+):
+    """Run every task and path at every host count against one fake farm.
+
+    Returns a list of result dicts, calling ``progress`` with each as it
+    completes. Everything is written to a throwaway test database, the
+    view path inventory comes from its NetworkDevice table, and the result
+    cache is bypassed so every host is really queried.
+    """
+    host_counts = sorted(set(host_counts))
+    # Our side of the farm's sessions, pooled or not
+    raise_open_file_limit(max(host_counts) * 3 + 256)
+    overrides = override_settings(
+        NORNIR_RUNNER=runner_overrides(runner, workers),
+        NORNIR_INVENTORY={
+            **getattr(settings, "NORNIR_INVENTORY", {}),
+            "plugin": "DjangoInventory",
+        },
+        ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"],
+    )
+    results = []
+    try:
+        with benchmark_database(), overrides, FakeFarm(
+            max(host_counts), **(farm_options or {})
+        ) as farm:
+            user = get_user_model().objects.create_user("benchmark")
+            client = Client()
+            client.force_login(user)
+            for count in host_counts:
+                hosts_file = farm.write_inventory(count)
+                if "view" in paths:
+                    hosts = first_hosts(farm.hosts, count)
+                    apply_device_diff(diff_devices(hosts, prune=True))
+                for task_type in tasks:
+                    for path in paths:
+                        result = run_scenario(
+                            path, task_type, hosts_file, user, client, parse
+                        )
+                        results.append(result)
+                        if progress is not None:
+                            progress(result)
+    finally:
+        get_connection_pool().close_all()
+        invalidate_nornir_cache()
+        shutdown_parse_pool()
+    return results
+
+
+def environment():
+    """Describe the machine and versions a set of results was measured on."""
+    versions = {"python": platform.python_version(), "django": django.get_version()}
+    for package in ("nornir", "nornir_netmiko", "netmiko", "asyncssh"):
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            pass
+    return {
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "database": connection.vendor,
+        "versions": versions,
+    }
+
+
+def benchmark_report(results, options):
+    return {
+        "created_at": timezone.now().isoformat(),
+        "environment": environment(),
+        "options": options,
+        "results": results,
+    }
+
+
+def load_report(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_report(report, path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+        f.write("\n")
+
+
+def compare_results(results, baseline, tolerance=0.25):
+    """Return the metrics that got worse than ``baseline`` by over ``tolerance``.
+
+    Results are matched on path, task and host count; scenarios missing from
+    either side are not compared.
+    """
+    previous = {
+        (row["path"], row["task"], row["hosts"]): row for row in baseline["results"]
+    }
+    regressions = []
+    for result in results:
+        base = previous.get((result["path"], result["task"], result["hosts"]))
+        if base is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            value, old = result.get(metric), base.get(metric)
+            if not value or not old:
+                continue
+            if abs(value - old) < NOISE_FLOOR.get(metric, 0):
+                continue
+            change = (old - value) / old if higher_is_better else (value - old) / old
+            if change > tolerance:
+                regressions.append(
+                    {
+                        "path": result["path"],
+                        "task": result["task"],
+                        "hosts": result["hosts"],
+                        "metric": metric,
+                        "baseline": old,
+                        "value": value,
+                        "change": round(change, 3),
+                    }
+                )
+    return regressions
@@ -0,0 +1,59 @@
+import hashlib
+import zlib
+
+from .models import OutputBlob
+
+COMPRESSION_LEVEL = 6
+LOOKUP_CHUNK_SIZE = 500  # stay under SQLite's bound-parameter limit
+
+
+def output_digest(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def make_blob(text, digest=None):
+    data = text.encode("utf-8")
+    return OutputBlob(
+        digest=digest or hashlib.sha256(data).hexdigest(),
+        data=zlib.compress(data, COMPRESSION_LEVEL),
+        size=len(data),
+    )
+
+
+def store_outputs(texts):
+    """Store each distinct text once and return the digest for every input.
+
+    Only blobs whose digest is not already in the table are compressed and
+    inserted, so re-polling a device whose output hasn't changed writes
+    nothing but the TaskLog row pointing at the existing blob.
+    """
+    texts = ["" if text is None else str(text) for text in texts]
+    digests = [output_digest(text) for text in texts]
+    unique = dict(zip(digests, texts))
+
+    existing = set()
+    candidates = list(unique)
+    for i in range(0, len(candidates), LOOKUP_CHUNK_SIZE):
+        chunk = candidates[i : i + LOOKUP_CHUNK_SIZE]
+        existing.update(
+            OutputBlob.objects.filter(digest__in=chunk).values_list("digest", flat=True)
+        )
+    new_blobs = [
+        make_blob(text, digest)
+        for digest, text in unique.items()
+        if digest not in existing
+    ]
+    OutputBlob.objects.bulk_create(
+        new_blobs, batch_size=LOOKUP_CHUNK_SIZE, ignore_conflicts=True
+    )
+    return digests
+
+
+def load_outputs(logs):
+    """Return ``{log.pk: output}`` for ``logs`` using a single blob query."""
+    digests = {log.output_blob_id for log in logs if log.output_blob_id}
+    blobs = OutputBlob.objects.in_bulk(list(digests))
+    return {
+        log.pk: blobs[log.output_blob_id].text() if log.output_blob_id else ""
+        for log in logs
+    }
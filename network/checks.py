@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.checks import Error, Warning, register
+
+from core.async_ssh import ASYNCSSH_MISSING, asyncssh
+from core.runners import get_runner_settings
+
+from .scheduler import poll_config_error
+
+
+@register()
+def check_runner(app_configs, **kwargs):
+    """Refuse to start with the asyncio runner selected but asyncssh missing."""
+    if get_runner_settings()["plugin"] == "asyncio" and asyncssh is None:
+        return [
+            Error(
+                ASYNCSSH_MISSING,
+                hint='Install it or set NORNIR_RUNNER["plugin"] to "threaded".',
+                id="network.E001",
+            )
+        ]
+    return []
+
+
+@register()
+def check_poll_schedule(app_configs, **kwargs):
+    """Report POLL_SCHEDULE entries the polling daemon will skip."""
+    warnings = []
+    for task_type, config in getattr(settings, "POLL_SCHEDULE", {}).items():
+        error = poll_config_error(config)
+        if error:
+            warnings.append(
+                Warning(
+                    f"POLL_SCHEDULE[{task_type!r}]: {error}",
+                    hint="The polling daemon skips this task until it is fixed.",
+                    id="network.W001",
+                )
+            )
+    return warnings
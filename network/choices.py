@@ -0,0 +1,83 @@
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max
+
+from .models import TaskLogChoice
+
+CHOICES_CACHE_KEY = "tasklog_filter_choices"
+
+# Values this process already knows are in TaskLogChoice, so repeated flushes
+# for the same devices don't write anything.
+_known_choices = None
+_known_lock = threading.Lock()
+
+
+def choices_version():
+    """Return a marker that changes whenever TaskLogChoice rows come or go.
+
+    Read from the table, so choices written by a job worker are seen by the
+    web processes at once, whatever cache backend is configured.
+    """
+    totals = TaskLogChoice.objects.aggregate(last=Max("id"), count=Count("id"))
+    return (totals["last"], totals["count"])
+
+
+def get_filter_choices():
+    """Return ``{"device_name": [...], "task_type": [...]}`` for the log filters."""
+    version = choices_version()
+    cached = cache.get(CHOICES_CACHE_KEY)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    choices = {field: [] for field, _ in TaskLogChoice.FIELD_CHOICES}
+    rows = TaskLogChoice.objects.order_by("value").values_list("field", "value")
+    for field, value in rows:
+        choices[field].append(value)
+    cache.set(
+        CHOICES_CACHE_KEY,
+        (version, choices),
+        getattr(settings, "TASKLOG_CHOICES_CACHE_TIMEOUT", 300),
+    )
+    return choices
+
+
+def invalidate_filter_choices():
+    global _known_choices
+    with _known_lock:
+        _known_choices = None
+    cache.delete(CHOICES_CACHE_KEY)
+
+
+def _remember_choices(new):
+    with _known_lock:
+        if _known_choices is not None:
+            _known_choices.update(new)
+
+
+def record_filter_choices(logs):
+    """Add any device names or task types from ``logs`` not seen before.
+
+    Call inside the transaction that writes ``logs``; the new rows are picked
+    up by get_filter_choices once it commits.
+    """
+    global _known_choices
+    with _known_lock:
+        if _known_choices is None:
+            _known_choices = set(TaskLogChoice.objects.values_list("field", "value"))
+        new = {
+            pair
+            for log in logs
+            for pair in (("device_name", log.device_name), ("task_type", log.task_type))
+        } - _known_choices
+    if not new:
+        return 0
+
+    TaskLogChoice.objects.bulk_create(
+        [TaskLogChoice(field=field, value=value) for field, value in new],
+        ignore_conflicts=True,
+    )
+    transaction.on_commit(lambda: _remember_choices(new))
+    return len(new)
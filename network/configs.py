@@ -0,0 +1,254 @@
+import difflib
+import hashlib
+import json
+import logging
+import re
+import zlib
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from .models import ConfigVersion
+
+logger = logging.getLogger(__name__)
+
+COMPRESSION_LEVEL = 6
+LOOKUP_CHUNK_SIZE = 200
+# Times store_config_versions rebuilds a batch that lost a version number race
+VERSION_ATTEMPTS = 5
+
+# Lines IOS rewrites on every "show running-config" even if nothing changed
+VOLATILE_LINES = re.compile(
+    r"^(Building configuration\.\.\.|Current configuration\s*:.*"
+    r"|! Last configuration change at .*|! NVRAM config last updated at .*"
+    r"|ntp clock-period .*)$"
+)
+
+
+def normalize_config(text):
+    """Strip volatile lines and trailing whitespace from a running config."""
+    lines = text.replace("\r\n", "\n").split("\n")
+    lines = [line.rstrip() for line in lines if not VOLATILE_LINES.match(line.strip())]
+    return "\n".join(lines).strip("\n")
+
+
+def config_digest(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def make_delta(old_lines, new_lines):
+    """Return the edit script turning ``old_lines`` into ``new_lines``.
+
+    Each operation is ``[start, end, lines]``: replace ``old_lines[start:end]``
+    with ``lines``. Unchanged ranges are not stored.
+    """
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines)
+    return [
+        [i1, i2, new_lines[j1:j2]]
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        if tag != "equal"
+    ]
+
+
+def apply_delta(old_lines, delta):
+    lines = []
+    position = 0
+    for start, end, replacement in delta:
+        lines.extend(old_lines[position:start])
+        lines.extend(replacement)
+        position = end
+    lines.extend(old_lines[position:])
+    return lines
+
+
+def _pack(payload):
+    return zlib.compress(json.dumps(payload).encode("utf-8"), COMPRESSION_LEVEL)
+
+
+def _unpack(data):
+    return json.loads(zlib.decompress(bytes(data)))
+
+
+def _replay(chain):
+    """Rebuild the config lines from a snapshot followed by its deltas."""
+    lines = None
+    for version in chain:
+        payload = _unpack(version.data)
+        lines = payload if version.is_snapshot else apply_delta(lines, payload)
+    return lines
+
+
+def _load_heads(device_names):
+    """Return the latest version of each device, without its payload."""
+    heads = {}
+    names = list(device_names)
+    for i in range(0, len(names), LOOKUP_CHUNK_SIZE):
+        for version in ConfigVersion.objects.filter(
+            device_name__in=names[i : i + LOOKUP_CHUNK_SIZE], is_latest=True
+        ).defer("data"):
+            heads[version.device_name] = version
+    return heads
+
+
+def _load_lines(heads):
+    """Rebuild the config lines of the given head versions in one query per chunk."""
+    chains = {head.device_name: [] for head in heads}
+    for i in range(0, len(heads), LOOKUP_CHUNK_SIZE):
+        condition = Q()
+        for head in heads[i : i + LOOKUP_CHUNK_SIZE]:
+            condition |= Q(
+                device_name=head.device_name,
+                version__gte=head.base_version,
+                version__lte=head.version,
+            )
+        for version in ConfigVersion.objects.filter(condition).order_by(
+            "device_name", "version"
+        ):
+            chains[version.device_name].append(version)
+    return {name: _replay(chain) for name, chain in chains.items()}
+
+
+def build_config_versions(logs, outputs):
+    """Turn backed-up running configs into new ConfigVersion rows.
+
+    ``logs`` and ``outputs`` are parallel lists from the TaskLog sink. Returns
+    the unsaved versions and the outputs to log instead of the full configs,
+    a one-line summary per successful backup. Configs whose hash matches the
+    device's latest version are skipped. A changed config is stored as a
+    delta against the previous version, or as a full snapshot every
+    ``CONFIG_SNAPSHOT_INTERVAL`` versions so reconstruction never replays a
+    long chain.
+    """
+    interval = getattr(settings, "CONFIG_SNAPSHOT_INTERVAL", 20)
+    outputs = list(outputs)
+    configs = {}
+    for i, log in enumerate(logs):
+        if log.status == "success":
+            text = normalize_config(outputs[i])
+            configs[i] = (text, config_digest(text))
+    if not configs:
+        return [], outputs
+
+    heads = _load_heads({logs[i].device_name for i in configs})
+    # Only devices whose config changed need their previous text rebuilt
+    changed = {
+        logs[i].device_name
+        for i, (_, digest) in configs.items()
+        if logs[i].device_name in heads and heads[logs[i].device_name].digest != digest
+    }
+    previous = _load_lines([heads[name] for name in changed])
+
+    versions = []
+    for i, (text, digest) in configs.items():
+        log = logs[i]
+        head = heads.get(log.device_name)
+        if head is not None and head.digest == digest:
+            outputs[i] = (
+                f"Config unchanged since version {head.version} (sha256 {digest[:12]})"
+            )
+            continue
+
+        lines = text.split("\n")
+        version = ConfigVersion(
+            device_name=log.device_name,
+            version=head.version + 1 if head else 1,
+            digest=digest,
+            size=len(text),
+            line_count=len(lines),
+            is_latest=True,
+        )
+        if head is None or version.version - head.base_version >= interval:
+            version.base_version = version.version
+            version.is_snapshot = True
+            version.data = _pack(lines)
+            outputs[i] = (
+                f"Stored config version {version.version} "
+                f"(snapshot, {len(lines)} lines)"
+            )
+        else:
+            delta = make_delta(previous[log.device_name], lines)
+            version.base_version = head.base_version
+            version.data = _pack(delta)
+            version.lines_added = sum(len(op[2]) for op in delta)
+            version.lines_removed = sum(op[1] - op[0] for op in delta)
+            outputs[i] = (
+                f"Stored config version {version.version} "
+                f"(+{version.lines_added} -{version.lines_removed} lines)"
+            )
+
+        if head is not None:
+            head.is_latest = False
+        # Not fields: the log it is linked to once saved, the text to index
+        # and the stored version it supersedes, whose index entry is dropped
+        version.log = log
+        version.text = text
+        version.replaces = None
+        if head is not None and head.pk is not None:
+            version.replaces = (head.pk, "\n".join(previous[log.device_name]))
+        versions.append(version)
+        # A second backup of the device in the same batch diffs against this one
+        heads[log.device_name] = version
+        previous[log.device_name] = lines
+    return versions, outputs
+
+
+def save_config_versions(versions):
+    """Insert versions from build_config_versions and retire the old heads."""
+    if not versions:
+        return
+    names = list({version.device_name for version in versions})
+    for i in range(0, len(names), LOOKUP_CHUNK_SIZE):
+        ConfigVersion.objects.filter(
+            device_name__in=names[i : i + LOOKUP_CHUNK_SIZE], is_latest=True
+        ).update(is_latest=False)
+    ConfigVersion.objects.bulk_create(versions, batch_size=LOOKUP_CHUNK_SIZE)
+
+
+def store_config_versions(logs, outputs, attempts=VERSION_ATTEMPTS):
+    """Build and insert the config versions of a batch of backups.
+
+    Version numbers follow the heads read when the batch is built, so a
+    concurrent backup of the same device can take a number first. The insert
+    runs in a savepoint: on a ``unique_config_version`` collision only the
+    config versions are rolled back, rebuilt against the new heads and
+    inserted again, and the rest of the caller's transaction is kept. Returns
+    the same as build_config_versions; link_config_versions points the
+    versions at their logs once those are saved.
+    """
+    for attempt in range(1, attempts + 1):
+        versions, summaries = build_config_versions(logs, outputs)
+        try:
+            with transaction.atomic():
+                save_config_versions(versions)
+            return versions, summaries
+        except IntegrityError:
+            if attempt == attempts:
+                raise
+            logger.info(
+                f"Config version numbers taken by a concurrent backup, "
+                f"retrying (attempt {attempt} of {attempts})"
+            )
+
+
+def link_config_versions(versions):
+    """Set the task_log of versions from store_config_versions."""
+    for version in versions:
+        version.task_log = version.log
+    ConfigVersion.objects.bulk_update(
+        versions, ["task_log"], batch_size=LOOKUP_CHUNK_SIZE
+    )
+
+
+def reconstruct_config(device_name, version=None):
+    """Return the text of a device's config ``version`` (default: latest)."""
+    versions = ConfigVersion.objects.filter(device_name=device_name)
+    target = (
+        versions.filter(version=version) if version else versions.filter(is_latest=True)
+    ).first()
+    if target is None:
+        return None
+    chain = versions.filter(
+        version__gte=target.base_version, version__lte=target.version
+    ).order_by("version")
+    return "\n".join(_replay(chain))
@@ -0,0 +1,64 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .blobs import LOOKUP_CHUNK_SIZE
+from .models import ChangeCounter
+
+
+def counter_value(name):
+    """Return the current value of counter ``name``; 0 if never bumped."""
+    return (
+        ChangeCounter.objects.filter(name=name).values_list("value", flat=True).first()
+        or 0
+    )
+
+
+def counter_values(names):
+    """Return ``{name: value}`` of the counters in ``names`` bumped so far."""
+    names = list(names)
+    values = {}
+    for i in range(0, len(names), LOOKUP_CHUNK_SIZE):
+        values.update(
+            ChangeCounter.objects.filter(
+                name__in=names[i : i + LOOKUP_CHUNK_SIZE]
+            ).values_list("name", "value")
+        )
+    return values
+
+
+def bump_counter(name):
+    """Increment counter ``name``.
+
+    Call it inside the transaction that makes the change, so readers never
+    see the new value before the data it stands for.
+    """
+    rows = ChangeCounter.objects.filter(name=name)
+    if rows.update(value=F("value") + 1):
+        return
+    try:
+        with transaction.atomic():
+            ChangeCounter.objects.create(name=name, value=1)
+    except IntegrityError:
+        # Another writer created the row between our UPDATE and INSERT
+        rows.update(value=F("value") + 1)
+
+
+def bump_counters(names):
+    """Increment every counter in ``names``, a chunk at a time."""
+    names = list(dict.fromkeys(names))
+    for i in range(0, len(names), LOOKUP_CHUNK_SIZE):
+        chunk = names[i : i + LOOKUP_CHUNK_SIZE]
+        existing = set(
+            ChangeCounter.objects.filter(name__in=chunk).values_list("name", flat=True)
+        )
+        ChangeCounter.objects.filter(name__in=existing).update(value=F("value") + 1)
+        missing = [name for name in chunk if name not in existing]
+        try:
+            with transaction.atomic():
+                ChangeCounter.objects.bulk_create(
+                    [ChangeCounter(name=name, value=1) for name in missing]
+                )
+        except IntegrityError:
+            # Another writer created some of them first
+            for name in missing:
+                bump_counter(name)
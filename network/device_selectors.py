@@ -0,0 +1,166 @@
+import threading
+
+from core.nornir_init import inventory_attributes, inventory_key
+
+from .models import DeviceSelector
+
+SELECTOR_FIELDS = ("name", "group", "platform", "site", "role", "tag")
+MAX_SUGGESTIONS = 20
+
+_index_lock = threading.Lock()
+_index_cache = {"key": None, "index": None}
+
+
+class SelectorError(ValueError):
+    pass
+
+
+class DeviceIndex:
+    """Inverted indexes from each inventory attribute value to device names."""
+
+    def __init__(self, records):
+        self.names = set()
+        self.values = {field: {} for field in SELECTOR_FIELDS}
+        for name, platform, groups, site, role, tags in records:
+            if name in self.names:
+                continue  # duplicate rows use the first one, like the inventory
+            self.names.add(name)
+            self._add("name", name, name)
+            if platform:
+                self._add("platform", platform, name)
+            if site:
+                self._add("site", site, name)
+            if role:
+                self._add("role", role, name)
+            for group in groups or []:
+                self._add("group", group, name)
+            for tag in tags or []:
+                self._add("tag", tag, name)
+
+    def _add(self, field, value, name):
+        self.values[field].setdefault(str(value), set()).add(name)
+
+    def lookup(self, field, value):
+        """Return the devices whose ``field`` is ``value``; ``abc*`` is a prefix."""
+        values = self.values[field]
+        if value.endswith("*"):
+            prefix = value[:-1]
+            matched = set()
+            for key, names in values.items():
+                if key.startswith(prefix):
+                    matched |= names
+            return matched
+        return values.get(value, set())
+
+
+def get_device_index():
+    """Return the DeviceIndex of the current inventory, rebuilt when it changes."""
+    key = inventory_key()
+    with _index_lock:
+        if _index_cache["index"] is None or _index_cache["key"] != key:
+            _index_cache.update(key=key, index=DeviceIndex(inventory_attributes()))
+        return _index_cache["index"]
+
+
+def parse_selector(query):
+    """Split a selector query into ``(negate, field, values)`` terms.
+
+    Terms separated by spaces must all match. ``field:a,b`` matches either
+    value and a leading ``-`` excludes the matches. Bare words are device
+    names and ``@name`` refers to a saved selector.
+    """
+    terms = []
+    names = []
+    for token in query.split():
+        negate = token.startswith("-")
+        token = token[1:] if negate else token
+        if token.startswith("@"):
+            terms.append((negate, "@", [token[1:]]))
+        elif ":" in token:
+            field, _, values = token.partition(":")
+            if field not in SELECTOR_FIELDS:
+                raise SelectorError(
+                    f"Unknown field {field!r}, use one of {', '.join(SELECTOR_FIELDS)}"
+                )
+            values = [value for value in values.split(",") if value]
+            if not values:
+                raise SelectorError(f"No value given for {field!r}")
+            terms.append((negate, field, values))
+        elif negate:
+            terms.append((True, "name", [token]))
+        elif token != "*":
+            names.append(token)
+    if names:
+        # "r1 r2 r3" means any of these devices, not all of them
+        terms.insert(0, (False, "name", names))
+    return terms
+
+
+def resolve_selector(query, index=None, _seen=()):
+    """Return the set of device names a selector query matches.
+
+    Only the attribute indexes are consulted: each term is a union of
+    value sets and terms are combined by intersection and difference.
+    """
+    index = index or get_device_index()
+    selected = None
+    excluded = set()
+    for negate, field, values in parse_selector(query):
+        if field == "@":
+            matched = _resolve_saved(values[0], index, _seen)
+        else:
+            matched = set()
+            for value in values:
+                matched |= index.lookup(field, value)
+        if negate:
+            excluded |= matched
+        else:
+            selected = matched if selected is None else selected & matched
+        if selected is not None and not selected:
+            break
+    if selected is None:
+        selected = index.names  # only exclusions, or "*"
+    return selected - excluded
+
+
+def _resolve_saved(name, index, seen):
+    if name in seen:
+        raise SelectorError(f"Selector @{name} refers to itself")
+    selector = DeviceSelector.objects.filter(name=name).first()
+    if selector is None:
+        raise SelectorError(f"No saved selector named @{name}")
+    return resolve_selector(selector.query, index, (*seen, name))
+
+
+def suggest(query, index=None):
+    """Return completions for the last word of a selector query."""
+    index = index or get_device_index()
+    words = query.split(" ")
+    word = words[-1]
+    prefix = "-" if word.startswith("-") else ""
+    word = word[len(prefix) :]
+
+    if word.startswith("@"):
+        options = [
+            f"@{name}"
+            for name in DeviceSelector.objects.filter(
+                name__startswith=word[1:]
+            ).values_list("name", flat=True)[:MAX_SUGGESTIONS]
+        ]
+    elif ":" in word:
+        field, _, values = word.partition(":")
+        if field not in SELECTOR_FIELDS:
+            return []
+        head, _, partial = values.rpartition(",")
+        head = f"{head}," if head else ""
+        options = [
+            f"{field}:{head}{value}"
+            for value in sorted(index.values[field])
+            if value.startswith(partial)
+        ][:MAX_SUGGESTIONS]
+    else:
+        options = [f"{field}:" for field in SELECTOR_FIELDS if field.startswith(word)]
+        options += sorted(
+            name for name in index.values["name"] if name.startswith(word)
+        )[:MAX_SUGGESTIONS]
+    return [prefix + option for option in options[:MAX_SUGGESTIONS]]
@@ -0,0 +1,117 @@
+import logging
+
+import yaml
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from core.nornir_init import invalidate_inventory
+
+from .models import NetworkDevice
+
+logger = logging.getLogger(__name__)
+
+# The libyaml parser is an order of magnitude faster on large inventories
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+REQUIRED_FIELDS = ("hostname", "platform", "username", "password")
+SYNC_FIELDS = REQUIRED_FIELDS + ("port", "groups", "site", "role", "tags")
+BATCH_SIZE = 500
+
+
+def load_hosts_file(path):
+    """Load a Nornir hosts file, returning ``{}`` for an empty file."""
+    with open(path) as f:
+        return yaml.load(f, Loader=YamlLoader) or {}
+
+
+def host_values(data):
+    """Return the NetworkDevice field values of a hosts file entry.
+
+    Raises ValueError naming the first field that is missing or malformed.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Host entry is not a mapping")
+    missing = [field for field in REQUIRED_FIELDS if field not in data]
+    if missing:
+        raise ValueError(f"Missing required field {missing[0]!r}")
+    values = {field: data[field] for field in REQUIRED_FIELDS}
+    values["port"] = data.get("port")
+    values["groups"] = data.get("groups") or []
+    # Nornir keeps custom attributes under the host's data key
+    host_data = data.get("data") or {}
+    if not isinstance(host_data, dict):
+        raise ValueError("data is not a mapping")
+    for field in ("site", "role"):
+        values[field] = host_data.get(field) or ""
+        if not isinstance(values[field], str):
+            raise ValueError(f"data.{field} is not a string")
+    values["tags"] = host_data.get("tags") or []
+    try:
+        NetworkDevice(**values).clean()
+    except ValidationError as e:
+        raise ValueError(f"{next(iter(e.message_dict))} is not a list of names")
+    return values
+
+
+def diff_devices(hosts, prune=False):
+    """Compare inventory ``hosts`` with the NetworkDevice table.
+
+    Runs one query and returns a dict with the unsaved devices to
+    ``create``, the devices to ``update`` with their ``changes``, the pks to
+    ``delete`` when ``prune`` is set, and ``errors`` for hosts missing a
+    required field or with a malformed one. Duplicate device names in the
+    table keep their lowest id; the others are deleted on prune.
+    """
+    existing = {}
+    duplicates = []
+    for device in NetworkDevice.objects.order_by("id"):
+        if device.name in existing:
+            duplicates.append(device)
+        else:
+            existing[device.name] = device
+
+    diff = {"create": [], "update": [], "changes": {}, "delete": [], "errors": {}}
+    for name, data in hosts.items():
+        try:
+            values = host_values(data)
+        except ValueError as e:
+            diff["errors"][name] = str(e)
+            continue
+
+        device = existing.get(name)
+        if device is None:
+            diff["create"].append(NetworkDevice(name=name, **values))
+            continue
+        changed = [
+            field for field in SYNC_FIELDS if getattr(device, field) != values[field]
+        ]
+        if changed:
+            diff["changes"][name] = [
+                (field, getattr(device, field), values[field]) for field in changed
+            ]
+            for field in changed:
+                setattr(device, field, values[field])
+            diff["update"].append(device)
+
+    if prune:
+        diff["delete"] = [
+            device for name, device in existing.items() if name not in hosts
+        ] + duplicates
+    return diff
+
+
+def apply_device_diff(diff):
+    """Write a diff from diff_devices in one transaction."""
+    delete = [device.pk for device in diff["delete"]]
+    with transaction.atomic():
+        NetworkDevice.objects.bulk_create(diff["create"], batch_size=BATCH_SIZE)
+        NetworkDevice.objects.bulk_update(
+            diff["update"], SYNC_FIELDS, batch_size=BATCH_SIZE
+        )
+        for i in range(0, len(delete), BATCH_SIZE):
+            NetworkDevice.objects.filter(pk__in=delete[i : i + BATCH_SIZE]).delete()
+        invalidate_inventory()
+    logger.info(
+        f"Synchronized devices: {len(diff['create'])} added, "
+        f"{len(diff['update'])} updated, {len(delete)} deleted"
+    )
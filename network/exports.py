@@ -0,0 +1,76 @@
+import csv
+import io
+import json
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+
+from .blobs import load_outputs
+from .retention import ARCHIVE_FIELDS, archive_record
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+}
+# Same columns as the retention archives, so query_task_log_archive reads
+# NDJSON exports too; parsed rows are left out to keep it one query per chunk
+EXPORT_FIELDS = tuple(field for field in ARCHIVE_FIELDS if field != "parsed")
+
+
+def export_records(logs, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield lists of export records for ``logs``, ``chunk_size`` at a time.
+
+    Rows are read with a server-side cursor (``iterator``) and the outputs
+    of each chunk are loaded with one blob query, so memory stays bounded by
+    the chunk whatever the number of rows.
+    """
+    rows = logs.select_related("user").iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        outputs = load_outputs(chunk)
+        yield [
+            {
+                field: value
+                for field, value in archive_record(log, outputs[log.pk], None).items()
+                if field in EXPORT_FIELDS
+            }
+            for log in chunk
+        ]
+
+
+def export_lines(logs, fmt, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield the export of ``logs`` as CSV or NDJSON text, one piece per chunk."""
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+        writer.writeheader()
+        yield buffer.getvalue()
+    for records in export_records(logs, chunk_size):
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+            writer.writerows(records)
+            yield buffer.getvalue()
+        else:
+            yield "".join(
+                json.dumps(record, ensure_ascii=False) + "\n" for record in records
+            )
+
+
+async def aiterate(iterator):
+    """Drive a blocking iterator from an async response, one item at a time.
+
+    Under ASGI Django would read a plain iterator to the end before sending
+    anything. Every step runs on the same thread, which keeps the database
+    cursor of ``iterator`` on the connection that opened it.
+    """
+    step = sync_to_async(next, thread_sensitive=True)
+    done = object()
+    while True:
+        item = await step(iterator, done)
+        if item is done:
+            return
+        yield item
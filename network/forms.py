@@ -1,17 +1,23 @@
 # forms.py
+from datetime import timedelta
+
 from django import forms
 
-from .models import NetworkDevice, TaskLog
+from .choices import get_filter_choices
+from .device_selectors import SELECTOR_FIELDS, SelectorError, resolve_selector
+from .models import DeviceSelector, NetworkDevice
 
 STATUS_CHOICES = [
     ("", "---------"),  # Optional: Add an empty choice for no status filter
     ("success", "Success"),
     ("failure", "Failure"),
+    ("skipped", "Skipped"),
 ]
 
 TASK_CHOICES = [
     ("show_ip", "Show IP Interface Brief"),
     ("save_config", "Save Running Config"),
+    ("backup_config", "Backup Running Config"),
     ("custom_command", "Run Custom Command"),
 ]
 
@@ -19,17 +25,72 @@ TASK_CHOICES = [
 class TaskForm(forms.Form):
     task_type = forms.ChoiceField(choices=TASK_CHOICES)
     custom_command = forms.CharField(
-        widget=forms.Textarea, required=False, label="Custom Command"
+        widget=forms.Textarea,
+        required=False,
+        label="Custom Command",
+        help_text="One command per line; the lines run in order over one session.",
+    )
+    stop_on_error = forms.BooleanField(
+        required=False,
+        label="Stop on Error",
+        help_text="Skip a device's remaining commands once one of them fails.",
+    )
+    selector = forms.CharField(
+        max_length=1000,
+        label="Devices",
+        widget=forms.TextInput(
+            attrs={
+                "autocomplete": "off",
+                "placeholder": "site:A role:access -tag:lab",
+                "class": "shadow appearance-none border rounded w-full py-2 px-3 text-gray-700 leading-tight focus:outline-none focus:shadow-outline",
+            }
+        ),
+        help_text=(
+            "Device names, or attributes such as site:A role:access. Terms must "
+            "all match, a,b matches either value, -term excludes and @name uses "
+            "a saved selector. Fields: " + ", ".join(SELECTOR_FIELDS) + "."
+        ),
+    )
+    save_as = forms.SlugField(
+        required=False,
+        max_length=100,
+        label="Save Selector As",
+        help_text="Optional name to reuse this selector later as @name.",
     )
-    devices = forms.MultipleChoiceField(
-        choices=[],  # Filled in the view dynamically
-        widget=forms.CheckboxSelectMultiple,
+    num_workers = forms.IntegerField(
+        required=False,
+        min_value=1,
+        max_value=500,
+        label="Parallel Sessions",
+        help_text="Leave empty to use the configured default.",
+    )
+    parse = forms.BooleanField(
+        required=False,
+        label="Parse Output",
+        help_text="Store structured rows parsed with ntc-templates.",
+    )
+    bypass_cache = forms.BooleanField(
+        required=False,
+        label="Bypass Cache",
+        help_text="Always query the devices instead of reusing recent show output.",
     )
 
-    def __init__(self, *args, **kwargs):
-        device_choices = kwargs.pop("device_choices", [])
-        super().__init__(*args, **kwargs)
-        self.fields["devices"].choices = device_choices
+    def clean_selector(self):
+        query = self.cleaned_data["selector"]
+        try:
+            devices = resolve_selector(query)
+        except SelectorError as e:
+            raise forms.ValidationError(str(e))
+        if not devices:
+            raise forms.ValidationError("The selector matches no devices.")
+        self.cleaned_data["devices"] = sorted(devices)
+        return query
+
+    def clean_save_as(self):
+        name = self.cleaned_data["save_as"]
+        if name and DeviceSelector.objects.filter(name=name).exists():
+            raise forms.ValidationError(f"A selector named @{name} already exists.")
+        return name
 
 
 class TaskLogFilterForm(forms.Form):
@@ -45,36 +106,62 @@ class TaskLogFilterForm(forms.Form):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        # Dynamically populate device_name choices
-        device_names = (
-            TaskLog.objects.all().values_list("device_name", flat=True).distinct()
-        )
+        # Choices come from the maintained lookup, never from the log table
+        choices = get_filter_choices()
         self.fields["device_name"].choices = [("", "---------")] + [
-            (name, name) for name in device_names
+            (name, name) for name in choices["device_name"]
         ]
-
-        # Dynamically populate task_type choices
-        task_types = (
-            TaskLog.objects.all().values_list("task_type", flat=True).distinct()
-        )
         self.fields["task_type"].choices = [("", "---------")] + [
-            (type, type) for type in task_types
+            (type, type) for type in choices["task_type"]
         ]
 
+    def filter_queryset(self, queryset):
+        """Apply the validated filters to a TaskLog queryset."""
+        device_name = self.cleaned_data.get("device_name")
+        task_type = self.cleaned_data.get("task_type")
+        status = self.cleaned_data.get("status")
+        start_date = self.cleaned_data.get("start_date")
+        end_date = self.cleaned_data.get("end_date")
+
+        if device_name:
+            queryset = queryset.filter(device_name=device_name)
+        if task_type:
+            queryset = queryset.filter(task_type=task_type)
+        if status:
+            queryset = queryset.filter(status=status)
+        if start_date:
+            queryset = queryset.filter(timestamp__gte=start_date)
+        if end_date:
+            # Add one day to the end_date to include the entire day
+            queryset = queryset.filter(timestamp__lt=end_date + timedelta(days=1))
+        return queryset
+
 
 class DeviceForm(forms.ModelForm):
+    # Stored as a JSON list, edited as comma-separated text
+    tags = forms.CharField(
+        required=False,
+        widget=forms.TextInput(attrs={"placeholder": "e.g. lab, edge"}),
+    )
+
     class Meta:
         model = NetworkDevice
-        fields = ["hostname", "name"]
+        fields = ["hostname", "name", "site", "role", "tags"]
         widgets = {
             "password": forms.PasswordInput(),
         }
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        if self.instance.pk and isinstance(self.instance.tags, list):
+            self.initial["tags"] = ", ".join(self.instance.tags)
         for field in self.fields.values():
             field.widget.attrs.update(
                 {
                     "class": "shadow appearance-none border rounded w-full py-2 px-3 text-gray-700 leading-tight focus:outline-none focus:shadow-outline"
                 }
             )
+
+    def clean_tags(self):
+        tags = [tag.strip() for tag in self.cleaned_data["tags"].split(",")]
+        return list(dict.fromkeys(tag for tag in tags if tag))
@@ -0,0 +1,231 @@
+import logging
+import os
+import socket
+import time
+
+from django.db import close_old_connections
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from core.connection_pool import get_connection_pool
+from core.nornir_init import get_nornir_view
+from core.parsing import shutdown_parse_pool
+from core.preflight import preflight
+from core.result_cache import get_result_cache, shared_result_cache
+from core.runners import build_runner
+from core.tasks import backup_config, save_config, show_ip, run_custom_command
+
+from .metrics import job_timings
+from .models import Job, TaskLog
+from .results import TaskLogSink
+from .streaming import log_event
+from .worker_stats import REPORT_INTERVAL, remove_worker_stats, report_worker_stats
+
+logger = logging.getLogger(__name__)
+
+STATUS_BATCH_SIZE = 100  # host results returned per status poll
+
+TASK_MAP = {
+    "show_ip": show_ip,
+    "save_config": save_config,
+    "backup_config": backup_config,
+    "custom_command": run_custom_command,
+}
+
+
+def enqueue_job(
+    task_type,
+    devices,
+    user=None,
+    custom_command=None,
+    num_workers=None,
+    parse=False,
+    use_cache=True,
+    stop_on_error=False,
+):
+    """Queue a task for the worker pool and return the Job row."""
+    job = Job.objects.create(
+        task_type=task_type,
+        devices=list(devices),
+        user=user,
+        custom_command=custom_command if task_type == "custom_command" else None,
+        num_workers=num_workers,
+        parse=parse,
+        use_cache=use_cache,
+        stop_on_error=stop_on_error,
+    )
+    logger.info(f"Queued job {job.pk} ({task_type}) for {len(job.devices)} devices")
+    return job
+
+
+def claim_job(worker_name):
+    """Atomically claim the oldest queued job, or return None if there is none."""
+    while True:
+        job_id = (
+            Job.objects.filter(status="queued")
+            .order_by("created_at", "id")
+            .values_list("id", flat=True)
+            .first()
+        )
+        if job_id is None:
+            return None
+
+        # The conditional UPDATE is the lock: only one worker can move the row
+        # out of "queued", the others see 0 rows updated and try the next job.
+        claimed = Job.objects.filter(id=job_id, status="queued").update(
+            status="running", worker=worker_name, started_at=timezone.now()
+        )
+        if claimed:
+            return Job.objects.get(id=job_id)
+
+
+def run_job(job):
+    """Execute a claimed job and record the per-host results."""
+    task_func = TASK_MAP[job.task_type]
+    sink = TaskLogSink(
+        job.task_type,
+        user=job.user,
+        job=job,
+        custom_command=job.custom_command,
+        release_results=True,
+        parse=job.parse,
+    )
+
+    try:
+        nr = get_nornir_view(job.devices or None)
+        # Devices removed since the job was queued are logged as skipped, so
+        # the job's progress still adds up to its total
+        sink.add_unreachable(
+            {
+                name: ("skipped", "Not in inventory")
+                for name in job.devices
+                if name not in nr.inventory.hosts
+            }
+        )
+        # Unreachable devices are logged straight away instead of each
+        # holding a worker until its connection times out
+        subset, unreachable = preflight(nr)
+        sink.add_unreachable(unreachable)
+        subset = subset.with_processors([sink])
+        if job.num_workers:
+            subset = subset.with_runner(build_runner(num_workers=job.num_workers))
+        try:
+            with shared_result_cache(subset.inventory.hosts), sink:
+                if job.task_type == "custom_command":
+                    subset.run(
+                        task=task_func,
+                        command=job.custom_command,
+                        use_cache=job.use_cache,
+                        stop_on_error=job.stop_on_error,
+                    )
+                else:
+                    subset.run(task=task_func, use_cache=job.use_cache)
+        finally:
+            # Tasks hand their sessions back as they finish; close any left
+            # attached to the cached hosts, such as unpooled ones.
+            nr.close_connections(on_good=True, on_failed=True)
+        job.status = "completed"
+    except Exception as e:
+        logger.exception(f"Error executing job {job.pk} ({job.task_type}): {e}")
+        job.status = "failed"
+        job.error = str(e)
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "error", "finished_at"])
+    return job
+
+
+def requeue_running_jobs():
+    """Put jobs left in "running" by a crashed worker back on the queue."""
+    return Job.objects.filter(status="running").update(
+        status="queued", worker="", started_at=None
+    )
+
+
+def get_worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def worker_loop(poll_interval=1.0, stop_event=None):
+    """Claim and run jobs until ``stop_event`` is set."""
+    worker_name = get_worker_name()
+    logger.info(f"Job worker {worker_name} started")
+    report_worker_stats(worker_name, "job")
+    reported_at = time.monotonic()
+
+    while stop_event is None or not stop_event.is_set():
+        close_old_connections()
+        job = claim_job(worker_name)
+        if job is None:
+            get_connection_pool().reap()
+            if time.monotonic() - reported_at >= REPORT_INTERVAL:
+                report_worker_stats(worker_name, "job")
+                reported_at = time.monotonic()
+            time.sleep(poll_interval)
+            continue
+
+        logger.info(f"Worker {worker_name} running job {job.pk}")
+        run_job(job)
+        logger.info(
+            f"Connection pool after job {job.pk}: {get_connection_pool().stats()}"
+        )
+        cache = get_result_cache()
+        if cache is not None:
+            logger.info(f"Result cache after job {job.pk}: {cache.stats()}")
+        report_worker_stats(worker_name, "job")
+        reported_at = time.monotonic()
+
+    remove_worker_stats(worker_name)
+    get_connection_pool().close_all()
+    shutdown_parse_pool()
+
+    logger.info(f"Job worker {worker_name} stopped")
+
+
+def job_progress(job, since=0, limit=STATUS_BATCH_SIZE):
+    """Return a JSON-serialisable snapshot of a job's progress.
+
+    Host counts come from one aggregate query. Only the results logged
+    after TaskLog id ``since`` are included, at most ``limit`` of them, so a
+    poll costs the same however many hosts have already finished; pass the
+    returned ``last_id`` back as ``since`` to get the next ones. ``more`` is
+    set while results are left to fetch.
+    """
+    logs = TaskLog.objects.filter(job=job)
+    single = Q(batch_id=None)
+    counts = logs.aggregate(
+        # The first row of a batch counts its host as completed
+        completed=Count("id", filter=single | Q(batch_index=0)),
+        succeeded=Count("id", filter=single & Q(status="success")),
+        failed=Count("id", filter=single & Q(status="failure")),
+        skipped=Count("id", filter=single & Q(status="skipped")),
+        batches=Count("batch_id", distinct=True),
+        # A batch fails its host if any of its commands failed
+        failed_batches=Count("batch_id", distinct=True, filter=~Q(status="success")),
+    )
+    results = list(
+        logs.filter(id__gt=since)
+        .select_related("output_blob")
+        .order_by("id")[: limit + 1]
+    )
+    more = len(results) > limit
+    results = results[:limit]
+
+    return {
+        "id": job.pk,
+        "task_type": job.task_type,
+        "status": job.status,
+        "error": job.error,
+        "total": len(job.devices),
+        "completed": counts["completed"],
+        "succeeded": counts["succeeded"] + counts["batches"] - counts["failed_batches"],
+        "failed": counts["failed"] + counts["failed_batches"],
+        "skipped": counts["skipped"],
+        "created_at": job.created_at.isoformat(),
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "hosts": [log_event(log) for log in results],
+        "last_id": results[-1].pk if results else since,
+        "more": more,
+        "timings": job_timings(job) if job.is_finished and not more else None,
+    }
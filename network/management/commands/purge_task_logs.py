@@ -0,0 +1,103 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from network.retention import (
+    ARCHIVE_FORMATS,
+    ArchiveError,
+    get_retention_days,
+    open_archive,
+    purge_task_logs,
+    retention_policies,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Archive TaskLog rows older than their retention period "
+        "(TASKLOG_RETENTION_DAYS) and delete them in small batches"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--task-type",
+            nargs="+",
+            dest="task_types",
+            help="Only purge these task types (default: all)",
+        )
+        parser.add_argument(
+            "--archive-dir",
+            default=str(getattr(settings, "TASKLOG_ARCHIVE_DIR", "archive")),
+            help="Directory the archives are written to (default: TASKLOG_ARCHIVE_DIR)",
+        )
+        parser.add_argument(
+            "--format",
+            choices=ARCHIVE_FORMATS,
+            default="ndjson",
+            help="gzip-compressed NDJSON, or Parquet (needs pyarrow)",
+        )
+        parser.add_argument(
+            "--no-archive",
+            action="store_true",
+            help="Delete the rows without archiving them",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=getattr(settings, "TASKLOG_PURGE_BATCH_SIZE", 500),
+            help="Rows archived and deleted per transaction",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0.0,
+            help="Seconds to wait between batches",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only count the rows that would be purged",
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1")
+
+        retention = get_retention_days()
+        total = 0
+        for label, logs in retention_policies(
+            retention, task_types=options["task_types"]
+        ):
+            days = retention[label]
+            if options["dry_run"]:
+                count = purge_task_logs(logs, dry_run=True)
+                self.stdout.write(f"{label}: {count} rows older than {days} days")
+                total += count
+                continue
+
+            archive = None
+            if not options["no_archive"]:
+                try:
+                    archive = open_archive(
+                        options["archive_dir"], label, options["format"]
+                    )
+                except (ArchiveError, OSError) as e:
+                    raise CommandError(str(e))
+            try:
+                count = purge_task_logs(
+                    logs,
+                    archive=archive,
+                    batch_size=options["batch_size"],
+                    pause=options["pause"],
+                )
+            except OSError as e:
+                raise CommandError(f"Cannot write the archive: {e}")
+            line = f"{label}: purged {count} rows older than {days} days"
+            if archive is not None and count:
+                line += f", archived to {archive.path}"
+            self.stdout.write(line)
+            total += count
+
+        if options["dry_run"]:
+            self.stdout.write(f"{total} rows would be purged")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Purged {total} rows"))
@@ -0,0 +1,83 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from network.retention import (
+    ArchiveError,
+    filter_records,
+    parse_timestamp,
+    read_archive,
+)
+
+
+class Command(BaseCommand):
+    help = "Search TaskLog rows archived by purge_task_logs, without the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "paths",
+            nargs="+",
+            metavar="PATH",
+            help="Archive files, directories of archives or glob patterns",
+        )
+        parser.add_argument("--device", help="Exact device name")
+        parser.add_argument("--task-type", help="Exact task type")
+        parser.add_argument("--status", choices=["success", "failure", "skipped"])
+        parser.add_argument(
+            "--since", help="Logged at or after this ISO date or datetime"
+        )
+        parser.add_argument("--until", help="Logged before this ISO date or datetime")
+        parser.add_argument(
+            "--contains",
+            help="Text in the output or custom command, case-insensitive",
+        )
+        parser.add_argument(
+            "--limit", type=int, help="Stop after this many matching rows"
+        )
+        parser.add_argument(
+            "--count", action="store_true", help="Only print the number of matches"
+        )
+        parser.add_argument(
+            "--json",
+            action="store_true",
+            help="Print the full records as NDJSON, including the output",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            since = options["since"] and parse_timestamp(options["since"])
+            until = options["until"] and parse_timestamp(options["until"])
+        except ValueError as e:
+            raise CommandError(f"Invalid date: {e}")
+
+        records = filter_records(
+            read_archive(options["paths"]),
+            device=options["device"],
+            task_type=options["task_type"],
+            status=options["status"],
+            since=since,
+            until=until,
+            contains=options["contains"],
+        )
+        matches = 0
+        try:
+            for record in records:
+                matches += 1
+                if not options["count"]:
+                    self.stdout.write(self.format_record(record, options["json"]))
+                if options["limit"] and matches >= options["limit"]:
+                    break
+        except ArchiveError as e:
+            raise CommandError(str(e))
+        if options["count"]:
+            self.stdout.write(str(matches))
+
+    def format_record(self, record, as_json):
+        if as_json:
+            return json.dumps(record, ensure_ascii=False)
+        command = f" {record['custom_command']!r}" if record["custom_command"] else ""
+        first_line = (record["output"] or "").strip().split("\n", 1)[0][:80]
+        return (
+            f"{record['timestamp']}  {record['device_name']}  {record['task_type']}"
+            f"{command}  {record['status']}  {first_line}"
+        )
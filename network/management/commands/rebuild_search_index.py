@@ -0,0 +1,77 @@
+import logging
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from network.configs import reconstruct_config
+from network.models import ConfigVersion, OutputBlob, TaskLog
+from network.search import (
+    clear_search_index,
+    command_digest,
+    drop_superseded_configs,
+    index_documents,
+    search_backend,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Index stored task output, custom commands and latest configs for search"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Drop the existing index first instead of only adding what's missing",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Documents indexed per transaction",
+        )
+
+    def handle(self, *args, **options):
+        if search_backend() is None:
+            self.stderr.write("Full-text search needs SQLite or PostgreSQL")
+            return
+        batch_size = options["batch_size"]
+        if options["clear"]:
+            clear_search_index()
+        else:
+            dropped = drop_superseded_configs(batch_size)
+            if dropped:
+                self.stdout.write(f"Dropped {dropped} superseded config versions")
+
+        total = 0
+
+        def documents():
+            for blob in OutputBlob.objects.iterator(chunk_size=batch_size):
+                yield ("output", blob.digest, "", blob.text())
+            commands = (
+                TaskLog.objects.filter(task_type="custom_command")
+                .exclude(custom_command=None)
+                .values_list("custom_command", flat=True)
+                .distinct()
+            )
+            for command in commands.iterator(chunk_size=batch_size):
+                yield ("command", command_digest(command), command, command)
+            latest = ConfigVersion.objects.filter(is_latest=True).defer("data")
+            for version in latest.iterator(chunk_size=batch_size):
+                text = reconstruct_config(version.device_name, version.version)
+                yield ("config", str(version.pk), str(version), text)
+
+        batch = []
+        for document in documents():
+            batch.append(document)
+            if len(batch) >= batch_size:
+                with transaction.atomic():
+                    total += index_documents(batch)
+                batch = []
+        if batch:
+            with transaction.atomic():
+                total += index_documents(batch)
+
+        logger.info(f"Search index rebuilt, {total} documents added")
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} new documents"))
@@ -0,0 +1,214 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from network.benchmarks import (
+    DEFAULT_BASELINE,
+    DEFAULT_HOST_COUNTS,
+    PATHS,
+    SCENARIOS,
+    BenchmarkError,
+    benchmark_report,
+    compare_results,
+    load_report,
+    run_benchmarks,
+    save_report,
+)
+
+COLUMNS = (
+    ("path", "Path", "{}"),
+    ("task", "Task", "{}"),
+    ("hosts", "Hosts", "{}"),
+    ("failed", "Failed", "{}"),
+    ("wall", "Wall s", "{:.2f}"),
+    ("throughput", "Hosts/s", "{:.1f}"),
+    ("p50", "p50 s", "{:.3f}"),
+    ("p99", "p99 s", "{:.3f}"),
+    ("peak_rss_mb", "Peak MB", "{:.0f}"),
+    ("write_time", "DB write s", "{:.3f}"),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the tasks against a local farm of fake Cisco IOS devices "
+        "and compare the results with a saved baseline"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--hosts",
+            nargs="+",
+            type=int,
+            default=list(DEFAULT_HOST_COUNTS),
+            help="Host counts to run at (default: 10 100 1000 5000)",
+        )
+        parser.add_argument(
+            "--tasks",
+            nargs="+",
+            choices=list(SCENARIOS),
+            default=list(SCENARIOS),
+            help="Tasks to run (default: all)",
+        )
+        parser.add_argument(
+            "--paths",
+            nargs="+",
+            choices=PATHS,
+            default=list(PATHS),
+            help="Run through Nornir directly, the task view and job, or both",
+        )
+        parser.add_argument(
+            "--runner",
+            choices=["threaded", "adaptive", "asyncio"],
+            help="Runner plugin (default: NORNIR_RUNNER setting)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="Maximum number of hosts to run in parallel (default: settings)",
+        )
+        parser.add_argument(
+            "--parse",
+            action="store_true",
+            help="Parse show output with ntc-templates",
+        )
+        parser.add_argument(
+            "--base-port",
+            type=int,
+            default=20022,
+            help="Port of the first fake device (default: 20022)",
+        )
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=0.0,
+            help="Seconds the fake devices wait before every reply (default: 0)",
+        )
+        parser.add_argument(
+            "--interfaces",
+            type=int,
+            default=4,
+            help="Interfaces per fake device, sets the output size (default: 4)",
+        )
+        parser.add_argument(
+            "--failure-rate",
+            type=float,
+            default=0.0,
+            help="Share of logins the fake devices reject (default: 0)",
+        )
+        parser.add_argument(
+            "--output",
+            metavar="PATH",
+            help="Write the results as JSON to PATH",
+        )
+        parser.add_argument(
+            "--baseline",
+            metavar="PATH",
+            default=str(DEFAULT_BASELINE),
+            help="Baseline results to compare with (default: benchmarks/baseline.json)",
+        )
+        parser.add_argument(
+            "--save-baseline",
+            action="store_true",
+            help="Replace the baseline with these results instead of comparing",
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.25,
+            help="Relative slowdown reported as a regression (default: 0.25)",
+        )
+        parser.add_argument(
+            "--fail-on-regression",
+            action="store_true",
+            help="Exit with an error when a metric regressed",
+        )
+
+    def handle(self, *args, **options):
+        if any(count < 1 for count in options["hosts"]):
+            raise CommandError("Host counts must be at least 1")
+        if not 0 <= options["failure_rate"] <= 1:
+            raise CommandError("--failure-rate must be between 0 and 1")
+
+        farm_options = {
+            "base_port": options["base_port"],
+            "latency": options["latency"],
+            "interfaces": options["interfaces"],
+            "failure_rate": options["failure_rate"],
+        }
+        self.stdout.write(self.format_row({key: title for key, title, _ in COLUMNS}))
+        try:
+            results = run_benchmarks(
+                options["hosts"],
+                options["tasks"],
+                options["paths"],
+                farm_options,
+                runner=options["runner"],
+                workers=options["workers"],
+                parse=options["parse"],
+                progress=lambda result: self.stdout.write(self.format_result(result)),
+            )
+        except BenchmarkError as e:
+            raise CommandError(str(e))
+
+        report = benchmark_report(
+            results,
+            {
+                **farm_options,
+                "runner": options["runner"],
+                "workers": options["workers"],
+                "parse": options["parse"],
+            },
+        )
+        if options["output"]:
+            save_report(report, options["output"])
+            self.stdout.write(f"Wrote results to {options['output']}")
+        if options["save_baseline"]:
+            save_report(report, options["baseline"])
+            self.stdout.write(
+                self.style.SUCCESS(f"Saved the baseline to {options['baseline']}")
+            )
+            return
+        self.compare(report, options)
+
+    def compare(self, report, options):
+        try:
+            baseline = load_report(options["baseline"])
+        except FileNotFoundError:
+            self.stdout.write(
+                f"No baseline at {options['baseline']}; save one with --save-baseline"
+            )
+            return
+
+        if baseline.get("options") != report["options"]:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"The baseline was measured with other options: "
+                    f"{baseline.get('options')}"
+                )
+            )
+        regressions = compare_results(report["results"], baseline, options["tolerance"])
+        if not regressions:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"No regressions against the baseline of {baseline['created_at']}"
+                )
+            )
+            return
+        for row in regressions:
+            self.stdout.write(
+                self.style.ERROR(
+                    f"{row['path']} {row['task']} x{row['hosts']}: {row['metric']} "
+                    f"{row['baseline']} -> {row['value']} ({row['change']:.0%} worse)"
+                )
+            )
+        if options["fail_on_regression"]:
+            raise CommandError(f"{len(regressions)} metrics regressed")
+
+    def format_result(self, result):
+        cells = {}
+        for key, _, spec in COLUMNS:
+            value = result.get(key)
+            cells[key] = "-" if value is None else spec.format(value)
+        return self.format_row(cells)
+
+    def format_row(self, cells):
+        return "  ".join(f"{cells[key]:>10}" for key, _, _ in COLUMNS)
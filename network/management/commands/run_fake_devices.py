@@ -0,0 +1,95 @@
+import asyncio
+import logging
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.async_ssh import raise_open_file_limit
+from core.fake_ssh import FakeDevice, serve_fake_devices, write_fake_inventory
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Serve a farm of fake Cisco IOS devices over SSH for load testing"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--count", type=int, default=10, help="Number of devices (default: 10)"
+        )
+        parser.add_argument(
+            "--base-port",
+            type=int,
+            default=10022,
+            help="Port of the first device; the others follow (default: 10022)",
+        )
+        parser.add_argument(
+            "--listen", default="127.0.0.1", help="Address to listen on"
+        )
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=0.0,
+            help="Seconds added before every command reply (default: 0)",
+        )
+        parser.add_argument(
+            "--interfaces",
+            type=int,
+            default=4,
+            help="Interfaces per device, sets the output size (default: 4)",
+        )
+        parser.add_argument(
+            "--failure-rate",
+            type=float,
+            default=0.0,
+            help="Share of logins to reject, between 0 and 1 (default: 0)",
+        )
+        parser.add_argument(
+            "--write-inventory",
+            metavar="PATH",
+            help="Write a hosts.yaml for the farm to PATH",
+        )
+
+    def handle(self, *args, **options):
+        devices = [
+            FakeDevice(
+                f"fake{i:05d}",
+                latency=options["latency"],
+                interfaces=options["interfaces"],
+                failure_rate=options["failure_rate"],
+            )
+            for i in range(options["count"])
+        ]
+        if options["write_inventory"]:
+            write_fake_inventory(
+                options["write_inventory"],
+                devices,
+                options["listen"],
+                options["base_port"],
+            )
+            self.stdout.write(f"Wrote inventory to {options['write_inventory']}")
+
+        # One listening socket per device plus the sessions against it
+        raise_open_file_limit(options["count"] * 3 + 256)
+        try:
+            asyncio.run(self.serve(devices, options))
+        except KeyboardInterrupt:
+            self.stdout.write("Stopped")
+        except (OSError, RuntimeError) as e:
+            raise CommandError(str(e))
+
+    async def serve(self, devices, options):
+        servers = await serve_fake_devices(
+            devices, options["listen"], options["base_port"]
+        )
+        last_port = options["base_port"] + len(devices) - 1
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Serving {len(devices)} fake devices on {options['listen']} "
+                f"ports {options['base_port']}-{last_port}"
+            )
+        )
+        try:
+            await asyncio.Future()
+        finally:
+            for server in servers:
+                server.close()
@@ -0,0 +1,82 @@
+import logging
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from network.jobs import requeue_running_jobs, worker_loop
+
+logger = logging.getLogger(__name__)
+
+
+def _worker_main(poll_interval, stop_event):
+    # Ctrl+C is handled by the parent, which lets workers finish their job.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    worker_loop(poll_interval=poll_interval, stop_event=stop_event)
+
+
+class Command(BaseCommand):
+    help = "Start a pool of worker processes that execute queued network jobs"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=2,
+            help="Number of worker processes to start (default: 2)",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait between queue polls when idle (default: 1.0)",
+        )
+        parser.add_argument(
+            "--requeue-running",
+            action="store_true",
+            help="Requeue jobs left in 'running' state by a previous worker crash",
+        )
+
+    def handle(self, *args, **options):
+        if options["requeue_running"]:
+            requeued = requeue_running_jobs()
+            self.stdout.write(f"Requeued {requeued} interrupted jobs")
+
+        # Child processes must open their own database connections.
+        connections.close_all()
+
+        stop_event = multiprocessing.Event()
+        processes = [
+            multiprocessing.Process(
+                target=_worker_main,
+                kwargs={
+                    "poll_interval": options["poll_interval"],
+                    "stop_event": stop_event,
+                },
+                name=f"job-worker-{i}",
+            )
+            for i in range(options["workers"])
+        ]
+        for process in processes:
+            process.start()
+
+        self.stdout.write(self.style.SUCCESS(f"Started {len(processes)} job workers"))
+
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            self.stdout.write(
+                "Stopping workers after their current job (Ctrl+C again to force)..."
+            )
+            stop_event.set()
+            try:
+                for process in processes:
+                    process.join()
+            except KeyboardInterrupt:
+                for process in processes:
+                    process.terminate()
+
+        logger.info("All job workers stopped")
+        self.stdout.write(self.style.SUCCESS("All job workers stopped"))
@@ -1,9 +1,17 @@
 import logging
+import signal
+import threading
+import time
 from django.core.management.base import BaseCommand
+from core.connection_pool import get_connection_pool
 from core.nornir_init import init_nornir
-from core.tasks import save_config, show_ip
-from network.models import TaskLog
-
+from core.parsing import shutdown_parse_pool
+from core.preflight import preflight
+from core.result_cache import shared_result_cache
+from core.runners import build_runner
+from core.tasks import backup_config, save_config, show_ip
+from network.results import TaskLogSink, result_output
+from network.scheduler import PollScheduler, get_poll_schedule
 
 logger = logging.getLogger(__name__)
 
@@ -16,68 +24,162 @@ class Command(BaseCommand):
             "--tasks",
             nargs="+",
             type=str,
-            help="Specify tasks to run (show_ip, save_config)",
-            choices=["show_ip", "save_config"],
-            default=["show_ip", "save_config"],
+            choices=["show_ip", "save_config", "backup_config"],
+            help="Specify tasks to run (default: show_ip save_config; with "
+            "--daemon, every task in POLL_SCHEDULE)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="Maximum number of hosts to run in parallel (default: settings)",
+        )
+        parser.add_argument(
+            "--runner",
+            choices=["threaded", "adaptive", "asyncio"],
+            help="Runner plugin (default: NORNIR_RUNNER setting)",
+        )
+        parser.add_argument(
+            "--hosts-file",
+            help="Inventory hosts file to use instead of hosts.yaml",
+        )
+        parser.add_argument(
+            "--parse",
+            action="store_true",
+            help="Parse show output with ntc-templates and store the rows",
+        )
+        parser.add_argument(
+            "--no-cache",
+            action="store_true",
+            help="Always query the devices instead of reusing recent show output",
+        )
+        parser.add_argument(
+            "--daemon",
+            action="store_true",
+            help="Keep running and poll each device on the POLL_SCHEDULE intervals",
+        )
+        parser.add_argument(
+            "--tick",
+            type=float,
+            help="Seconds between checks for due devices in daemon mode "
+            "(default: POLL_TICK setting)",
         )
 
     def process_task_result(self, host, task_result, task_name):
-        """Process and log an individual task result."""
-        if task_result.failed:
-            status = "failure"
-            output = (
-                str(task_result.exception)
-                if task_result.exception
-                else "Task failed without exception"
-            )
-        else:
-            status = "success"
-            output = task_result.result
-
-        # Create DB log entry
-        TaskLog.objects.create(
-            device_name=host,
-            task_type=task_name,
-            output=output,
-            status=status,
-        )
+        """Echo an individual task result; the sink has already logged it."""
+        status, output = result_output(task_result)
 
-        # Log to console and file
+        # Log to console
         msg = f"{host} => {task_name}:\n{output}\n"
         if status == "success":
-            logger.info(f"Task {task_name} succeeded on {host}")
             self.stdout.write(self.style.SUCCESS(msg))
         else:
-            logger.error(f"Task {task_name} failed on {host}: {output}")
             self.stdout.write(self.style.ERROR(msg))
 
+    def run_daemon(self, options):
+        """Poll devices on schedule until interrupted."""
+        schedule = get_poll_schedule()
+        if options["tasks"]:
+            schedule = {
+                task: config
+                for task, config in schedule.items()
+                if task in options["tasks"]
+            }
+        if not schedule:
+            self.stdout.write(self.style.ERROR("No scheduled tasks in POLL_SCHEDULE"))
+            return
+
+        runner = None
+        if options["workers"] or options["runner"]:
+            runner = build_runner(options["runner"], options["workers"])
+        # Without a hosts file the scheduler follows the configured inventory
+        nr = (
+            init_nornir(host_file=options["hosts_file"])
+            if options["hosts_file"]
+            else None
+        )
+        scheduler = PollScheduler(
+            nr,
+            schedule=schedule,
+            tick=options["tick"],
+            parse=options["parse"],
+            runner=runner,
+        )
+        stop_event = threading.Event()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Polling devices for {', '.join(schedule)} (Ctrl+C to stop)"
+            )
+        )
+
+        def stop(signum, frame):
+            self.stdout.write("Waiting for running polls to finish...")
+            stop_event.set()
+
+        # Stop dispatching on Ctrl+C or SIGTERM; in-flight batches complete
+        signal.signal(signal.SIGINT, stop)
+        signal.signal(signal.SIGTERM, stop)
+        scheduler.run_forever(stop_event)
+        shutdown_parse_pool()
+        self.stdout.write(self.style.SUCCESS("Polling stopped"))
+
     def handle(self, *args, **options):
+        if options["daemon"]:
+            self.run_daemon(options)
+            return
+
         try:
-            nr = init_nornir()
-            task_map = {"show_ip": show_ip, "save_config": save_config}
+            nr = init_nornir(host_file=options["hosts_file"])
+            if options["workers"] or options["runner"]:
+                nr = nr.with_runner(build_runner(options["runner"], options["workers"]))
+            task_map = {
+                "show_ip": show_ip,
+                "save_config": save_config,
+                "backup_config": backup_config,
+            }
 
-            requested_tasks = options["tasks"]
+            requested_tasks = options["tasks"] or ["show_ip", "save_config"]
 
             for task_name in requested_tasks:
                 task_func = task_map[task_name]
                 self.stdout.write(f"\nExecuting {task_name}...")
                 try:
-                    result = nr.run(task=task_func)
+                    # The sink records each host as it finishes, in batches
+                    started = time.monotonic()
+                    with shared_result_cache(nr.inventory.hosts), TaskLogSink(
+                        task_func.__name__, parse=options["parse"]
+                    ) as sink:
+                        reachable, unreachable = preflight(nr)
+                        sink.add_unreachable(unreachable)
+                        result = reachable.with_processors([sink]).run(
+                            task=task_func, use_cache=not options["no_cache"]
+                        )
+                    elapsed = time.monotonic() - started
+                    for host, (status, output) in unreachable.items():
+                        self.stdout.write(
+                            self.style.WARNING(f"{host} => {task_name}: {output}\n")
+                        )
                     for host, host_result in result.items():
-                        if isinstance(host_result, list):
-                            for r in host_result:
-                                self.process_task_result(host, r, task_func.__name__)
-                        else:
-                            self.process_task_result(
-                                host, host_result, task_func.__name__
-                            )
+                        self.process_task_result(host, host_result, task_func.__name__)
+                    hosts = len(result) + len(unreachable)
+                    self.stdout.write(
+                        f"{task_name}: {hosts} hosts in {elapsed:.2f}s "
+                        f"({hosts / elapsed if elapsed else 0:.1f} hosts/s, "
+                        f"{len(unreachable)} unreachable)"
+                    )
 
                 except Exception as e:
                     logger.exception(f"Error executing {task_name}")
                     self.stdout.write(
                         self.style.ERROR(f"Error executing {task_name}: {str(e)}")
                     )
+                finally:
+                    # Close any session a task left attached to the hosts
+                    nr.close_connections(on_good=True, on_failed=True)
 
+            pool = get_connection_pool()
+            self.stdout.write(f"Connection pool: {pool.stats()}")
+            pool.close_all()
+            shutdown_parse_pool()
             self.stdout.write(self.style.SUCCESS("\nAll tasks completed"))
 
         except Exception as e:
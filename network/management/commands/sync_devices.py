@@ -1,8 +1,8 @@
 from django.core.management.base import BaseCommand
-import yaml
-from network.models import NetworkDevice
+from network.devices import apply_device_diff, diff_devices, load_hosts_file
 from pathlib import Path
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -10,54 +10,54 @@ logger = logging.getLogger(__name__)
 class Command(BaseCommand):
     help = "Synchronize network devices from hosts.yaml to database"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--hosts-file",
+            help="Inventory hosts file to sync instead of hosts.yaml",
+        )
+        parser.add_argument(
+            "--prune",
+            action="store_true",
+            help="Delete devices that are no longer in the hosts file",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report the changes without writing them",
+        )
+
     def handle(self, *args, **options):
         base_dir = Path(__file__).resolve().parent.parent.parent.parent
-        hosts_file = base_dir / "hosts.yaml"
+        hosts_file = Path(options["hosts_file"] or base_dir / "hosts.yaml")
 
         try:
-            with open(hosts_file) as f:
-                hosts = yaml.safe_load(f)
-
-            devices_added = 0
-            devices_updated = 0
+            started = time.monotonic()
+            hosts = load_hosts_file(hosts_file)
+            diff = diff_devices(hosts, prune=options["prune"])
 
-            for name, data in hosts.items():
-                try:
-                    device, created = NetworkDevice.objects.update_or_create(
-                        name=name,
-                        defaults={
-                            "hostname": data["hostname"],
-                            "platform": data["platform"],
-                            "username": data["username"],
-                            "password": data["password"],
-                        },
-                    )
+            for name, error in diff["errors"].items():
+                logger.error(f"{error} for device {name}")
+                self.stdout.write(self.style.ERROR(f"{error} for device {name}"))
+            self.report(diff, options["verbosity"])
 
-                    if created:
-                        devices_added += 1
-                        logger.info(f"Added device {name}")
-                        self.stdout.write(self.style.SUCCESS(f"Added device {name}"))
-                    else:
-                        devices_updated += 1
-                        logger.info(f"Updated device {name}")
-                        self.stdout.write(self.style.SUCCESS(f"Updated device {name}"))
-                except KeyError as e:
-                    logger.error(f"Missing required field {e} for device {name}")
-                    self.stdout.write(
-                        self.style.ERROR(
-                            f"Missing required field {e} for device {name}"
-                        )
-                    )
-                except Exception as e:
-                    logger.error(f"Error processing device {name}: {e}")
-                    self.stdout.write(
-                        self.style.ERROR(f"Error processing device {name}: {e}")
-                    )
+            if options["dry_run"]:
+                self.stdout.write("Dry run, nothing written")
+            elif diff["create"] or diff["update"] or diff["delete"]:
+                apply_device_diff(diff)
 
+            unchanged = (
+                len(hosts)
+                - len(diff["create"])
+                - len(diff["update"])
+                - len(diff["errors"])
+            )
             self.stdout.write(
                 self.style.SUCCESS(
-                    f"Successfully synchronized devices. "
-                    f"Added: {devices_added}, Updated: {devices_updated}"
+                    f"Successfully synchronized {len(hosts)} devices in "
+                    f"{time.monotonic() - started:.2f}s. "
+                    f"Added: {len(diff['create'])}, Updated: {len(diff['update'])}, "
+                    f"Deleted: {len(diff['delete'])}, "
+                    f"Unchanged: {unchanged}"
                 )
             )
 
@@ -69,3 +69,19 @@ class Command(BaseCommand):
             self.stdout.write(
                 self.style.ERROR(f"Error synchronizing devices: {str(e)}")
             )
+
+    def report(self, diff, verbosity):
+        """List the changed devices; field changes with -v 2."""
+        if verbosity < 1:
+            return
+        for device in diff["create"]:
+            self.stdout.write(self.style.SUCCESS(f"Added device {device.name}"))
+        for device in diff["update"]:
+            self.stdout.write(self.style.SUCCESS(f"Updated device {device.name}"))
+            if verbosity >= 2:
+                for field, old, new in diff["changes"][device.name]:
+                    if field == "password":
+                        old, new = "***", "***"
+                    self.stdout.write(f"    {field}: {old} -> {new}")
+        for device in diff["delete"]:
+            self.stdout.write(self.style.WARNING(f"Deleted device {device.name}"))
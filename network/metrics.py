@@ -0,0 +1,205 @@
+import math
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Avg, Count, F, Max, Sum
+
+from .models import Job, TaskLog, TaskTotal, TimingBucket
+
+SECONDS_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# Histogram name -> (TaskLog field, bucket setting, default buckets, help text).
+# write_seconds has no field: it is observed once per sink flush.
+HISTOGRAMS = {
+    "connect_seconds": (
+        "connect_time",
+        "METRICS_SECONDS_BUCKETS",
+        SECONDS_BUCKETS,
+        "Time to open the device session or take a pooled one.",
+    ),
+    "command_seconds": (
+        "command_time",
+        "METRICS_SECONDS_BUCKETS",
+        SECONDS_BUCKETS,
+        "Time from sending the command to reading its output.",
+    ),
+    "parse_seconds": (
+        "parse_time",
+        "METRICS_SECONDS_BUCKETS",
+        SECONDS_BUCKETS,
+        "Time to parse the output with ntc-templates.",
+    ),
+    "output_bytes": (
+        "output_bytes",
+        "METRICS_BYTES_BUCKETS",
+        BYTES_BUCKETS,
+        "Size of the output returned by the device.",
+    ),
+    "write_seconds": (
+        None,
+        "METRICS_SECONDS_BUCKETS",
+        SECONDS_BUCKETS,
+        "Time to write one batch of TaskLog rows and their rollups.",
+    ),
+}
+METRIC_PREFIX = "netauto_task_"
+
+
+def bucket_bounds(metric):
+    _, setting, default, _ = HISTOGRAMS[metric]
+    return tuple(getattr(settings, setting, default))
+
+
+def bucket_le(value, bounds):
+    """Return the ``le`` label of the smallest bucket that holds ``value``."""
+    for bound in bounds:
+        if value <= bound:
+            return str(float(bound))
+    return "+Inf"
+
+
+def record_timings(logs, write_time=None):
+    """Fold the timings of freshly written TaskLog rows into the histograms.
+
+    Like record_task_stats this runs inside the transaction that inserted
+    ``logs``. ``write_time`` is one observation of the write_seconds
+    histogram for the whole batch.
+    """
+    deltas = defaultdict(lambda: [0, 0.0])
+    for metric, (field, _, _, _) in HISTOGRAMS.items():
+        if field is None:
+            continue
+        bounds = bucket_bounds(metric)
+        for log in logs:
+            value = getattr(log, field)
+            if value is not None:
+                delta = deltas[(metric, log.task_type, bucket_le(value, bounds))]
+                delta[0] += 1
+                delta[1] += value
+    if write_time is not None and logs:
+        le = bucket_le(write_time, bucket_bounds("write_seconds"))
+        delta = deltas[("write_seconds", logs[0].task_type, le)]
+        delta[0] += 1
+        delta[1] += write_time
+
+    for (metric, task_type, le), (count, total) in deltas.items():
+        _apply_bucket_delta(metric, task_type, le, count, total)
+
+
+def _apply_bucket_delta(metric, task_type, le, count, total):
+    rows = TimingBucket.objects.filter(metric=metric, task_type=task_type, le=le)
+    updates = {"count": F("count") + count, "total": F("total") + total}
+    if rows.update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            TimingBucket.objects.create(
+                metric=metric, task_type=task_type, le=le, count=count, total=total
+            )
+    except IntegrityError:
+        # Another writer created the row between our UPDATE and INSERT
+        rows.update(**updates)
+
+
+def job_timings(job):
+    """Return the per-phase timing breakdown of a job's TaskLogs."""
+    phases = {
+        "connect": "connect_time",
+        "command": "command_time",
+        "parse": "parse_time",
+    }
+    aggregates = {}
+    for phase, field in phases.items():
+        aggregates[f"{phase}_total"] = Sum(field)
+        aggregates[f"{phase}_avg"] = Avg(field)
+        aggregates[f"{phase}_max"] = Max(field)
+    totals = TaskLog.objects.filter(job=job).aggregate(
+        rows=Count("id"), output_bytes=Sum("output_bytes"), **aggregates
+    )
+    wall = (
+        (job.finished_at - job.started_at).total_seconds()
+        if job.started_at and job.finished_at
+        else None
+    )
+    return {
+        "rows": totals["rows"],
+        "wall": wall,
+        "write": job.write_time,
+        "output_bytes": totals["output_bytes"] or 0,
+        "phases": [
+            {
+                "phase": phase,
+                "total": totals[f"{phase}_total"],
+                "avg": totals[f"{phase}_avg"],
+                "max": totals[f"{phase}_max"],
+            }
+            for phase in phases
+        ],
+    }
+
+
+def _labels(**labels):
+    def escape(value):
+        value = str(value).replace("\\", "\\\\")
+        return value.replace('"', '\\"').replace("\n", "\\n")
+
+    return ",".join(f'{name}="{escape(value)}"' for name, value in labels.items())
+
+
+def _sort_key(le):
+    return math.inf if le == "+Inf" else float(le)
+
+
+def render_metrics():
+    """Return the metrics in the Prometheus text exposition format."""
+    lines = []
+    buckets = defaultdict(list)
+    for bucket in TimingBucket.objects.order_by("metric", "task_type"):
+        buckets[(bucket.metric, bucket.task_type)].append(bucket)
+
+    for metric, (_, _, _, help_text) in HISTOGRAMS.items():
+        name = METRIC_PREFIX + metric
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        bounds = [str(float(bound)) for bound in bucket_bounds(metric)]
+        for (bucket_metric, task_type), rows in buckets.items():
+            if bucket_metric != metric:
+                continue
+            # Every bucket is listed, including empty ones and any left over
+            # from bounds configured before
+            by_le = {row.le: row for row in rows}
+            les = sorted({*bounds, *by_le} - {"+Inf"}, key=_sort_key)
+            count = 0
+            total = 0.0
+            for le in [*les, "+Inf"]:
+                row = by_le.get(le)
+                if row is not None:
+                    count += row.count
+                    total += row.total
+                if le != "+Inf":
+                    labels = _labels(task_type=task_type, le=le)
+                    lines.append(f"{name}_bucket{{{labels}}} {count}")
+            labels = _labels(task_type=task_type)
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f"{name}_sum{{{labels}}} {total}")
+            lines.append(f"{name}_count{{{labels}}} {count}")
+
+    name = METRIC_PREFIX + "runs_total"
+    lines.append(f"# HELP {name} TaskLog rows written, by task type and status.")
+    lines.append(f"# TYPE {name} counter")
+    for row in TaskTotal.objects.order_by("task_type"):
+        for status in ("success", "failure", "skipped"):
+            labels = _labels(task_type=row.task_type, status=status)
+            lines.append(f"{name}{{{labels}}} {getattr(row, f'{status}_count')}")
+
+    name = "netauto_jobs"
+    lines.append(f"# HELP {name} Jobs in the queue, by status.")
+    lines.append(f"# TYPE {name} gauge")
+    counts = dict(
+        Job.objects.values_list("status").annotate(count=Count("id")).order_by()
+    )
+    for status, _ in Job.STATUS_CHOICES:
+        lines.append(f"{name}{{{_labels(status=status)}}} {counts.get(status, 0)}")
+    return "\n".join(lines) + "\n"
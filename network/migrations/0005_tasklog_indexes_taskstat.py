@@ -0,0 +1,79 @@
+# Generated by Django 5.2.1 on 2026-10-18 05:33
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Q
+from django.db.models.functions import TruncDate
+
+
+def backfill_task_stats(apps, schema_editor):
+    TaskLog = apps.get_model('network', 'TaskLog')
+    TaskStat = apps.get_model('network', 'TaskStat')
+
+    rows = (
+        TaskLog.objects.annotate(day=TruncDate('timestamp'))
+        .values('day', 'task_type', 'device_name')
+        .annotate(
+            success_count=Count('id', filter=Q(status='success')),
+            failure_count=Count('id', filter=~Q(status='success')),
+            last_run_at=Max('timestamp'),
+            last_success_at=Max('timestamp', filter=Q(status='success')),
+        )
+        .order_by()
+    )
+    TaskStat.objects.bulk_create(
+        (TaskStat(**row) for row in rows.iterator()), batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0004_job'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('task_type', models.CharField(max_length=100)),
+                ('device_name', models.CharField(max_length=100)),
+                ('success_count', models.PositiveIntegerField(default=0)),
+                ('failure_count', models.PositiveIntegerField(default=0)),
+                ('last_run_at', models.DateTimeField(blank=True, null=True)),
+                ('last_success_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='tasklog',
+            index=models.Index(fields=['user', '-timestamp'], name='tasklog_user_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tasklog',
+            index=models.Index(fields=['user', 'device_name', '-timestamp'], name='tasklog_user_device_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tasklog',
+            index=models.Index(fields=['user', 'task_type', 'status', '-timestamp'], name='tasklog_user_type_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tasklog',
+            index=models.Index(fields=['-timestamp'], name='tasklog_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tasklog',
+            index=models.Index(fields=['task_type', 'status', '-timestamp'], name='tasklog_type_status_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='taskstat',
+            index=models.Index(fields=['task_type', '-last_success_at'], name='taskstat_type_success_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='taskstat',
+            constraint=models.UniqueConstraint(fields=('day', 'task_type', 'device_name'), name='unique_task_stat'),
+        ),
+        migrations.RunPython(backfill_task_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-18 05:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0005_tasklog_indexes_taskstat'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='networkdevice',
+            index=models.Index(fields=['hostname', 'id'], name='device_hostname_id_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.1 on 2026-10-18 05:35
+
+from django.db import migrations, models
+
+
+def backfill_choices(apps, schema_editor):
+    TaskLog = apps.get_model('network', 'TaskLog')
+    TaskLogChoice = apps.get_model('network', 'TaskLogChoice')
+
+    for field in ('device_name', 'task_type'):
+        values = TaskLog.objects.values_list(field, flat=True).distinct().order_by()
+        TaskLogChoice.objects.bulk_create(
+            [TaskLogChoice(field=field, value=value) for value in values],
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0006_networkdevice_hostname_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskLogChoice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(choices=[('device_name', 'Device name'), ('task_type', 'Task type')], max_length=20)),
+                ('value', models.CharField(max_length=100)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('field', 'value'), name='unique_tasklog_choice')],
+            },
+        ),
+        migrations.RunPython(backfill_choices, migrations.RunPython.noop),
+    ]
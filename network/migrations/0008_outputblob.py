@@ -0,0 +1,81 @@
+# Generated by Django 5.2.1 on 2026-10-18 05:36
+
+import hashlib
+import zlib
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def move_output_to_blobs(apps, schema_editor):
+    TaskLog = apps.get_model('network', 'TaskLog')
+    OutputBlob = apps.get_model('network', 'OutputBlob')
+
+    last_id = 0
+    while True:
+        logs = list(
+            TaskLog.objects.filter(id__gt=last_id)
+            .order_by('id')
+            .only('id', 'output')[:1000]
+        )
+        if not logs:
+            break
+        last_id = logs[-1].id
+
+        blobs = {}
+        for log in logs:
+            data = (log.output or '').encode('utf-8')
+            digest = hashlib.sha256(data).hexdigest()
+            log.output_blob_id = digest
+            if digest not in blobs:
+                blobs[digest] = OutputBlob(
+                    digest=digest, data=zlib.compress(data, 6), size=len(data)
+                )
+        OutputBlob.objects.bulk_create(
+            list(blobs.values()), batch_size=500, ignore_conflicts=True
+        )
+        TaskLog.objects.bulk_update(logs, ['output_blob'], batch_size=500)
+
+
+def restore_output_from_blobs(apps, schema_editor):
+    TaskLog = apps.get_model('network', 'TaskLog')
+    OutputBlob = apps.get_model('network', 'OutputBlob')
+
+    for blob in OutputBlob.objects.iterator():
+        text = zlib.decompress(bytes(blob.data)).decode('utf-8')
+        TaskLog.objects.filter(output_blob_id=blob.digest).update(output=text)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0007_tasklogchoice'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutputBlob',
+            fields=[
+                ('digest', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('data', models.BinaryField()),
+                ('size', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='tasklog',
+            name='output_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='task_logs', to='network.outputblob'),
+        ),
+        migrations.RunPython(move_output_to_blobs, restore_output_from_blobs),
+        # Gives the column a default so the removal below can be reversed
+        migrations.AlterField(
+            model_name='tasklog',
+            name='output',
+            field=models.TextField(default=''),
+        ),
+        migrations.RemoveField(
+            model_name='tasklog',
+            name='output',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 05:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0008_outputblob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tasklog',
+            name='duration',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
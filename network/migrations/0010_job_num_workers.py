@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 05:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0009_tasklog_duration'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='num_workers',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.1 on 2026-10-18 05:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0010_job_num_workers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='parse',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='InterfaceStatus',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('device_name', models.CharField(max_length=100)),
+                ('interface', models.CharField(max_length=100)),
+                ('ip_address', models.CharField(blank=True, max_length=64)),
+                ('status', models.CharField(max_length=50)),
+                ('protocol', models.CharField(max_length=50)),
+                ('timestamp', models.DateTimeField()),
+                ('task_log', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='interfaces', to='network.tasklog')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['device_name', 'interface', '-timestamp'], name='ifstatus_device_if_ts_idx'), models.Index(fields=['status', '-timestamp'], name='ifstatus_status_ts_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ParsedOutput',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('device_name', models.CharField(max_length=100)),
+                ('platform', models.CharField(max_length=50)),
+                ('command', models.CharField(max_length=255)),
+                ('rows', models.JSONField(default=list)),
+                ('timestamp', models.DateTimeField()),
+                ('task_log', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='parsed', to='network.tasklog')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['device_name', 'command', '-timestamp'], name='parsed_device_cmd_ts_idx')],
+            },
+        ),
+    ]
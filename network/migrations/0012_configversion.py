@@ -0,0 +1,37 @@
+# Generated by Django 5.2.1 on 2026-10-18 05:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0011_parsed_output'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConfigVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('device_name', models.CharField(max_length=100)),
+                ('version', models.PositiveIntegerField()),
+                ('base_version', models.PositiveIntegerField()),
+                ('is_snapshot', models.BooleanField(default=False)),
+                ('is_latest', models.BooleanField(default=False)),
+                ('digest', models.CharField(max_length=64)),
+                ('data', models.BinaryField()),
+                ('size', models.PositiveIntegerField()),
+                ('line_count', models.PositiveIntegerField()),
+                ('lines_added', models.PositiveIntegerField(default=0)),
+                ('lines_removed', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('task_log', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='config_versions', to='network.tasklog')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['device_name', 'is_latest'], name='configversion_latest_idx')],
+                'constraints': [models.UniqueConstraint(fields=('device_name', 'version'), name='unique_config_version')],
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.1 on 2026-10-18 05:53
+
+from django.db import migrations, models
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        # Contentless: the text is tokenized but not stored a second time.
+        # Prefix indexes keep short "Gi*" style queries from expanding to
+        # every matching term.
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE network_search_fts USING fts5("
+            "body, content='', prefix='2 3 4', "
+            "tokenize=\"unicode61 tokenchars '_.-'\")"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute('ALTER TABLE network_searchdocument ADD COLUMN vector tsvector')
+        schema_editor.execute(
+            'CREATE INDEX network_searchdocument_vector_idx '
+            'ON network_searchdocument USING GIN (vector)'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS network_search_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0012_configversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('output', 'Task output'), ('command', 'Custom command'), ('config', 'Config version')], max_length=20)),
+                ('ref', models.CharField(max_length=64)),
+                ('title', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'ref'), name='unique_search_document')],
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.1 on 2026-10-18 06:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0013_searchdocument'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduleEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_type', models.CharField(max_length=100)),
+                ('device_name', models.CharField(max_length=100)),
+                ('interval', models.PositiveIntegerField()),
+                ('next_run_at', models.DateTimeField()),
+                ('in_flight', models.BooleanField(default=False)),
+                ('last_scheduled_at', models.DateTimeField(blank=True, null=True)),
+                ('last_started_at', models.DateTimeField(blank=True, null=True)),
+                ('last_finished_at', models.DateTimeField(blank=True, null=True)),
+                ('last_status', models.CharField(blank=True, max_length=20)),
+                ('last_lag', models.FloatField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['next_run_at', 'id'], name='schedule_next_run_idx')],
+                'constraints': [models.UniqueConstraint(fields=('task_type', 'device_name'), name='unique_schedule_entry')],
+            },
+        ),
+    ]
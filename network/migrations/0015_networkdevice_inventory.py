@@ -0,0 +1,27 @@
+# Generated by Django 5.2.1 on 2026-10-18 06:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0014_scheduleentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='networkdevice',
+            name='groups',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='networkdevice',
+            name='port',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='networkdevice',
+            index=models.Index(fields=['name'], name='device_name_idx'),
+        ),
+    ]
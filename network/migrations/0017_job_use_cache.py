@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 06:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0016_device_selectors'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='use_cache',
+            field=models.BooleanField(default=True),
+        ),
+    ]
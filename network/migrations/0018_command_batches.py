@@ -0,0 +1,28 @@
+# Generated by Django 5.2.1 on 2026-10-18 06:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0017_job_use_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='stop_on_error',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='tasklog',
+            name='batch_id',
+            field=models.UUIDField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='tasklog',
+            name='batch_index',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+    ]
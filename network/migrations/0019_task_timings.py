@@ -0,0 +1,52 @@
+# Generated by Django 5.2.1 on 2026-10-18 06:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0018_command_batches'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='write_time',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='tasklog',
+            name='command_time',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='tasklog',
+            name='connect_time',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='tasklog',
+            name='output_bytes',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='tasklog',
+            name='parse_time',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='TimingBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(max_length=50)),
+                ('task_type', models.CharField(max_length=100)),
+                ('le', models.CharField(max_length=20)),
+                ('count', models.PositiveBigIntegerField(default=0)),
+                ('total', models.FloatField(default=0.0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('metric', 'task_type', 'le'), name='unique_timing_bucket')],
+            },
+        ),
+    ]
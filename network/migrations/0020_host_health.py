@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-18 06:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0019_task_timings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HostHealth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('device_name', models.CharField(max_length=100, unique=True)),
+                ('consecutive_failures', models.PositiveIntegerField(default=0)),
+                ('last_error', models.CharField(blank=True, max_length=255)),
+                ('last_checked_at', models.DateTimeField(blank=True, null=True)),
+                ('open_until', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='tasklog',
+            name='status',
+            field=models.CharField(choices=[('success', 'Success'), ('failure', 'Failure'), ('skipped', 'Skipped')], max_length=20),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-18 07:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0020_host_health'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkerStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('worker', models.CharField(max_length=100, unique=True)),
+                ('role', models.CharField(max_length=20)),
+                ('stats', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField()),
+            ],
+        ),
+    ]
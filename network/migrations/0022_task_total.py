@@ -0,0 +1,43 @@
+# Generated by Django 5.2.1 on 2026-10-18 07:13
+
+from django.db import migrations, models
+from django.db.models import Max, Sum
+
+
+def backfill_task_totals(apps, schema_editor):
+    TaskStat = apps.get_model('network', 'TaskStat')
+    TaskTotal = apps.get_model('network', 'TaskTotal')
+
+    rows = (
+        TaskStat.objects.values('task_type')
+        .annotate(
+            success_count=Sum('success_count'),
+            failure_count=Sum('failure_count'),
+            last_run_at=Max('last_run_at'),
+            last_success_at=Max('last_success_at'),
+        )
+        .order_by()
+    )
+    TaskTotal.objects.bulk_create(TaskTotal(**row) for row in rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0021_worker_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_type', models.CharField(max_length=100, unique=True)),
+                ('success_count', models.PositiveBigIntegerField(default=0)),
+                ('failure_count', models.PositiveBigIntegerField(default=0)),
+                ('last_run_at', models.DateTimeField(blank=True, null=True)),
+                ('last_success_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_task_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.1 on 2026-10-18 07:50
+
+from django.db import migrations, models
+from django.db.models import Count, F, Sum, Value
+from django.db.models.functions import Greatest, TruncDate
+
+
+def move_skipped_counts(apps, schema_editor):
+    # Skipped rows were counted as failures; move those still in TaskLog.
+    # Rows already purged can't be told apart and stay failures.
+    TaskLog = apps.get_model('network', 'TaskLog')
+    TaskStat = apps.get_model('network', 'TaskStat')
+    TaskTotal = apps.get_model('network', 'TaskTotal')
+
+    rows = (
+        TaskLog.objects.filter(status='skipped')
+        .annotate(day=TruncDate('timestamp'))
+        .values('day', 'task_type', 'device_name')
+        .annotate(skipped=Count('id'))
+        .order_by()
+    )
+    for row in rows.iterator():
+        TaskStat.objects.filter(
+            day=row['day'], task_type=row['task_type'], device_name=row['device_name']
+        ).update(
+            skipped_count=row['skipped'],
+            failure_count=Greatest(F('failure_count') - row['skipped'], Value(0)),
+        )
+
+    totals = (
+        TaskStat.objects.filter(skipped_count__gt=0)
+        .values('task_type')
+        .annotate(skipped=Sum('skipped_count'))
+        .order_by()
+    )
+    for row in totals:
+        TaskTotal.objects.filter(task_type=row['task_type']).update(
+            skipped_count=row['skipped'],
+            failure_count=Greatest(F('failure_count') - row['skipped'], Value(0)),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0023_change_counter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskstat',
+            name='skipped_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tasktotal',
+            name='skipped_count',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.RunPython(move_skipped_counts, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,6 @@
+import zlib
+
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.contrib.auth.models import User
 
@@ -9,23 +12,461 @@ class NetworkDevice(models.Model):
     platform = models.CharField(max_length=50)
     username = models.CharField(max_length=50)
     password = models.CharField(max_length=50)
+    port = models.PositiveIntegerField(null=True, blank=True)
+    groups = models.JSONField(default=list, blank=True)  # Nornir group names
+    site = models.CharField(max_length=100, blank=True)
+    role = models.CharField(max_length=100, blank=True)
+    tags = models.JSONField(default=list, blank=True)
+
+    class Meta:
+        indexes = [
+            # device_list keyset pagination
+            models.Index(fields=["hostname", "id"], name="device_hostname_id_idx"),
+            # DjangoInventory loads selected devices by name
+            models.Index(fields=["name"], name="device_name_idx"),
+        ]
 
     def __str__(self):
         return self.name
 
+    def clean(self):
+        # JSONField accepts any JSON; the inventory needs lists of names
+        errors = {}
+        for field in ("groups", "tags"):
+            value = getattr(self, field)
+            if not isinstance(value, list) or not all(
+                isinstance(item, str) for item in value
+            ):
+                errors[field] = f"{field.capitalize()} must be a list of names."
+        if errors:
+            raise ValidationError(errors)
+
+
+class Job(models.Model):
+    STATUS_CHOICES = [
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("completed", "Completed"),
+        ("failed", "Failed"),
+    ]
+
+    task_type = models.CharField(max_length=100)
+    custom_command = models.TextField(null=True, blank=True)
+    devices = models.JSONField(default=list)
+    num_workers = models.PositiveIntegerField(null=True, blank=True)
+    parse = models.BooleanField(default=False)  # store TextFSM-parsed rows
+    use_cache = models.BooleanField(default=True)  # reuse recent show output
+    stop_on_error = models.BooleanField(default=False)  # command batches
+    write_time = models.FloatField(default=0.0)  # seconds writing its TaskLogs
+    status = models.CharField(
+        max_length=20, choices=STATUS_CHOICES, default="queued", db_index=True
+    )
+    worker = models.CharField(max_length=100, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="jobs", null=True
+    )
+
+    @property
+    def is_finished(self):
+        return self.status in ("completed", "failed")
+
+    def __str__(self):
+        return f"Job {self.pk} - {self.task_type} - {self.status}"
+
+
+class OutputBlob(models.Model):
+    """Command output stored once per unique content, zlib-compressed."""
+
+    digest = models.CharField(max_length=64, primary_key=True)  # sha256 hex
+    data = models.BinaryField()
+    size = models.PositiveIntegerField()  # uncompressed bytes
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def text(self):
+        return zlib.decompress(bytes(self.data)).decode("utf-8")
+
+    def __str__(self):
+        return f"{self.digest[:12]} ({self.size} bytes)"
+
 
 class TaskLog(models.Model):
     device_name = models.CharField(max_length=100)
     task_type = models.CharField(max_length=100)
-    output = models.TextField()
+    output_blob = models.ForeignKey(
+        OutputBlob,
+        on_delete=models.PROTECT,
+        related_name="task_logs",
+        null=True,
+        blank=True,
+    )
     status = models.CharField(
-        max_length=20, choices=[("success", "Success"), ("failure", "Failure")]
+        max_length=20,
+        choices=[
+            ("success", "Success"),
+            ("failure", "Failure"),
+            # The preflight found the device unreachable; nothing was run
+            ("skipped", "Skipped"),
+        ],
     )
     timestamp = models.DateTimeField(auto_now_add=True)
     custom_command = models.TextField(null=True, blank=True)
+    duration = models.FloatField(null=True, blank=True)  # seconds on the device
+    # Logs of one host's multi-command batch share batch_id, in command order
+    batch_id = models.UUIDField(null=True, blank=True, db_index=True)
+    batch_index = models.PositiveSmallIntegerField(null=True, blank=True)
+    # Where the time went, in seconds, and the size of the device's output
+    connect_time = models.FloatField(null=True, blank=True)
+    command_time = models.FloatField(null=True, blank=True)
+    parse_time = models.FloatField(null=True, blank=True)
+    output_bytes = models.PositiveIntegerField(null=True, blank=True)
     user = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name="task_logs", null=True
     )
+    job = models.ForeignKey(
+        Job, on_delete=models.SET_NULL, related_name="task_logs", null=True, blank=True
+    )
+
+    class Meta:
+        indexes = [
+            # execution_logs: a user's logs, newest first, optionally filtered
+            models.Index(fields=["user", "-timestamp"], name="tasklog_user_ts_idx"),
+            models.Index(
+                fields=["user", "device_name", "-timestamp"],
+                name="tasklog_user_device_ts_idx",
+            ),
+            models.Index(
+                fields=["user", "task_type", "status", "-timestamp"],
+                name="tasklog_user_type_ts_idx",
+            ),
+            # dashboard: recent tasks and last successful run of a task type
+            models.Index(fields=["-timestamp"], name="tasklog_ts_idx"),
+            models.Index(
+                fields=["task_type", "status", "-timestamp"],
+                name="tasklog_type_status_ts_idx",
+            ),
+        ]
+
+    @property
+    def output(self):
+        """Command output, loaded and decompressed on first access."""
+        if self.output_blob_id is None:
+            return ""
+        return self.output_blob.text()
 
     def __str__(self):
         return f"{self.device_name} - {self.task_type} - {self.status}"
+
+
+class TaskLogChoice(models.Model):
+    """Distinct TaskLog values offered as filter choices on the logs page."""
+
+    FIELD_CHOICES = [("device_name", "Device name"), ("task_type", "Task type")]
+
+    field = models.CharField(max_length=20, choices=FIELD_CHOICES)
+    value = models.CharField(max_length=100)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["field", "value"], name="unique_tasklog_choice"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.field}: {self.value}"
+
+
+class TimingBucket(models.Model):
+    """One histogram bucket of a TaskLog timing or size metric, per task type.
+
+    ``le`` is the bucket's upper bound as written in Prometheus ("0.5",
+    "+Inf"). ``count`` and ``total`` cover only the observations that fell
+    in this bucket; the metrics view makes them cumulative.
+    """
+
+    metric = models.CharField(max_length=50)
+    task_type = models.CharField(max_length=100)
+    le = models.CharField(max_length=20)
+    count = models.PositiveBigIntegerField(default=0)
+    total = models.FloatField(default=0.0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["metric", "task_type", "le"], name="unique_timing_bucket"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.metric} - {self.task_type} - le={self.le}"
+
+
+class TaskStat(models.Model):
+    """Per-day, per-task-type, per-device TaskLog counters kept up to date on write."""
+
+    day = models.DateField()
+    task_type = models.CharField(max_length=100)
+    device_name = models.CharField(max_length=100)
+    success_count = models.PositiveIntegerField(default=0)
+    failure_count = models.PositiveIntegerField(default=0)
+    # Logged without running: device unreachable or not in the inventory
+    skipped_count = models.PositiveIntegerField(default=0)
+    last_run_at = models.DateTimeField(null=True, blank=True)
+    last_success_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "task_type", "device_name"], name="unique_task_stat"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["task_type", "-last_success_at"],
+                name="taskstat_type_success_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.day} - {self.task_type} - {self.device_name}"
+
+
+class TaskTotal(models.Model):
+    """All-time TaskLog counters of a task type, read by the dashboard.
+
+    One row per task type, so the dashboard reads a handful of rows however
+    many devices and days TaskStat covers.
+    """
+
+    task_type = models.CharField(max_length=100, unique=True)
+    success_count = models.PositiveBigIntegerField(default=0)
+    failure_count = models.PositiveBigIntegerField(default=0)
+    skipped_count = models.PositiveBigIntegerField(default=0)
+    last_run_at = models.DateTimeField(null=True, blank=True)
+    last_success_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return (
+            f"{self.task_type}: {self.success_count} ok, {self.failure_count} failed, "
+            f"{self.skipped_count} skipped"
+        )
+
+
+class ParsedOutput(models.Model):
+    """Structured rows parsed from a TaskLog's output with ntc-templates."""
+
+    task_log = models.OneToOneField(
+        TaskLog, on_delete=models.CASCADE, related_name="parsed"
+    )
+    device_name = models.CharField(max_length=100)
+    platform = models.CharField(max_length=50)
+    command = models.CharField(max_length=255)
+    rows = models.JSONField(default=list)
+    timestamp = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["device_name", "command", "-timestamp"],
+                name="parsed_device_cmd_ts_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.device_name} - {self.command} ({len(self.rows)} rows)"
+
+
+class InterfaceStatus(models.Model):
+    """One interface row of a parsed "show ip interface brief"."""
+
+    task_log = models.ForeignKey(
+        TaskLog, on_delete=models.CASCADE, related_name="interfaces"
+    )
+    device_name = models.CharField(max_length=100)
+    interface = models.CharField(max_length=100)
+    ip_address = models.CharField(max_length=64, blank=True)
+    status = models.CharField(max_length=50)
+    protocol = models.CharField(max_length=50)
+    timestamp = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["device_name", "interface", "-timestamp"],
+                name="ifstatus_device_if_ts_idx",
+            ),
+            models.Index(
+                fields=["status", "-timestamp"], name="ifstatus_status_ts_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.device_name} {self.interface} - {self.status}/{self.protocol}"
+
+
+class ConfigVersion(models.Model):
+    """One stored running-config of a device.
+
+    ``data`` holds the zlib-compressed JSON list of config lines for a
+    snapshot, or the edit script against the previous version otherwise.
+    ``base_version`` is the snapshot the version's delta chain starts from.
+    """
+
+    device_name = models.CharField(max_length=100)
+    version = models.PositiveIntegerField()
+    base_version = models.PositiveIntegerField()
+    is_snapshot = models.BooleanField(default=False)
+    is_latest = models.BooleanField(default=False)
+    digest = models.CharField(max_length=64)  # sha256 of the normalized config
+    data = models.BinaryField()
+    size = models.PositiveIntegerField()  # bytes of the full config
+    line_count = models.PositiveIntegerField()
+    lines_added = models.PositiveIntegerField(default=0)
+    lines_removed = models.PositiveIntegerField(default=0)
+    task_log = models.ForeignKey(
+        TaskLog,
+        on_delete=models.SET_NULL,
+        related_name="config_versions",
+        null=True,
+        blank=True,
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["device_name", "version"], name="unique_config_version"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["device_name", "is_latest"], name="configversion_latest_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.device_name} v{self.version}"
+
+
+class SearchDocument(models.Model):
+    """One entry of the full-text index; its id is the index row id.
+
+    The indexed text itself lives in the FTS5 table (SQLite) or the ``vector``
+    column (PostgreSQL) created by the migration, not in a model field.
+    """
+
+    KIND_CHOICES = [
+        ("output", "Task output"),
+        ("command", "Custom command"),
+        ("config", "Config version"),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    ref = models.CharField(max_length=64)  # blob digest, command digest or version pk
+    title = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["kind", "ref"], name="unique_search_document"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.kind}: {self.title or self.ref}"
+
+
+class ScheduleEntry(models.Model):
+    """When the polling daemon next runs a task on a device."""
+
+    task_type = models.CharField(max_length=100)
+    device_name = models.CharField(max_length=100)
+    interval = models.PositiveIntegerField()  # seconds
+    next_run_at = models.DateTimeField()
+    in_flight = models.BooleanField(default=False)
+    last_scheduled_at = models.DateTimeField(null=True, blank=True)
+    last_started_at = models.DateTimeField(null=True, blank=True)
+    last_finished_at = models.DateTimeField(null=True, blank=True)
+    last_status = models.CharField(max_length=20, blank=True)
+    last_lag = models.FloatField(null=True, blank=True)  # seconds started late
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["task_type", "device_name"], name="unique_schedule_entry"
+            )
+        ]
+        indexes = [
+            # The daemon's due-entries query
+            models.Index(fields=["next_run_at", "id"], name="schedule_next_run_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.task_type} on {self.device_name} at {self.next_run_at}"
+
+
+class DeviceSelector(models.Model):
+    """A saved device selector query, e.g. ``site:A role:access``."""
+
+    name = models.CharField(max_length=100, unique=True)
+    query = models.CharField(max_length=1000)
+    description = models.CharField(max_length=255, blank=True)
+    user = models.ForeignKey(
+        User, on_delete=models.SET_NULL, related_name="device_selectors", null=True
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"@{self.name}"
+
+
+class HostHealth(models.Model):
+    """Reachability circuit breaker of a device, kept by the preflight.
+
+    Only devices that failed a probe since their last success have a row.
+    """
+
+    device_name = models.CharField(max_length=100, unique=True)
+    consecutive_failures = models.PositiveIntegerField(default=0)
+    last_error = models.CharField(max_length=255, blank=True)
+    last_checked_at = models.DateTimeField(null=True, blank=True)
+    # The device is skipped without a probe until then
+    open_until = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.device_name}: {self.consecutive_failures} failed probes"
+
+
+class WorkerStats(models.Model):
+    """Connection pool and cache counters last reported by a worker process.
+
+    Job workers and the polling daemon each keep their own pool and caches;
+    /nornir/stats/ adds up these rows to show what the workers are doing.
+    """
+
+    worker = models.CharField(max_length=100, unique=True)  # host:pid
+    role = models.CharField(max_length=20)  # "job" or "poll"
+    stats = models.JSONField(default=dict)
+    updated_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.role} worker {self.worker}"
+
+
+class ChangeCounter(models.Model):
+    """A number bumped whenever the data it is named after changes.
+
+    Processes cache data along with the value they read, and reload it once
+    the value moves, so a change made by any process is seen by all of them.
+    """
+
+    name = models.CharField(max_length=150, unique=True)
+    value = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} = {self.value}"
@@ -0,0 +1,122 @@
+import base64
+import json
+
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class KeysetPage:
+    """One page of a keyset-paginated queryset."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None, count=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.count = count
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """Cursor pagination over a unique ordering such as ``("-timestamp", "-id")``.
+
+    Each page is fetched with a ``WHERE (a, b) < (x, y) ... LIMIT n+1`` style
+    query that an index on the ordering columns can answer directly, so deep
+    pages cost the same as the first one. Unlike ``Paginator`` no ``COUNT(*)``
+    is issued unless ``with_count`` is set.
+    """
+
+    def __init__(self, queryset, ordering, per_page=10, with_count=False):
+        self.queryset = queryset
+        self.ordering = list(ordering)
+        self.per_page = per_page
+        self.with_count = with_count
+        self.fields = [
+            queryset.model._meta.get_field(name.lstrip("-")) for name in self.ordering
+        ]
+
+    def get_page(self, cursor=None):
+        """Return the page addressed by ``cursor``, or the first page."""
+        try:
+            direction, values = self._decode(cursor) if cursor else ("next", None)
+        except InvalidCursor:
+            direction, values = "next", None
+
+        backwards = direction == "previous"
+        ordering = self._reversed() if backwards else self.ordering
+        queryset = self.queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._after(ordering, values))
+
+        rows = list(queryset[: self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if backwards:
+            rows.reverse()
+
+        next_cursor = previous_cursor = None
+        if rows:
+            if has_more or backwards:
+                next_cursor = self._encode("next", rows[-1])
+            if (has_more and backwards) or (values is not None and not backwards):
+                previous_cursor = self._encode("previous", rows[0])
+
+        count = self.queryset.count() if self.with_count else None
+        return KeysetPage(rows, next_cursor, previous_cursor, count)
+
+    def _reversed(self):
+        return [
+            name[1:] if name.startswith("-") else f"-{name}" for name in self.ordering
+        ]
+
+    def _after(self, ordering, values):
+        """Build the row-value comparison ``ordering > values`` as a Q object."""
+        condition = Q()
+        for i, name in enumerate(ordering):
+            field = name.lstrip("-")
+            lookup = "lt" if name.startswith("-") else "gt"
+            term = Q(**{f"{field}__{lookup}": values[i]})
+            for prev_name, prev_value in zip(ordering[:i], values[:i]):
+                term &= Q(**{prev_name.lstrip("-"): prev_value})
+            condition |= term
+        return condition
+
+    def _encode(self, direction, obj):
+        values = [getattr(obj, field.attname) for field in self.fields]
+        # default=str keeps full microsecond precision for datetimes
+        payload = json.dumps([direction, values], default=str)
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    def _decode(self, cursor):
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            direction, raw_values = json.loads(base64.urlsafe_b64decode(padded))
+            if direction not in ("next", "previous"):
+                raise ValueError(direction)
+            values = [
+                field.to_python(value) for field, value in zip(self.fields, raw_values)
+            ]
+        except Exception as e:
+            raise InvalidCursor(f"Invalid pagination cursor: {e}") from e
+        if len(values) != len(self.fields):
+            raise InvalidCursor("Invalid pagination cursor")
+        return direction, values
@@ -0,0 +1,48 @@
+from core.parsing import normalize_command
+
+from .models import InterfaceStatus, ParsedOutput
+
+INTERFACE_FIELDS = {"interface", "ip_address", "status"}
+
+
+def interface_rows(rows):
+    """Return True if parsed rows look like an interface brief table."""
+    return bool(rows) and INTERFACE_FIELDS <= rows[0].keys()
+
+
+def record_parsed_outputs(parsed):
+    """Store parsed rows for freshly written TaskLog rows.
+
+    ``parsed`` is a list of ``(log, platform, command, rows)``. Must be called
+    inside the transaction that inserted the logs, after they have their pk.
+    """
+    ParsedOutput.objects.bulk_create(
+        [
+            ParsedOutput(
+                task_log=log,
+                device_name=log.device_name,
+                platform=platform,
+                command=normalize_command(command),
+                rows=rows,
+                timestamp=log.timestamp,
+            )
+            for log, platform, command, rows in parsed
+        ]
+    )
+    InterfaceStatus.objects.bulk_create(
+        [
+            InterfaceStatus(
+                task_log=log,
+                device_name=log.device_name,
+                interface=row["interface"],
+                ip_address=row["ip_address"],
+                status=row["status"],
+                protocol=row.get("proto") or row.get("protocol", ""),
+                timestamp=log.timestamp,
+            )
+            for log, _, _, rows in parsed
+            if interface_rows(rows)
+            for row in rows
+        ],
+        batch_size=500,
+    )
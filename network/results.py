@@ -0,0 +1,316 @@
+import logging
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from nornir_netmiko.connections.netmiko import napalm_to_netmiko_map
+
+from core.parsing import submit_parse
+from core.tasks import TASK_COMMANDS, CommandBatch
+
+from .blobs import store_outputs
+from .choices import record_filter_choices
+from .configs import link_config_versions, store_config_versions
+from .metrics import record_timings
+from .models import Job, TaskLog
+from .parsed import record_parsed_outputs
+from .search import index_config_versions, index_task_logs
+from .stats import record_task_stats
+
+logger = logging.getLogger(__name__)
+
+
+def result_output(result):
+    """Return the (status, output) pair to log for a host's MultiResult."""
+    if result.failed:
+        output = (
+            str(result.exception)
+            if result.exception
+            else str(result.result or "Task failed without exception")
+        )
+        return "failure", output
+    return "success", result.result
+
+
+def set_timings(log, timings, status, output):
+    """Copy a task's phase timings and output size onto its TaskLog."""
+    timings = timings or {}
+    log.connect_time = timings.get("connect")
+    log.command_time = timings.get("command")
+    if status == "success" and isinstance(output, str):
+        log.output_bytes = len(output.encode("utf-8", "replace"))
+
+
+class TaskLogSink:
+    """Collect per-host results and persist them as TaskLog rows in batches.
+
+    Rows are written with ``bulk_create`` inside a single transaction once
+    ``chunk_size`` rows are buffered or ``flush_interval`` seconds have passed,
+    so a crash only loses the rows buffered since the last flush. The sink is
+    also a Nornir processor: attach it with ``nr.with_processors([sink])`` to
+    record hosts as they finish, with their duration. With ``release_results``
+    the processor drops each host's result payload once it is buffered, so a
+    large run doesn't keep every output in the AggregatedResult.
+
+    With ``parse`` successful outputs are also parsed with ntc-templates in
+    the parse process pool and the rows are stored with the logs.
+
+    Each row keeps the connect, command and parse times and output size of
+    its host, and every flush folds them into the timing histograms.
+    ``write_time`` adds up the seconds spent writing.
+    """
+
+    def __init__(
+        self,
+        task_type,
+        user=None,
+        job=None,
+        custom_command=None,
+        chunk_size=None,
+        flush_interval=None,
+        release_results=False,
+        parse=False,
+    ):
+        self.task_type = task_type
+        self.user = user
+        self.job = job
+        self.custom_command = custom_command if task_type == "custom_command" else None
+        self.chunk_size = chunk_size or getattr(settings, "TASKLOG_BATCH_SIZE", 500)
+        self.flush_interval = (
+            flush_interval
+            if flush_interval is not None
+            else getattr(settings, "TASKLOG_FLUSH_INTERVAL", 2.0)
+        )
+        self.release_results = release_results
+        self.command = self.custom_command or TASK_COMMANDS.get(task_type)
+        self.parse = parse and self.command is not None
+        self.written = 0
+        self.write_time = 0.0
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        self._buffer_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flush_timer = None
+        self._started = {}
+
+    def add(self, host, result, duration=None, platform=None):
+        """Buffer the TaskLog row for one host's MultiResult.
+
+        A CommandBatch result is logged as one row per command instead.
+        """
+        if isinstance(result.result, CommandBatch):
+            return self.add_batch(host, result.result, platform=platform)
+
+        status, output = result_output(result)
+        if status == "success":
+            logger.info(f"Task {self.task_type} successful on {host}")
+        else:
+            logger.error(f"Task {self.task_type} failed on {host}: {output}")
+
+        log = TaskLog(
+            device_name=host,
+            task_type=self.task_type,
+            status=status,
+            user=self.user,
+            job=self.job,
+            custom_command=self.custom_command,
+            duration=duration,
+        )
+        task_result = result[0] if isinstance(result, list) else result
+        set_timings(log, getattr(task_result, "timings", None), status, output)
+        self._append(
+            [(log, output, self._parse(platform, self.command, status, output))]
+        )
+        return log
+
+    def add_batch(self, host, batch, platform=None):
+        """Buffer one TaskLog per command of a host's CommandBatch, as a group."""
+        failures = sum(1 for item in batch if item["status"] != "success")
+        if failures:
+            logger.error(
+                f"Task {self.task_type} failed on {host}: "
+                f"{failures} of {len(batch)} commands failed"
+            )
+        else:
+            logger.info(f"Task {self.task_type} successful on {host}")
+
+        batch_id = uuid.uuid4()
+        rows = []
+        for index, item in enumerate(batch):
+            log = TaskLog(
+                device_name=host,
+                task_type=self.task_type,
+                status=item["status"],
+                user=self.user,
+                job=self.job,
+                custom_command=item["command"],
+                duration=item["duration"],
+                batch_id=batch_id,
+                batch_index=index,
+            )
+            set_timings(log, item["timings"], item["status"], item["output"])
+            parsing = self._parse(
+                platform, item["command"], item["status"], item["output"]
+            )
+            rows.append((log, item["output"], parsing))
+        self._append(rows)
+        return [log for log, _, _ in rows]
+
+    def add_unreachable(self, unreachable):
+        """Buffer a TaskLog for each host that won't be run.
+
+        ``unreachable`` maps host names to the ``(status, output)`` to log,
+        as returned by core.preflight.preflight for the hosts it held back.
+        """
+        rows = []
+        for host, (status, output) in unreachable.items():
+            logger.warning(f"Task {self.task_type} not run on {host}: {output}")
+            log = TaskLog(
+                device_name=host,
+                task_type=self.task_type,
+                status=status,
+                user=self.user,
+                job=self.job,
+                custom_command=self.custom_command,
+            )
+            rows.append((log, output, None))
+        if rows:
+            self._append(rows)
+        return [log for log, _, _ in rows]
+
+    def _parse(self, platform, command, status, output):
+        if self.parse and platform and status == "success" and output:
+            return (platform, command, submit_parse(platform, command, output))
+        return None
+
+    def _append(self, rows):
+        # A batch's rows are buffered together so they're written together
+        with self._buffer_lock:
+            self._buffer.extend(rows)
+            due = (
+                len(self._buffer) >= self.chunk_size
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+            if not due and self._flush_timer is None:
+                # Make sure a lull between hosts doesn't hold rows back
+                self._flush_timer = threading.Timer(
+                    self.flush_interval, self._flush_and_close
+                )
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+        if due:
+            self._flush_and_close()
+
+    def _flush_and_close(self):
+        # Runner and timer threads each open a connection of their own, which
+        # Django only closes on the main thread: close it after the flush.
+        try:
+            self.flush()
+        finally:
+            if (
+                threading.current_thread() is not threading.main_thread()
+                and not connection.in_atomic_block
+            ):
+                connection.close()
+
+    def add_aggregated(self, aggregated):
+        """Buffer every host of an AggregatedResult."""
+        for host, result in aggregated.items():
+            self.add(host, result)
+
+    def flush(self):
+        """Write all buffered rows in one transaction and return how many."""
+        with self._flush_lock:
+            with self._buffer_lock:
+                pending, self._buffer = self._buffer, []
+                self._last_flush = time.monotonic()
+                if self._flush_timer is not None:
+                    self._flush_timer.cancel()
+                    self._flush_timer = None
+            if not pending:
+                return 0
+
+            logs = [log for log, _, _ in pending]
+            outputs = [output for _, output, _ in pending]
+            parsed = self._parsed_rows(pending)
+            started = time.perf_counter()
+            with transaction.atomic():
+                versions = []
+                if self.task_type == "backup_config":
+                    # The config goes into the version history; the log keeps
+                    # a one-line summary of what was stored.
+                    versions, outputs = store_config_versions(logs, outputs)
+                digests = store_outputs(outputs)
+                for log, digest in zip(logs, digests):
+                    log.output_blob_id = digest
+                TaskLog.objects.bulk_create(logs, batch_size=self.chunk_size)
+                link_config_versions(versions)
+                record_task_stats(logs)
+                record_filter_choices(logs)
+                if parsed:
+                    record_parsed_outputs(parsed)
+                index_task_logs(logs, outputs)
+                index_config_versions(versions)
+                # Everything above is the write being measured
+                write_time = time.perf_counter() - started
+                record_timings(logs, write_time)
+                if self.job is not None:
+                    Job.objects.filter(pk=self.job.pk).update(
+                        write_time=F("write_time") + write_time
+                    )
+            self.written += len(logs)
+            self.write_time += write_time
+            return len(logs)
+
+    def _parsed_rows(self, pending):
+        # Collected before the transaction opens so it isn't held while the
+        # pool finishes parsing.
+        parsed = []
+        for log, _, parsing in pending:
+            if parsing is None:
+                continue
+            platform, command, future = parsing
+            try:
+                rows, log.parse_time = future.result()
+            except Exception as e:
+                logger.warning(f"Could not parse output of {log.device_name}: {e}")
+                continue
+            if rows is not None:
+                parsed.append((log, platform, command, rows))
+        return parsed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
+
+    # Nornir processor interface
+
+    def task_started(self, task):
+        pass
+
+    def task_completed(self, task, result):
+        self.flush()
+
+    def task_instance_started(self, task, host):
+        self._started[host.name] = time.monotonic()
+
+    def task_instance_completed(self, task, host, result):
+        started = self._started.pop(host.name, None)
+        duration = time.monotonic() - started if started is not None else None
+        platform = host.get_connection_parameters("netmiko").platform
+        platform = napalm_to_netmiko_map.get(platform, platform)
+        self.add(host.name, result, duration=duration, platform=platform)
+        if self.release_results:
+            for item in result:
+                item.result = None
+
+    def subtask_instance_started(self, task, host):
+        pass
+
+    def subtask_instance_completed(self, task, host, result):
+        pass
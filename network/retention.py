@@ -0,0 +1,378 @@
+import glob
+import gzip
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .blobs import LOOKUP_CHUNK_SIZE, load_outputs
+from .models import OutputBlob, ParsedOutput, TaskLog
+from .search import command_digest, drop_documents
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # optional, only needed for Parquet archives
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RETENTION_DAYS = {"default": 90}
+ARCHIVE_FORMATS = ("ndjson", "parquet")
+# Archived TaskLog fields, in file column order; "output" and "parsed" are
+# the decompressed output and ntc-templates rows, which don't outlive the log
+ARCHIVE_FIELDS = (
+    "id",
+    "timestamp",
+    "device_name",
+    "task_type",
+    "status",
+    "custom_command",
+    "duration",
+    "batch_id",
+    "batch_index",
+    "connect_time",
+    "command_time",
+    "parse_time",
+    "output_bytes",
+    "user",
+    "job_id",
+    "output",
+    "parsed",
+)
+
+
+class ArchiveError(Exception):
+    """An archive can't be written or read."""
+
+
+def get_retention_days():
+    """Return ``{task_type: days}``; "default" covers the other task types."""
+    return {
+        **DEFAULT_RETENTION_DAYS,
+        **getattr(settings, "TASKLOG_RETENTION_DAYS", {}),
+    }
+
+
+def retention_policies(retention=None, now=None, task_types=None):
+    """Return ``[(label, queryset), ...]`` of the TaskLog rows past retention.
+
+    A task type kept for None days is never purged. ``task_types`` limits
+    the result to those task types, falling back to the default policy for
+    types without their own.
+    """
+    retention = get_retention_days() if retention is None else retention
+    now = now or timezone.now()
+    explicit = [task_type for task_type in retention if task_type != "default"]
+
+    policies = []
+    for task_type in explicit:
+        days = retention[task_type]
+        if days is None or (task_types and task_type not in task_types):
+            continue
+        cutoff = now - timedelta(days=days)
+        policies.append(
+            (
+                task_type,
+                TaskLog.objects.filter(task_type=task_type, timestamp__lt=cutoff),
+            )
+        )
+
+    days = retention.get("default")
+    if days is not None:
+        others = [
+            task_type for task_type in task_types or () if task_type not in explicit
+        ]
+        if not task_types or others:
+            logs = TaskLog.objects.filter(
+                timestamp__lt=now - timedelta(days=days)
+            ).exclude(task_type__in=explicit)
+            if others:
+                logs = logs.filter(task_type__in=others)
+            policies.append(("default", logs))
+    return policies
+
+
+def archive_record(log, output, parsed):
+    """Return the JSON-serializable archive row of a TaskLog."""
+    return {
+        "id": log.pk,
+        "timestamp": log.timestamp.isoformat(),
+        "device_name": log.device_name,
+        "task_type": log.task_type,
+        "status": log.status,
+        "custom_command": log.custom_command,
+        "duration": log.duration,
+        "batch_id": str(log.batch_id) if log.batch_id else None,
+        "batch_index": log.batch_index,
+        "connect_time": log.connect_time,
+        "command_time": log.command_time,
+        "parse_time": log.parse_time,
+        "output_bytes": log.output_bytes,
+        "user": log.user.username if log.user_id else None,
+        "job_id": log.job_id,
+        "output": output,
+        "parsed": parsed,
+    }
+
+
+class NDJSONArchive:
+    """gzip-compressed NDJSON, one line per TaskLog.
+
+    Every batch is appended as its own gzip member and synced to disk before
+    its rows are deleted, so the file stays readable if a purge is cut short.
+    """
+
+    extension = ".ndjson.gz"
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+
+    def write(self, records):
+        lines = "".join(
+            json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+            for record in records
+        )
+        with open(self.path, "ab") as f:
+            f.write(gzip.compress(lines.encode("utf-8")))
+            f.flush()
+            os.fsync(f.fileno())
+        self.rows += len(records)
+
+
+class ParquetArchive:
+    """Parquet files, one per batch, named ``<stem>-<n>.parquet``.
+
+    A Parquet file can't be read until its footer is written, so each batch
+    gets a complete file of its own before its rows are deleted.
+    """
+
+    extension = ".parquet"
+
+    def __init__(self, path):
+        if pyarrow is None:
+            raise ArchiveError("Parquet archives need pyarrow (pip install pyarrow)")
+        self.stem = path[: -len(self.extension)]
+        self.path = f"{self.stem}-*.parquet"
+        self.parts = 0
+        self.rows = 0
+
+    def write(self, records):
+        self.parts += 1
+        columns = {
+            field: [record[field] for record in records] for field in ARCHIVE_FIELDS
+        }
+        # Parsed rows vary by template, so they are stored as JSON text
+        columns["parsed"] = [
+            None if parsed is None else json.dumps(parsed)
+            for parsed in columns["parsed"]
+        ]
+        table = pyarrow.table(columns)
+        pyarrow.parquet.write_table(
+            table, f"{self.stem}-{self.parts:05d}.parquet", compression="zstd"
+        )
+        self.rows += len(records)
+
+
+ARCHIVE_CLASSES = {"ndjson": NDJSONArchive, "parquet": ParquetArchive}
+
+
+def open_archive(directory, label, fmt="ndjson", now=None):
+    """Create the archive a purge of ``label`` rows writes to in ``directory``."""
+    if fmt not in ARCHIVE_CLASSES:
+        raise ArchiveError(f"Unknown archive format {fmt!r}")
+    archive_class = ARCHIVE_CLASSES[fmt]
+    os.makedirs(directory, exist_ok=True)
+    stamp = timezone.localtime(now or timezone.now()).strftime("%Y%m%d-%H%M%S")
+    name = f"tasklog-{label}-{stamp}{archive_class.extension}"
+    return archive_class(os.path.join(directory, name))
+
+
+def delete_task_logs(logs, outputs):
+    """Delete ``logs`` along with what only they referenced.
+
+    Output blobs no other TaskLog points at are deleted with their search
+    documents, as are the documents of custom commands no longer logged.
+    ``outputs`` maps log ids to their text, needed to unindex it. Runs in one
+    short transaction; the TaskStat, TaskTotal and TimingBucket rollups are
+    untouched.
+    """
+    ids = [log.pk for log in logs]
+    digests = {
+        log.output_blob_id: outputs[log.pk] for log in logs if log.output_blob_id
+    }
+    commands = {log.custom_command for log in logs if log.custom_command}
+
+    with transaction.atomic():
+        TaskLog.objects.filter(pk__in=ids).delete()
+
+        kept = set(
+            TaskLog.objects.filter(output_blob_id__in=list(digests)).values_list(
+                "output_blob_id", flat=True
+            )
+        )
+        orphans = {
+            digest: text for digest, text in digests.items() if digest not in kept
+        }
+        drop_documents("output", orphans)
+        OutputBlob.objects.filter(digest__in=list(orphans)).delete()
+
+        kept = set(
+            TaskLog.objects.filter(
+                task_type="custom_command", custom_command__in=list(commands)
+            ).values_list("custom_command", flat=True)
+        )
+        drop_documents(
+            "command",
+            {command_digest(command): command for command in commands - kept},
+        )
+    return len(orphans)
+
+
+def purge_task_logs(
+    logs,
+    archive=None,
+    batch_size=LOOKUP_CHUNK_SIZE,
+    pause=0.0,
+    dry_run=False,
+):
+    """Archive and delete the TaskLog rows of ``logs`` in batches.
+
+    Rows are read in id order, ``batch_size`` at a time, written to
+    ``archive`` and only then deleted, each batch in its own transaction so
+    writers are never held up for long. ``pause`` seconds are slept between
+    batches to leave the database to other writers. Returns the number of
+    rows purged, or with ``dry_run`` the number that would be.
+    """
+    if dry_run:
+        return logs.count()
+
+    purged = freed = 0
+    last_id = 0
+    while True:
+        batch = list(
+            logs.filter(pk__gt=last_id)
+            .select_related("user")
+            .order_by("pk")[:batch_size]
+        )
+        if not batch:
+            break
+        last_id = batch[-1].pk
+        outputs = load_outputs(batch)
+        if archive is not None:
+            parsed = dict(
+                ParsedOutput.objects.filter(task_log__in=batch).values_list(
+                    "task_log_id", "rows"
+                )
+            )
+            archive.write(
+                [
+                    archive_record(log, outputs[log.pk], parsed.get(log.pk))
+                    for log in batch
+                ]
+            )
+        freed += delete_task_logs(batch, outputs)
+        purged += len(batch)
+        if pause:
+            time.sleep(pause)
+    if purged:
+        logger.info(f"Purged {purged} TaskLog rows and {freed} unreferenced outputs")
+    return purged
+
+
+def archive_paths(paths):
+    """Expand directories and glob patterns into archive files, oldest first."""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            candidates = glob.glob(os.path.join(path, "tasklog-*"))
+        else:
+            candidates = glob.glob(path) or [path]
+        found.extend(
+            candidate
+            for candidate in candidates
+            if candidate.endswith((".ndjson", ".ndjson.gz", ".parquet"))
+        )
+    if not found:
+        raise ArchiveError(f"No TaskLog archives in {' '.join(paths)}")
+    return sorted(found)
+
+
+def _read_ndjson(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _read_parquet(path):
+    if pyarrow is None:
+        raise ArchiveError(
+            "Reading Parquet archives needs pyarrow (pip install pyarrow)"
+        )
+    parquet = pyarrow.parquet.ParquetFile(path)
+    for batch in parquet.iter_batches():
+        for record in batch.to_pylist():
+            if record.get("parsed") is not None:
+                record["parsed"] = json.loads(record["parsed"])
+            yield record
+
+
+def read_archive(paths):
+    """Yield the TaskLog records stored in archive files, one dict each."""
+    for path in archive_paths(paths):
+        reader = _read_parquet if path.endswith(".parquet") else _read_ndjson
+        try:
+            yield from reader(path)
+        except (OSError, EOFError, ValueError) as e:
+            raise ArchiveError(f"Cannot read {path}: {e}")
+
+
+def parse_timestamp(value):
+    """Parse an ISO date or datetime; naive values are in the current time zone."""
+    value = datetime.fromisoformat(value)
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value
+
+
+def filter_records(
+    records,
+    device=None,
+    task_type=None,
+    status=None,
+    since=None,
+    until=None,
+    contains=None,
+):
+    """Yield the archive records matching every given filter.
+
+    ``since`` and ``until`` are aware datetimes; ``contains`` is matched
+    case-insensitively against the output and custom command.
+    """
+    needle = contains.lower() if contains else None
+    for record in records:
+        if device and record["device_name"] != device:
+            continue
+        if task_type and record["task_type"] != task_type:
+            continue
+        if status and record["status"] != status:
+            continue
+        if since or until:
+            timestamp = parse_timestamp(record["timestamp"])
+            if since and timestamp < since:
+                continue
+            if until and timestamp >= until:
+                continue
+        if needle:
+            text = f"{record.get('output') or ''}\n{record.get('custom_command') or ''}"
+            if needle not in text.lower():
+                continue
+        yield record
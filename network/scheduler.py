@@ -0,0 +1,344 @@
+import hashlib
+import logging
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Avg, Count, Max, Min, Q
+from django.utils import timezone
+
+from core.connection_pool import get_connection_pool
+from core.nornir_init import get_nornir, get_nornir_view
+from core.preflight import preflight
+from core.result_cache import shared_result_cache
+
+from .jobs import TASK_MAP, get_worker_name
+from .models import ScheduleEntry
+from .results import TaskLogSink
+from .worker_stats import remove_worker_stats, report_worker_stats
+
+logger = logging.getLogger(__name__)
+
+LOOKUP_CHUNK_SIZE = 500
+STATUS_LOG_INTERVAL = 60  # seconds between schedule summaries in the log
+
+
+def _is_interval(value):
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
+
+def poll_config_error(config):
+    """Return why a POLL_SCHEDULE entry is unusable, or None if it is valid."""
+    if not isinstance(config, dict):
+        return "entry is not a mapping"
+    if not _is_interval(config.get("interval")):
+        return "interval must be a positive whole number of seconds"
+    groups = config.get("groups", {})
+    if not isinstance(groups, dict) or not all(
+        _is_interval(interval) for interval in groups.values()
+    ):
+        return "groups must map group names to positive whole numbers of seconds"
+    return None
+
+
+def get_poll_schedule():
+    """Return POLL_SCHEDULE without tasks that need arguments.
+
+    Malformed entries are logged and left out rather than stopping the
+    daemon.
+    """
+    schedule = getattr(settings, "POLL_SCHEDULE", {})
+    valid = {}
+    for task_type, config in schedule.items():
+        if task_type not in TASK_MAP or task_type == "custom_command":
+            continue
+        error = poll_config_error(config)
+        if error:
+            logger.error(f"Skipping POLL_SCHEDULE[{task_type!r}]: {error}")
+            continue
+        valid[task_type] = {"groups": {}, **config}
+    return valid
+
+
+def schedule_offset(task_type, device_name, interval):
+    """Return the device's fixed offset, in seconds, inside its interval.
+
+    Derived from a hash so it is the same after a restart and devices are
+    spread evenly across the interval.
+    """
+    digest = hashlib.sha256(f"{task_type}:{device_name}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % (interval * 1000) / 1000
+
+
+def next_slot(task_type, device_name, interval, after):
+    """Return the device's first scheduled time strictly after ``after``."""
+    offset = schedule_offset(task_type, device_name, interval)
+    slots = math.floor((after.timestamp() - offset) / interval) + 1
+    return datetime.fromtimestamp(slots * interval + offset, tz=dt_timezone.utc)
+
+
+def host_interval(host, config):
+    """Interval of a Nornir host: the shortest of its groups' overrides."""
+    overrides = config["groups"]
+    intervals = [
+        overrides[group.name] for group in host.groups if group.name in overrides
+    ]
+    return min(intervals, default=config["interval"])
+
+
+def sync_schedule(inventory, schedule):
+    """Make the ScheduleEntry rows match the inventory and ``schedule``.
+
+    New devices get their next slot, devices whose interval changed are
+    rescheduled and removed devices or tasks are dropped. Returns the
+    number of created, updated and deleted entries.
+    """
+    now = timezone.now()
+    wanted = {
+        (task_type, name): host_interval(host, config)
+        for task_type, config in schedule.items()
+        for name, host in inventory.hosts.items()
+    }
+    existing = {
+        (task_type, name): (pk, interval)
+        for pk, task_type, name, interval in ScheduleEntry.objects.values_list(
+            "pk", "task_type", "device_name", "interval"
+        )
+    }
+
+    new, changed = [], []
+    for (task_type, name), interval in wanted.items():
+        current = existing.get((task_type, name))
+        if current is not None and current[1] == interval:
+            continue
+        entry = ScheduleEntry(
+            task_type=task_type,
+            device_name=name,
+            interval=interval,
+            next_run_at=next_slot(task_type, name, interval, now),
+        )
+        if current is None:
+            new.append(entry)
+        else:
+            entry.pk = current[0]
+            changed.append(entry)
+    # Tasks left out of this run (run_nornir_tasks --daemon --tasks) keep
+    # their entries unless they were removed from POLL_SCHEDULE altogether
+    configured = get_poll_schedule()
+    stale = [
+        pk
+        for (task_type, name), (pk, _) in existing.items()
+        if (task_type, name) not in wanted
+        and (task_type in schedule or task_type not in configured)
+    ]
+
+    with transaction.atomic():
+        ScheduleEntry.objects.bulk_create(new, batch_size=LOOKUP_CHUNK_SIZE)
+        ScheduleEntry.objects.bulk_update(
+            changed, ["interval", "next_run_at"], batch_size=LOOKUP_CHUNK_SIZE
+        )
+        for i in range(0, len(stale), LOOKUP_CHUNK_SIZE):
+            ScheduleEntry.objects.filter(
+                pk__in=stale[i : i + LOOKUP_CHUNK_SIZE]
+            ).delete()
+    return len(new), len(changed), len(stale)
+
+
+def reset_in_flight():
+    """Release entries left in flight by a daemon that didn't shut down cleanly."""
+    return ScheduleEntry.objects.filter(in_flight=True).update(in_flight=False)
+
+
+def schedule_summary(now=None):
+    """Per-task counts and lag figures for the schedule page and the log."""
+    now = now or timezone.now()
+    return list(
+        ScheduleEntry.objects.values("task_type")
+        .annotate(
+            devices=Count("id"),
+            running=Count("id", filter=Q(in_flight=True)),
+            overdue=Count("id", filter=Q(in_flight=False, next_run_at__lt=now)),
+            failed=Count("id", filter=Q(last_status="failed")),
+            min_interval=Min("interval"),
+            max_interval=Max("interval"),
+            avg_lag=Avg("last_lag"),
+            max_lag=Max("last_lag"),
+            next_due=Min("next_run_at", filter=Q(in_flight=False)),
+        )
+        .order_by("task_type")
+    )
+
+
+class PollScheduler:
+    """Run scheduled tasks on devices as they come due.
+
+    Every tick the due entries are collected per task type and run as one
+    Nornir batch in a background thread, so a slow batch doesn't hold back
+    the devices behind it. A device with a run still in flight, for any
+    task, is skipped until that run finishes; the delay shows up as lag.
+    """
+
+    def __init__(
+        self,
+        nr=None,
+        schedule=None,
+        tick=None,
+        max_batches=None,
+        parse=False,
+        runner=None,
+    ):
+        # Without ``nr`` the configured inventory is used and followed as
+        # devices are added, edited or removed.
+        self.nr = nr
+        self.runner = runner
+        self._synced = None
+        self.schedule = schedule if schedule is not None else get_poll_schedule()
+        self.tick_interval = tick or getattr(settings, "POLL_TICK", 1.0)
+        self.max_batches = max_batches or getattr(settings, "POLL_MAX_BATCHES", 8)
+        self.parse = parse
+        self.busy = set()
+        self.running = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_batches, thread_name_prefix="poll"
+        )
+
+    def start(self):
+        reset_in_flight()
+        self.sync()
+
+    def sync(self):
+        """Resync the schedule when the inventory has changed."""
+        nr = self.nr or get_nornir()
+        if nr is self._synced:
+            return
+        created, updated, deleted = sync_schedule(nr.inventory, self.schedule)
+        self._synced = nr
+        logger.info(
+            f"Schedule synced for {len(nr.inventory.hosts)} devices: {created} "
+            f"added, {updated} rescheduled, {deleted} removed"
+        )
+
+    def run_forever(self, stop_event):
+        self.start()
+        worker_name = get_worker_name()
+        last_status = 0
+        try:
+            while not stop_event.is_set():
+                close_old_connections()
+                self.sync()
+                self.tick()
+                now = timezone.now()
+                if now.timestamp() - last_status >= STATUS_LOG_INTERVAL:
+                    last_status = now.timestamp()
+                    for row in schedule_summary(now):
+                        logger.info(
+                            f"Schedule {row['task_type']}: {row['devices']} devices, "
+                            f"{row['running']} in flight, {row['overdue']} overdue, "
+                            f"max lag {row['max_lag'] or 0:.1f}s"
+                        )
+                    report_worker_stats(worker_name, "poll")
+                stop_event.wait(self.tick_interval)
+        finally:
+            # Let running batches finish so their entries are released
+            self._executor.shutdown(wait=True)
+            remove_worker_stats(worker_name)
+            get_connection_pool().close_all()
+
+    def tick(self):
+        """Dispatch the entries that are due; return how many were started."""
+        with self._lock:
+            free = self.max_batches - self.running
+            busy = set(self.busy)
+        if free <= 0:
+            return 0
+
+        now = timezone.now()
+        due = ScheduleEntry.objects.filter(
+            in_flight=False, next_run_at__lte=now, task_type__in=self.schedule
+        ).order_by("next_run_at", "id")
+        batches = {}
+        for entry in due:
+            if entry.device_name in busy:
+                continue  # due for another task in this tick
+            if entry.task_type not in batches and len(batches) >= free:
+                continue
+            busy.add(entry.device_name)
+            batches.setdefault(entry.task_type, []).append(entry)
+
+        started = 0
+        for task_type, entries in batches.items():
+            for entry in entries:
+                entry.in_flight = True
+                entry.last_scheduled_at = entry.next_run_at
+                entry.last_started_at = now
+                entry.last_lag = (now - entry.next_run_at).total_seconds()
+            ScheduleEntry.objects.bulk_update(
+                entries,
+                ["in_flight", "last_scheduled_at", "last_started_at", "last_lag"],
+                batch_size=LOOKUP_CHUNK_SIZE,
+            )
+            with self._lock:
+                self.busy.update(entry.device_name for entry in entries)
+                self.running += 1
+            self._executor.submit(self.run_batch, task_type, entries)
+            started += len(entries)
+        return started
+
+    def run_batch(self, task_type, entries):
+        names = [entry.device_name for entry in entries]
+        failed = set(names)
+        nr = get_nornir_view(names, nr=self.nr)
+        if self.runner is not None:
+            nr = nr.with_runner(self.runner)
+        sink = TaskLogSink(task_type, release_results=True, parse=self.parse)
+        unreachable = {}
+        try:
+            with shared_result_cache(names), sink:
+                reachable, unreachable = preflight(nr)
+                sink.add_unreachable(unreachable)
+                # Polls always reach the device; their output refreshes the
+                # result cache for interactive runs.
+                result = reachable.with_processors([sink]).run(
+                    task=TASK_MAP[task_type], use_cache=False
+                )
+            failed = set(result.failed_hosts) | set(unreachable)
+        except Exception:
+            logger.exception(f"Scheduled {task_type} failed on {len(names)} devices")
+        finally:
+            # Close any session a task left attached to the hosts
+            nr.close_connections(on_good=True, on_failed=True)
+            try:
+                self.finish(entries, failed, unreachable)
+            finally:
+                with self._lock:
+                    self.busy.difference_update(names)
+                    self.running -= 1
+                connection.close()
+
+    def finish(self, entries, failed, unreachable=None):
+        now = timezone.now()
+        unreachable = unreachable or {}
+        for entry in entries:
+            entry.in_flight = False
+            entry.last_finished_at = now
+            if unreachable.get(entry.device_name, ("",))[0] == "skipped":
+                # Not run while the device's circuit breaker is open
+                entry.last_status = "skipped"
+            elif entry.device_name in failed:
+                entry.last_status = "failed"
+            else:
+                entry.last_status = "success"
+            # The next slot after now: a run that overran its interval skips
+            # the slots it missed instead of running back to back.
+            entry.next_run_at = next_slot(
+                entry.task_type, entry.device_name, entry.interval, now
+            )
+        ScheduleEntry.objects.bulk_update(
+            entries,
+            ["in_flight", "last_finished_at", "last_status", "next_run_at"],
+            batch_size=LOOKUP_CHUNK_SIZE,
+        )
@@ -0,0 +1,393 @@
+import hashlib
+import re
+from collections import defaultdict
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Window
+from django.db.models.functions import Left, RowNumber
+
+from .blobs import LOOKUP_CHUNK_SIZE
+from .configs import reconstruct_config
+from .models import ConfigVersion, OutputBlob, SearchDocument, TaskLog
+
+SEARCH_CANDIDATES = 200  # ranked documents considered per query
+SEARCH_SCAN_LIMIT = 5000  # newest matches ranked on SQLite
+SNIPPET_RADIUS = 80
+TERM_RE = re.compile(r'"([^"]+)"|([^\s"]+)')
+
+
+def command_digest(command):
+    return hashlib.sha256(command.encode("utf-8")).hexdigest()
+
+
+def search_backend():
+    """Return "sqlite", "postgresql" or None when full-text search is unavailable."""
+    return connection.vendor if connection.vendor in ("sqlite", "postgresql") else None
+
+
+def index_documents(documents):
+    """Add ``(kind, ref, title, text)`` documents that aren't indexed yet.
+
+    Call inside the transaction that wrote the indexed rows, so the index
+    never points at data that was rolled back.
+    """
+    backend = search_backend()
+    if backend is None or not documents:
+        return 0
+
+    texts = {(kind, ref): (title, text) for kind, ref, title, text in documents}
+    existing = set()
+    keys = list(texts)
+    for i in range(0, len(keys), LOOKUP_CHUNK_SIZE):
+        chunk = keys[i : i + LOOKUP_CHUNK_SIZE]
+        existing.update(
+            SearchDocument.objects.filter(
+                kind__in={kind for kind, _ in chunk}, ref__in={ref for _, ref in chunk}
+            ).values_list("kind", "ref")
+        )
+    new = [
+        SearchDocument(kind=kind, ref=ref, title=texts[(kind, ref)][0][:255])
+        for kind, ref in keys
+        if (kind, ref) not in existing
+    ]
+    if not new:
+        return 0
+
+    try:
+        with transaction.atomic():
+            created = SearchDocument.objects.bulk_create(new)
+    except IntegrityError:
+        # Another worker indexed some of them first
+        created = []
+        for document in new:
+            document, was_created = SearchDocument.objects.get_or_create(
+                kind=document.kind, ref=document.ref, defaults={"title": document.title}
+            )
+            if was_created:
+                created.append(document)
+
+    rows = [
+        (document.pk, texts[(document.kind, document.ref)][1]) for document in created
+    ]
+    with connection.cursor() as cursor:
+        if backend == "sqlite":
+            cursor.executemany(
+                "INSERT INTO network_search_fts (rowid, body) VALUES (%s, %s)", rows
+            )
+        else:
+            cursor.executemany(
+                "UPDATE network_searchdocument SET vector = to_tsvector('simple', %s) "
+                "WHERE id = %s",
+                [(text, pk) for pk, text in rows],
+            )
+    return len(created)
+
+
+def index_task_logs(logs, outputs):
+    """Index the outputs and custom commands of freshly written TaskLog rows."""
+    documents = [
+        ("output", log.output_blob_id, "", output)
+        for log, output in zip(logs, outputs)
+        if log.output_blob_id and output
+    ]
+    documents += [
+        (
+            "command",
+            command_digest(log.custom_command),
+            log.custom_command,
+            log.custom_command,
+        )
+        for log in logs
+        if log.custom_command
+    ]
+    return index_documents(documents)
+
+
+def _delete_fts_rows(rows):
+    # Contentless FTS5 tables need the original text to delete a row
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            "INSERT INTO network_search_fts (network_search_fts, rowid, body) "
+            "VALUES ('delete', %s, %s)",
+            rows,
+        )
+
+
+def drop_documents(kind, texts):
+    """Remove the search documents of ``{ref: indexed text}``."""
+    backend = search_backend()
+    if backend is None or not texts:
+        return
+    documents = []
+    refs = list(texts)
+    for i in range(0, len(refs), LOOKUP_CHUNK_SIZE):
+        documents.extend(
+            SearchDocument.objects.filter(
+                kind=kind, ref__in=refs[i : i + LOOKUP_CHUNK_SIZE]
+            ).values_list("pk", "ref")
+        )
+    if backend == "sqlite":
+        _delete_fts_rows([(pk, texts[ref]) for pk, ref in documents])
+    SearchDocument.objects.filter(pk__in=[pk for pk, _ in documents]).delete()
+
+
+def index_config_versions(versions):
+    """Index versions saved by store_config_versions.
+
+    Only the latest version of a device is searchable, so the versions they
+    replace are dropped from the index in the same transaction.
+    """
+    drop_documents(
+        "config",
+        {
+            str(version.replaces[0]): version.replaces[1]
+            for version in versions
+            if version.replaces
+        },
+    )
+    latest = {version.device_name: version for version in versions}
+    return index_documents(
+        [
+            ("config", str(version.pk), str(version), version.text)
+            for version in latest.values()
+        ]
+    )
+
+
+def drop_superseded_configs(batch_size=LOOKUP_CHUNK_SIZE):
+    """Unindex config versions that are no longer their device's latest.
+
+    Indexes written before superseded versions were dropped on save still
+    hold them. Returns the number of documents removed.
+    """
+    dropped = 0
+    last_id = 0
+    while True:
+        documents = list(
+            SearchDocument.objects.filter(kind="config", pk__gt=last_id)
+            .order_by("pk")
+            .values_list("pk", "ref")[:batch_size]
+        )
+        if not documents:
+            return dropped
+        last_id = documents[-1][0]
+        versions = ConfigVersion.objects.filter(
+            pk__in=[int(ref) for _, ref in documents], is_latest=False
+        ).defer("data")
+        texts = {
+            str(version.pk): reconstruct_config(version.device_name, version.version)
+            for version in versions
+        }
+        with transaction.atomic():
+            drop_documents("config", texts)
+        dropped += len(texts)
+
+
+def clear_search_index():
+    """Drop every indexed document."""
+    backend = search_backend()
+    if backend is None:
+        return
+    with transaction.atomic():
+        SearchDocument.objects.all().delete()
+        if backend == "sqlite":
+            with connection.cursor() as cursor:
+                # Contentless tables can't DELETE rows without the original text
+                cursor.execute(
+                    "INSERT INTO network_search_fts (network_search_fts) "
+                    "VALUES ('delete-all')"
+                )
+
+
+def parse_query(query):
+    """Split a search box query into terms; quoted text is kept as a phrase."""
+    terms = []
+    for phrase, word in TERM_RE.findall(query):
+        term = (phrase or word).strip()
+        if term:
+            terms.append(term)
+    return terms
+
+
+def _fts_query(terms):
+    # Every term is quoted so FTS5 operators in user input are taken literally;
+    # a trailing * is kept as a prefix search.
+    parts = []
+    for term in terms:
+        prefix = term.endswith("*")
+        term = term.rstrip("*").replace('"', '""')
+        if term:
+            parts.append(f'"{term}"' + ("*" if prefix else ""))
+    return " AND ".join(parts)
+
+
+def ranked_documents(terms, limit=SEARCH_CANDIDATES, offset=0):
+    """Return SearchDocument ids matching all ``terms``, best match first.
+
+    ``offset`` skips that many of the best matches, to page through them.
+    """
+    backend = search_backend()
+    if backend is None or not terms:
+        return []
+    with connection.cursor() as cursor:
+        if backend == "sqlite":
+            match = _fts_query(terms)
+            if not match:
+                return []
+            # Only the newest SEARCH_SCAN_LIMIT matches are ranked so a term
+            # found in millions of outputs doesn't score every one of them
+            cursor.execute(
+                "SELECT rowid FROM (SELECT rowid, bm25(network_search_fts) AS score "
+                "FROM network_search_fts WHERE network_search_fts MATCH %s "
+                "ORDER BY rowid DESC LIMIT %s) ORDER BY score LIMIT %s OFFSET %s",
+                [match, SEARCH_SCAN_LIMIT, limit, offset],
+            )
+        else:
+            cursor.execute(
+                "SELECT id FROM network_searchdocument, "
+                "plainto_tsquery('simple', %s) query WHERE vector @@ query "
+                "ORDER BY ts_rank(vector, query) DESC LIMIT %s OFFSET %s",
+                [" ".join(term.rstrip("*") for term in terms), limit, offset],
+            )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def snippet(text, terms, radius=SNIPPET_RADIUS):
+    """Return ``[(segment, is_match), ...]`` around the first matching term."""
+    words = [re.escape(term.rstrip("*")) for term in terms if term.rstrip("*")]
+    if not words:
+        return [(text[: radius * 2], False)]
+    pattern = re.compile("|".join(words), re.IGNORECASE)
+    first = pattern.search(text)
+    center = first.start() if first else 0
+    start = max(0, center - radius)
+    end = min(len(text), center + radius)
+    excerpt = text[start:end]
+
+    segments = [("…", False)] if start > 0 else []
+    position = 0
+    for match in pattern.finditer(excerpt):
+        if match.start() > position:
+            segments.append((excerpt[position : match.start()], False))
+        segments.append((match.group(), True))
+        position = match.end()
+    segments.append((excerpt[position:], False))
+    if end < len(text):
+        segments.append(("…", False))
+    return segments
+
+
+def search(user, query, limit=50, logs_per_result=5):
+    """Run a search box query and return the results visible to ``user``.
+
+    Task output and command matches are limited to the user's own logs; a
+    config match is shown for the latest config version of a device only.
+    Ranked matches are read SEARCH_CANDIDATES at a time until ``limit``
+    results are visible or the matches run out.
+    """
+    terms = parse_query(query)
+    results = []
+    offset = 0
+    while len(results) < limit:
+        ids = ranked_documents(terms, offset=offset)
+        results += _build_results(
+            user, ids, terms, limit - len(results), logs_per_result
+        )
+        if len(ids) < SEARCH_CANDIDATES:
+            break
+        offset += SEARCH_CANDIDATES
+    return results
+
+
+def _visible_logs(logs, key, refs, count):
+    # The newest ``count`` logs of each ref, in one query for the whole page
+    if not refs:
+        return {}
+    logs = (
+        logs.annotate(ref=key)
+        .filter(ref__in=refs)
+        .annotate(
+            row=Window(RowNumber(), partition_by=[F("ref")], order_by="-timestamp")
+        )
+        .filter(row__lte=count)
+        .order_by("-timestamp")
+    )
+    by_ref = defaultdict(list)
+    for log in logs:
+        by_ref[log.ref].append(log)
+    return by_ref
+
+
+def _build_results(user, ids, terms, limit, logs_per_result):
+    """Return up to ``limit`` results for a page of ranked document ids.
+
+    Visibility is resolved with a fixed number of queries per page, however
+    many of its documents the user can't see.
+    """
+    documents = SearchDocument.objects.in_bulk(ids)
+    refs = defaultdict(set)
+    for document in documents.values():
+        refs[document.kind].add(document.ref)
+
+    configs = ConfigVersion.objects.filter(
+        pk__in=[int(ref) for ref in refs["config"]], is_latest=True
+    ).defer("data")
+    configs = {str(config.pk): config for config in configs}
+    own_logs = TaskLog.objects.filter(user=user)
+    outputs = _visible_logs(
+        own_logs, F("output_blob_id"), refs["output"], logs_per_result + 1
+    )
+    # Titles are cut at 255 characters, so longer commands match by prefix
+    commands = _visible_logs(
+        own_logs.filter(task_type="custom_command"),
+        Left("custom_command", 255),
+        {
+            document.title
+            for document in documents.values()
+            if document.kind == "command"
+        },
+        logs_per_result + 1,
+    )
+
+    results = []
+    for doc_id in ids:
+        document = documents.get(doc_id)
+        if document is None:
+            continue
+        if document.kind == "config":
+            if document.ref in configs:
+                results.append({"kind": "config", "config": configs[document.ref]})
+        else:
+            if document.kind == "output":
+                logs = outputs.get(document.ref)
+            else:
+                logs = commands.get(document.title)
+            if logs:
+                results.append(
+                    {
+                        "kind": document.kind,
+                        "document": document,
+                        "logs": logs[:logs_per_result],
+                        "more": len(logs) > logs_per_result,
+                    }
+                )
+        if len(results) >= limit:
+            break
+
+    # Only the texts of the results kept are loaded
+    blobs = OutputBlob.objects.in_bulk(
+        [result["document"].ref for result in results if result["kind"] == "output"]
+    )
+    for result in results:
+        if result["kind"] == "config":
+            config = result["config"]
+            text = reconstruct_config(config.device_name, config.version)
+        else:
+            document = result.pop("document")
+            text = (
+                blobs[document.ref].text()
+                if document.kind == "output"
+                else document.title
+            )
+        result["snippet"] = snippet(text, terms)
+    return results
@@ -0,0 +1,190 @@
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import DateTimeField, F, Max, Q, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .blobs import LOOKUP_CHUNK_SIZE
+from .models import TaskStat, TaskTotal
+
+STAT_ATTEMPTS = 3
+STAT_FIELDS = [
+    "success_count",
+    "failure_count",
+    "skipped_count",
+    "last_run_at",
+    "last_success_at",
+]
+
+
+def _merge_latest(current, new):
+    if current is None:
+        return new
+    if new is None:
+        return current
+    return max(current, new)
+
+
+def _latest(field, value):
+    # Greatest() returns NULL on SQLite if either side is NULL
+    value = Value(value, output_field=DateTimeField())
+    return Greatest(Coalesce(field, value), value)
+
+
+def record_task_stats(logs):
+    """Fold freshly written TaskLog rows into the TaskStat and TaskTotal rollups.
+
+    Must be called inside the transaction that inserted ``logs`` so the raw
+    log and the rollups never disagree. Skipped rows are counted apart from
+    failures and don't move last_run_at, as nothing was run.
+    """
+
+    def new_delta():
+        return {
+            "success": 0,
+            "failure": 0,
+            "skipped": 0,
+            "last_run": None,
+            "last_success": None,
+        }
+
+    deltas = defaultdict(new_delta)
+    totals = defaultdict(new_delta)
+    for log in logs:
+        key = (timezone.localdate(log.timestamp), log.task_type, log.device_name)
+        for delta in (deltas[key], totals[log.task_type]):
+            if log.status == "skipped":
+                delta["skipped"] += 1
+                continue
+            delta["last_run"] = _merge_latest(delta["last_run"], log.timestamp)
+            if log.status == "success":
+                delta["success"] += 1
+                delta["last_success"] = _merge_latest(
+                    delta["last_success"], log.timestamp
+                )
+            else:
+                delta["failure"] += 1
+
+    _apply_stat_deltas(deltas)
+    # A handful of task types at most, so one upsert each
+    for task_type, delta in totals.items():
+        _apply_delta(TaskTotal, {"task_type": task_type}, delta)
+
+
+def _existing_stats(keys):
+    """Return ``{(day, task_type, device_name): TaskStat}`` of the rows of ``keys``.
+
+    The rows are locked until the transaction ends, so no other writer can
+    add to them between this read and the write of the new counts.
+    """
+    names = defaultdict(list)
+    for day, task_type, device_name in keys:
+        names[(day, task_type)].append(device_name)
+    existing = {}
+    for (day, task_type), device_names in names.items():
+        for i in range(0, len(device_names), LOOKUP_CHUNK_SIZE):
+            rows = TaskStat.objects.select_for_update().filter(
+                day=day,
+                task_type=task_type,
+                device_name__in=device_names[i : i + LOOKUP_CHUNK_SIZE],
+            )
+            existing.update({(day, task_type, row.device_name): row for row in rows})
+    return existing
+
+
+def _stat_row(key, delta, row=None):
+    """Return a TaskStat for ``key`` with ``delta`` added to ``row``'s counts."""
+    day, task_type, device_name = key
+    if row is None:
+        row = TaskStat(day=day, task_type=task_type, device_name=device_name)
+    return TaskStat(
+        day=day,
+        task_type=task_type,
+        device_name=device_name,
+        success_count=row.success_count + delta["success"],
+        failure_count=row.failure_count + delta["failure"],
+        skipped_count=row.skipped_count + delta["skipped"],
+        last_run_at=_merge_latest(row.last_run_at, delta["last_run"]),
+        last_success_at=_merge_latest(row.last_success_at, delta["last_success"]),
+    )
+
+
+def _apply_stat_deltas(deltas, attempts=STAT_ATTEMPTS):
+    """Add ``deltas`` to their TaskStat rows, creating the missing ones.
+
+    The rows of a batch are read together and locked, and their new counts
+    are written back with one upsert per chunk instead of one UPDATE per
+    row; the missing rows are inserted with one ``bulk_create``. If another
+    writer inserts some of them first, the insert is rolled back to its
+    savepoint and those rows are read and added to instead.
+    """
+    for attempt in range(1, attempts + 1):
+        existing = _existing_stats(deltas)
+        TaskStat.objects.bulk_create(
+            [_stat_row(key, deltas[key], row) for key, row in existing.items()],
+            batch_size=LOOKUP_CHUNK_SIZE,
+            update_conflicts=True,
+            unique_fields=["day", "task_type", "device_name"],
+            update_fields=STAT_FIELDS,
+        )
+
+        deltas = {key: delta for key, delta in deltas.items() if key not in existing}
+        if not deltas:
+            return
+        try:
+            with transaction.atomic():
+                TaskStat.objects.bulk_create(
+                    [_stat_row(key, delta) for key, delta in deltas.items()],
+                    batch_size=LOOKUP_CHUNK_SIZE,
+                )
+            return
+        except IntegrityError:
+            if attempt == attempts:
+                raise
+
+
+def _apply_delta(model, key, delta):
+    rows = model.objects.filter(**key)
+    updates = {
+        "success_count": F("success_count") + delta["success"],
+        "failure_count": F("failure_count") + delta["failure"],
+        "skipped_count": F("skipped_count") + delta["skipped"],
+    }
+    if delta["last_run"] is not None:
+        updates["last_run_at"] = _latest("last_run_at", delta["last_run"])
+    if delta["last_success"] is not None:
+        updates["last_success_at"] = _latest("last_success_at", delta["last_success"])
+
+    if rows.update(**updates):
+        return
+
+    try:
+        with transaction.atomic():
+            model.objects.create(
+                **key,
+                success_count=delta["success"],
+                failure_count=delta["failure"],
+                skipped_count=delta["skipped"],
+                last_run_at=delta["last_run"],
+                last_success_at=delta["last_success"],
+            )
+    except IntegrityError:
+        # Another writer created the row between our UPDATE and INSERT
+        rows.update(**updates)
+
+
+def dashboard_stats():
+    """Return the dashboard's task totals from the per-task-type rollup."""
+    totals = TaskTotal.objects.aggregate(
+        success=Sum("success_count"),
+        failure=Sum("failure_count"),
+        skipped=Sum("skipped_count"),
+        last_backup=Max("last_success_at", filter=Q(task_type="backup_config")),
+    )
+    return {
+        "success": totals["success"] or 0,
+        "failure": totals["failure"] or 0,
+        "skipped": totals["skipped"] or 0,
+        "last_backup": totals["last_backup"],
+    }
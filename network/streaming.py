@@ -0,0 +1,93 @@
+import asyncio
+import json
+import time
+
+from django.db.models import Q
+
+from .models import Job, TaskLog
+
+STREAM_BATCH_SIZE = 100
+KEEPALIVE_INTERVAL = 15.0
+
+
+def sse_event(event, data, event_id=None):
+    """Format one Server-Sent Events message."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def log_event(log):
+    """Return one TaskLog of a job as the host result shown on the job page."""
+    event = {
+        "host": log.device_name,
+        "status": log.status,
+        "duration": log.duration,
+        "output": log.output,
+        "timestamp": log.timestamp.isoformat(),
+    }
+    if log.batch_id is not None:
+        # One event per command of a batch; the page groups them by host
+        event.update(command=log.custom_command, batch_index=log.batch_index)
+    return event
+
+
+def host_event(log, completed, total):
+    return {**log_event(log), "completed": completed, "total": total}
+
+
+async def job_events(job, last_id=0, poll_interval=0.5):
+    """Yield an SSE message for every TaskLog of ``job`` as it is written.
+
+    Only rows newer than ``last_id`` are read on each poll, a batch at a time,
+    so neither side holds more than one batch of outputs in memory. A "done"
+    event is sent once the job has finished and every row has been streamed.
+    """
+    total = len(job.devices)
+    logs = TaskLog.objects.filter(job_id=job.pk).select_related("output_blob")
+    # The first row of a batch counts its host as completed
+    first_rows = Q(batch_index=None) | Q(batch_index=0)
+    completed = await logs.filter(first_rows, id__lte=last_id).acount()
+    last_sent = time.monotonic()
+
+    while True:
+        # Read the status first so rows flushed just before the job finished
+        # are still picked up by the query below.
+        status = (
+            await Job.objects.filter(pk=job.pk)
+            .values_list("status", flat=True)
+            .afirst()
+        )
+
+        batch = [
+            log
+            async for log in logs.filter(id__gt=last_id).order_by("id")[
+                :STREAM_BATCH_SIZE
+            ]
+        ]
+        for log in batch:
+            if log.batch_index in (None, 0):
+                completed += 1
+            last_id = log.id
+            yield sse_event("host", host_event(log, completed, total), log.id)
+        if batch:
+            last_sent = time.monotonic()
+            if len(batch) == STREAM_BATCH_SIZE:
+                continue
+
+        if status in ("completed", "failed"):
+            finished = (
+                await Job.objects.filter(pk=job.pk).values("status", "error").afirst()
+            )
+            yield sse_event(
+                "done", {**finished, "completed": completed, "total": total}
+            )
+            return
+
+        if time.monotonic() - last_sent >= KEEPALIVE_INTERVAL:
+            last_sent = time.monotonic()
+            yield ": keepalive\n\n"
+        await asyncio.sleep(poll_interval)
@@ -0,0 +1,121 @@
+import tempfile
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, TestCase, override_settings
+from nornir.core.task import Result
+
+from core.async_ssh import AsyncSSHSession
+from core.fake_ssh import FAKE_PASSWORD, FAKE_USERNAME
+from core.runners import AsyncioRunner, runner_config
+from core.tasks import run_custom_command, save_config, show_ip
+from network.checks import check_runner
+from network.models import TaskLog
+from network.results import TaskLogSink
+
+from .utils import FakeDevices, fake_nornir, reset_caches
+
+
+def session_for(devices, name="r0", **kwargs):
+    host = devices.hosts[name]
+    return AsyncSSHSession(
+        host["hostname"],
+        port=host["port"],
+        username=FAKE_USERNAME,
+        password=kwargs.pop("password", FAKE_PASSWORD),
+        name=name,
+        **kwargs,
+    )
+
+
+@async_to_sync
+async def send(session, *commands):
+    async with session:
+        return [await session.send_command(command) for command in commands]
+
+
+def hostname(task):
+    return Result(host=task.host, result=task.host.hostname)
+
+
+class AsyncSSHSessionTests(SimpleTestCase):
+    def setUp(self):
+        self.devices = self.enterContext(FakeDevices(1, interfaces=2))
+
+    def test_commands_return_their_output_only(self):
+        session = session_for(self.devices)
+        brief, saved = send(
+            session, "show ip interface brief", "copy running-config startup-config"
+        )
+        self.assertEqual(session.prompt, "r0#")
+        self.assertEqual(len(brief.splitlines()), 3)
+        self.assertTrue(brief.startswith("Interface"))
+        self.assertNotIn("r0#", brief)
+        self.assertTrue(saved.endswith("[OK]"))
+        self.assertFalse(session.connected)
+
+    def test_rejected_login(self):
+        with self.assertRaises(Exception):
+            send(session_for(self.devices, password="wrong"), "show version")
+
+
+class AsyncioRunnerTests(TestCase):
+    def setUp(self):
+        reset_caches()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.devices = self.enterContext(FakeDevices(3))
+        self.nr = fake_nornir(self.devices, directory.name).with_runner(
+            AsyncioRunner(num_workers=2)
+        )
+
+    def test_hosts_run_on_the_event_loop(self):
+        sink = TaskLogSink("show_ip", flush_interval=3600)
+        with sink:
+            result = self.nr.with_processors([sink]).run(task=show_ip, use_cache=False)
+        self.assertFalse(result.failed)
+        self.assertEqual(sorted(result), ["r0", "r1", "r2"])
+        self.assertIn("GigabitEthernet0/3", result["r1"][0].result)
+        logs = TaskLog.objects.order_by("device_name")
+        self.assertEqual([log.status for log in logs], ["success"] * 3)
+        self.assertTrue(all(log.connect_time is not None for log in logs))
+        self.assertTrue(all(log.duration is not None for log in logs))
+
+    def test_commands_needing_confirmation_and_batches(self):
+        result = self.nr.filter(name="r0").run(task=save_config)
+        self.assertIn("[OK]", result["r0"][0].result)
+        result = self.nr.filter(name="r0").run(
+            task=run_custom_command,
+            command="show version\nshow bogus",
+            use_cache=False,
+        )
+        batch = result["r0"][0].result
+        self.assertEqual([item["status"] for item in batch], ["success", "failure"])
+        self.assertTrue(result["r0"].failed)
+
+    def test_unreachable_hosts_fail_on_their_own(self):
+        self.nr.inventory.hosts["r2"].port = 1
+        result = self.nr.run(task=show_ip, use_cache=False)
+        self.assertEqual(sorted(result.failed_hosts), ["r2"])
+        self.assertFalse(result["r0"].failed)
+
+    def test_other_tasks_run_on_threads(self):
+        result = self.nr.run(task=hostname)
+        self.assertEqual(result["r0"][0].result, "127.0.0.1")
+
+
+class AsyncioSettingsTests(SimpleTestCase):
+    @override_settings(NORNIR_RUNNER={"plugin": "asyncio", "async_workers": 300})
+    def test_runner_needs_asyncssh(self):
+        self.assertEqual(
+            runner_config(), {"plugin": "asyncio", "options": {"num_workers": 300}}
+        )
+        self.assertEqual(check_runner(None), [])
+        with mock.patch("core.runners.asyncssh", None):
+            with self.assertRaises(ImproperlyConfigured):
+                runner_config()
+        with mock.patch("network.checks.asyncssh", None):
+            self.assertEqual(
+                [error.id for error in check_runner(None)], ["network.E001"]
+            )
@@ -0,0 +1,77 @@
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from core.connection_pool import ConnectionPool
+from core.tasks import rejected, run_custom_command, split_commands
+from network.models import TaskLog
+from network.results import TaskLogSink
+
+from .utils import FakeDevices, fake_nornir
+
+COMMANDS = "show version\n\nshow bogus\nshow ip interface brief\n"
+
+
+class SplitCommandsTests(SimpleTestCase):
+    def test_blank_lines_are_dropped(self):
+        self.assertEqual(
+            split_commands(COMMANDS),
+            ["show version", "show bogus", "show ip interface brief"],
+        )
+
+    def test_rejected(self):
+        self.assertTrue(rejected("\n% Invalid input detected at '^' marker."))
+        self.assertFalse(rejected("Gi0/1 is up\n% of traffic: 5"))
+
+
+class CommandBatchTests(TestCase):
+    def setUp(self):
+        directory = self.enterContext(tempfile.TemporaryDirectory())
+        self.devices = self.enterContext(FakeDevices(2))
+        self.nr = fake_nornir(self.devices, directory)
+        pool = ConnectionPool()
+        self.enterContext(mock.patch("core.connection_pool._pool", pool))
+        self.addCleanup(pool.close_all)
+
+    def run_batch(self, **kwargs):
+        result = self.nr.run(
+            task=run_custom_command, command=COMMANDS, use_cache=False, **kwargs
+        )
+        return {name: host[0].result for name, host in result.items()}
+
+    def test_a_rejected_command_fails_on_its_own(self):
+        batches = self.run_batch()
+        for batch in batches.values():
+            self.assertEqual(
+                [item["status"] for item in batch], ["success", "failure", "success"]
+            )
+            self.assertTrue(batch.failed)
+            self.assertTrue(batch[2]["output"].startswith("Interface"))
+
+    def test_stop_on_error_skips_the_rest(self):
+        batch = self.run_batch(stop_on_error=True)["r0"]
+        self.assertEqual(
+            [item["status"] for item in batch], ["success", "failure", "failure"]
+        )
+        self.assertIsNone(batch[2]["duration"])
+        self.assertIn("Not run", batch[2]["output"])
+
+    def test_sink_logs_one_row_per_command(self):
+        with TaskLogSink(
+            "custom_command", custom_command=COMMANDS, flush_interval=3600
+        ) as sink:
+            self.nr.with_processors([sink]).run(
+                task=run_custom_command, command=COMMANDS, use_cache=False
+            )
+        logs = TaskLog.objects.filter(device_name="r1").order_by("batch_index")
+        self.assertEqual(
+            [(log.batch_index, log.custom_command, log.status) for log in logs],
+            [
+                (0, "show version", "success"),
+                (1, "show bogus", "failure"),
+                (2, "show ip interface brief", "success"),
+            ],
+        )
+        self.assertEqual(len({log.batch_id for log in logs}), 1)
+        self.assertIn("fake device r1", logs[0].output)
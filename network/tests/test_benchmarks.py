@@ -0,0 +1,110 @@
+import tempfile
+import uuid
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+
+from network.benchmarks import (
+    benchmark_report,
+    compare_results,
+    first_hosts,
+    host_latencies,
+    load_report,
+    percentile,
+    save_report,
+)
+from network.models import TaskLog
+
+
+class PercentileTests(SimpleTestCase):
+    def test_nearest_rank(self):
+        values = [5, 1, 4, 2, 3]
+        self.assertEqual(percentile(values, 50), 3)
+        self.assertEqual(percentile(values, 99), 5)
+        self.assertEqual(percentile(values, 0), 1)
+
+    def test_empty(self):
+        self.assertIsNone(percentile([], 50))
+
+
+class HostLatencyTests(TestCase):
+    def test_batch_durations_are_added_up(self):
+        user = User.objects.create(username="bench")
+        batch = uuid.uuid4()
+        TaskLog.objects.bulk_create(
+            [
+                TaskLog(
+                    device_name="r1",
+                    task_type="show_ip",
+                    status="success",
+                    duration=1.5,
+                    user=user,
+                ),
+                TaskLog(
+                    device_name="r2",
+                    task_type="custom_command",
+                    status="success",
+                    duration=0.5,
+                    batch_id=batch,
+                    batch_index=0,
+                    user=user,
+                ),
+                TaskLog(
+                    device_name="r2",
+                    task_type="custom_command",
+                    status="success",
+                    duration=0.25,
+                    batch_id=batch,
+                    batch_index=1,
+                    user=user,
+                ),
+                TaskLog(
+                    device_name="r3",
+                    task_type="show_ip",
+                    status="failure",
+                    duration=None,
+                    user=user,
+                ),
+            ]
+        )
+        self.assertEqual(sorted(host_latencies(TaskLog.objects.all())), [0.75, 1.5])
+
+
+class CompareResultsTests(SimpleTestCase):
+    def result(self, **metrics):
+        return {"path": "nornir", "task": "show_ip", "hosts": 100, **metrics}
+
+    def test_regressions_beyond_tolerance(self):
+        baseline = {"results": [self.result(throughput=100.0, p99=2.0)]}
+        regressions = compare_results(
+            [self.result(throughput=60.0, p99=2.1)], baseline, tolerance=0.25
+        )
+        self.assertEqual([row["metric"] for row in regressions], ["throughput"])
+        self.assertEqual(regressions[0]["change"], 0.4)
+
+    def test_improvements_and_unmatched_scenarios_pass(self):
+        baseline = {"results": [self.result(throughput=100.0)]}
+        results = [
+            self.result(throughput=150.0),
+            {**self.result(throughput=1.0), "hosts": 5000},
+        ]
+        self.assertEqual(compare_results(results, baseline), [])
+
+    def test_changes_under_the_noise_floor_pass(self):
+        baseline = {"results": [self.result(p99=0.001)]}
+        self.assertEqual(compare_results([self.result(p99=0.005)], baseline), [])
+
+
+class ReportTests(SimpleTestCase):
+    def test_reports_round_trip(self):
+        report = benchmark_report([{"path": "nornir", "hosts": 10}], {"latency": 0})
+        self.assertEqual(report["environment"]["database"], "sqlite")
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "nested" / "baseline.json"
+            save_report(report, path)
+            self.assertEqual(load_report(path), report)
+
+    def test_first_hosts(self):
+        hosts = {f"fake{n}": {} for n in range(5)}
+        self.assertEqual(list(first_hosts(hosts, 2)), ["fake0", "fake1"])
@@ -0,0 +1,50 @@
+import zlib
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from network.blobs import load_outputs, output_digest, store_outputs
+from network.models import OutputBlob
+
+from .utils import write_logs
+
+
+class BlobTests(TestCase):
+    def test_identical_outputs_are_stored_once(self):
+        digests = store_outputs(["a", "b", "a", None])
+        self.assertEqual(digests[0], digests[2])
+        self.assertEqual(digests[3], output_digest(""))
+        self.assertEqual(OutputBlob.objects.count(), 3)
+        with self.assertNumQueries(1):
+            # Only the lookup; every blob already exists
+            store_outputs(["b", "a"])
+
+    def test_outputs_are_compressed(self):
+        text = "GigabitEthernet0/1 up up\n" * 200
+        (digest,) = store_outputs([text])
+        blob = OutputBlob.objects.get(digest=digest)
+        self.assertEqual(blob.size, len(text))
+        self.assertLess(len(blob.data), len(text) // 10)
+        self.assertEqual(zlib.decompress(blob.data).decode(), text)
+        self.assertEqual(blob.text(), text)
+
+    def test_logs_share_a_blob(self):
+        user = User.objects.create(username="ops")
+        logs = write_logs("show_ip", [("r1", "one"), ("r2", "one")], user=user)
+        self.assertEqual(logs[0].output_blob_id, logs[1].output_blob_id)
+        self.assertEqual(OutputBlob.objects.count(), 1)
+        with self.assertNumQueries(1):
+            self.assertEqual(load_outputs(logs), {logs[0].pk: "one", logs[1].pk: "one"})
+
+
+class TaskLogDetailTests(TestCase):
+    def test_output_is_read_from_the_blob(self):
+        user = User.objects.create(username="ops")
+        other = User.objects.create(username="other")
+        self.client.force_login(user)
+        [log] = write_logs("show_ip", [("r1", "Gi0/0 up")], user=user)
+        [hidden] = write_logs("show_ip", [("r1", "not mine")], user=other)
+        self.assertContains(self.client.get(f"/execution-logs/{log.pk}/"), "Gi0/0 up")
+        self.assertEqual(
+            self.client.get(f"/execution-logs/{hidden.pk}/").status_code, 404
+        )
@@ -0,0 +1,56 @@
+from django.test import TestCase
+
+from network.choices import get_filter_choices, record_filter_choices
+from network.forms import TaskLogFilterForm
+from network.models import TaskLog, TaskLogChoice
+
+from .utils import reset_caches, write_logs
+
+
+def task_log(device_name, task_type="show_ip"):
+    return TaskLog(device_name=device_name, task_type=task_type, status="success")
+
+
+class FilterChoiceTests(TestCase):
+    def setUp(self):
+        reset_caches()
+
+    def test_only_new_values_are_written(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(record_filter_choices([task_log("r1"), task_log("r2")]), 3)
+        self.assertEqual(record_filter_choices([task_log("r1"), task_log("r3")]), 1)
+        self.assertEqual(
+            sorted(TaskLogChoice.objects.values_list("field", "value")),
+            [
+                ("device_name", "r1"),
+                ("device_name", "r2"),
+                ("device_name", "r3"),
+                ("task_type", "show_ip"),
+            ],
+        )
+
+    def test_known_values_cost_no_queries(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            record_filter_choices([task_log("r1")])
+        with self.assertNumQueries(0):
+            record_filter_choices([task_log("r1")])
+
+    def test_choices_are_cached_until_the_table_changes(self):
+        write_logs("show_ip", [("r2", "up"), ("r1", "up")])
+        self.assertEqual(
+            get_filter_choices(),
+            {"device_name": ["r1", "r2"], "task_type": ["show_ip"]},
+        )
+        with self.assertNumQueries(1):
+            get_filter_choices()
+
+        # Written by another process, which this one's cache doesn't know of
+        TaskLogChoice.objects.create(field="device_name", value="r3")
+        self.assertEqual(get_filter_choices()["device_name"], ["r1", "r2", "r3"])
+
+    def test_filter_form_uses_the_choices(self):
+        write_logs("backup_config", [("r1", "hostname r1")])
+        form = TaskLogFilterForm({"device_name": "r1", "task_type": "backup_config"})
+        self.assertTrue(form.is_valid())
+        form = TaskLogFilterForm({"device_name": "r9"})
+        self.assertFalse(form.is_valid())
@@ -0,0 +1,108 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from network import configs
+from network.blobs import load_outputs
+from network.configs import normalize_config, reconstruct_config
+from network.models import ConfigVersion
+
+from .utils import write_logs
+
+CONFIG = "Building configuration...\n!\nhostname r1\ninterface Gi0/1\n shutdown\n"
+
+
+def backup(*outputs):
+    return write_logs("backup_config", [("r1", output) for output in outputs])
+
+
+class ConfigVersionTests(TestCase):
+    def test_versions_are_rebuilt_from_snapshot_and_deltas(self):
+        texts = [
+            CONFIG,
+            CONFIG.replace(" shutdown", " no shutdown"),
+            CONFIG + "interface Gi0/2\n description uplink\n",
+        ]
+        for text in texts:
+            backup(text)
+        first, second, third = ConfigVersion.objects.order_by("version")
+        self.assertTrue(first.is_snapshot)
+        self.assertFalse(second.is_snapshot)
+        self.assertEqual((second.lines_added, second.lines_removed), (1, 1))
+        self.assertEqual(third.base_version, 1)
+        for version, text in enumerate(texts, start=1):
+            self.assertEqual(reconstruct_config("r1", version), normalize_config(text))
+        self.assertEqual(list(ConfigVersion.objects.filter(is_latest=True)), [third])
+
+    @override_settings(CONFIG_SNAPSHOT_INTERVAL=2)
+    def test_snapshot_interval(self):
+        for n in range(4):
+            backup(f"{CONFIG}ntp server 10.0.0.{n}")
+        self.assertEqual(
+            list(
+                ConfigVersion.objects.order_by("version").values_list(
+                    "is_snapshot", flat=True
+                )
+            ),
+            [True, False, True, False],
+        )
+        self.assertEqual(
+            reconstruct_config("r1"), normalize_config(f"{CONFIG}ntp server 10.0.0.3")
+        )
+
+    def test_unchanged_config_is_skipped(self):
+        backup(CONFIG)
+        [log] = backup(CONFIG.replace("Building configuration...", ""))
+        self.assertEqual(ConfigVersion.objects.count(), 1)
+        self.assertIn("unchanged since version 1", load_outputs([log])[log.pk])
+
+    def test_two_backups_in_one_flush(self):
+        backup(CONFIG, CONFIG + "ip routing\n")
+        self.assertEqual(
+            list(ConfigVersion.objects.values_list("version", "is_latest")),
+            [(1, False), (2, True)],
+        )
+
+    def test_version_number_collision_is_retried(self):
+        backup(CONFIG)
+        build = configs.build_config_versions
+
+        def racing_build(logs, outputs):
+            # Another worker stores version 2 after this one read the head
+            result = build(logs, outputs)
+            if not ConfigVersion.objects.filter(version=2).exists():
+                backup_elsewhere = build(logs, [CONFIG + "ip routing\n"])[0]
+                configs.save_config_versions(backup_elsewhere)
+            return result
+
+        with mock.patch.object(configs, "build_config_versions", racing_build):
+            [log] = backup(CONFIG + "ip domain-name lab\n")
+        self.assertEqual(
+            list(ConfigVersion.objects.values_list("version", "is_latest")),
+            [(1, False), (2, False), (3, True)],
+        )
+        self.assertEqual(ConfigVersion.objects.get(version=3).task_log, log)
+        self.assertIn("version 3", load_outputs([log])[log.pk])
+
+
+class ConfigViewTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create(username="ops"))
+        backup(CONFIG)
+        backup(CONFIG.replace(" shutdown", " no shutdown"))
+
+    def test_history_lists_versions_newest_first(self):
+        response = self.client.get("/configs/r1/")
+        self.assertEqual(
+            [version.version for version in response.context["versions"]], [2, 1]
+        )
+        self.assertEqual(self.client.get("/configs/r9/").status_code, 404)
+
+    def test_version_shows_its_diff(self):
+        response = self.client.get("/configs/r1/2/")
+        self.assertEqual(response.context["text"], reconstruct_config("r1", 2))
+        self.assertIn("- shutdown", response.context["diff"])
+        self.assertIn("+ no shutdown", response.context["diff"])
+        self.assertIsNone(self.client.get("/configs/r1/1/").context["diff"])
+        self.assertEqual(self.client.get("/configs/r1/3/").status_code, 404)
@@ -0,0 +1,115 @@
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from core.connection_pool import ConnectionPool, PoolExhausted
+from core.tasks import show_ip
+
+from .utils import FakeDevices, fake_nornir
+
+
+class FakeConnection:
+    def __init__(self, healthy=True):
+        self.healthy = healthy
+        self.disconnected = False
+        self.host = "10.0.0.1"
+
+    def find_prompt(self):
+        if not self.healthy:
+            raise OSError("Socket is closed")
+        return "r1#"
+
+    def disconnect(self):
+        self.disconnected = True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def test_returned_sessions_are_reused(self):
+        pool = ConnectionPool()
+        first = pool.checkout("r1", FakeConnection)
+        self.assertEqual(pool.stats()["in_use"], 1)
+        pool.checkin("r1", first)
+        self.assertIs(pool.checkout("r1", FakeConnection), first)
+        self.assertIsNot(pool.checkout("r1", FakeConnection), first)
+        stats = pool.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["in_use"]), (1, 2, 2))
+
+    def test_expired_and_unhealthy_sessions_are_closed(self):
+        pool = ConnectionPool(idle_timeout=60)
+        expired = pool.checkout("r1", FakeConnection)
+        pool.checkin("r1", expired)
+        with mock.patch("core.connection_pool.time.monotonic", return_value=1e9):
+            fresh = pool.checkout("r1", FakeConnection)
+        self.assertTrue(expired.disconnected)
+
+        fresh.healthy = False
+        pool.checkin("r1", fresh)
+        self.assertIsNot(pool.checkout("r1", FakeConnection), fresh)
+        self.assertTrue(fresh.disconnected)
+        stats = pool.stats()
+        self.assertEqual((stats["expired"], stats["probe_failures"]), (1, 1))
+
+    def test_least_recently_used_idle_sessions_are_evicted(self):
+        pool = ConnectionPool(max_size=1)
+        first = pool.checkout("r1", FakeConnection)
+        second = pool.checkout("r2", FakeConnection)
+        pool.checkin("r1", first)
+        pool.checkin("r2", second)
+        self.assertTrue(first.disconnected)
+        self.assertFalse(second.disconnected)
+        self.assertEqual((pool.stats()["evicted"], pool.stats()["idle"]), (1, 1))
+
+    def test_checkout_waits_for_a_session_to_be_returned(self):
+        pool = ConnectionPool(max_in_use=1)
+        first = pool.checkout("r1", FakeConnection)
+        threading.Timer(0.05, pool.checkin, ("r1", first)).start()
+        started = time.monotonic()
+        second = pool.checkout("r2", FakeConnection)
+        self.assertGreaterEqual(time.monotonic() - started, 0.04)
+        self.assertEqual(pool.stats()["waits"], 1)
+        pool.discard(second)
+        self.assertEqual(pool.stats()["in_use"], 0)
+
+    def test_checkout_gives_up_after_the_timeout(self):
+        pool = ConnectionPool(max_in_use=1, checkout_timeout=0.01)
+        pool.checkout("r1", FakeConnection)
+        with self.assertRaises(PoolExhausted):
+            pool.checkout("r2", FakeConnection)
+        self.assertEqual(pool.stats()["in_use"], 1)
+
+    def test_failed_connect_frees_its_slot(self):
+        pool = ConnectionPool(max_in_use=1)
+
+        def refuse():
+            raise OSError("Connection refused")
+
+        with self.assertRaises(OSError):
+            pool.checkout("r1", refuse)
+        self.assertEqual(pool.stats()["in_use"], 0)
+
+
+class PooledSessionTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.devices = FakeDevices(3)
+        self.enterContext(self.devices)
+        self.nr = fake_nornir(self.devices, directory.name)
+        self.pool = ConnectionPool(max_in_use=2)
+        self.enterContext(mock.patch("core.connection_pool._pool", self.pool))
+        self.addCleanup(self.pool.close_all)
+
+    def test_sessions_are_returned_as_each_host_finishes(self):
+        result = self.nr.run(task=show_ip, use_cache=False)
+        self.assertFalse(result.failed)
+        stats = self.pool.stats()
+        self.assertEqual((stats["in_use"], stats["idle"], stats["misses"]), (0, 3, 3))
+        self.assertTrue(
+            all(not host.connections for host in self.nr.inventory.hosts.values())
+        )
+
+        self.nr.run(task=show_ip, use_cache=False)
+        self.assertEqual(self.pool.stats()["hits"], 3)
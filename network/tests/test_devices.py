@@ -0,0 +1,86 @@
+import io
+import tempfile
+from pathlib import Path
+
+import yaml
+from django.core.management import call_command
+from django.test import TestCase
+
+from network.devices import apply_device_diff, diff_devices
+from network.models import NetworkDevice
+
+HOST = {"hostname": "10.0.0.1", "platform": "ios", "username": "u", "password": "p"}
+
+
+class DiffDevicesTests(TestCase):
+    def test_sync_creates_updates_and_prunes(self):
+        NetworkDevice.objects.create(name="old", **HOST)
+        NetworkDevice.objects.create(name="r1", **HOST)
+        diff = diff_devices(
+            {
+                "r1": {**HOST, "data": {"site": "A", "tags": ["lab"]}},
+                "r2": {**HOST, "groups": ["core"]},
+            },
+            prune=True,
+        )
+        self.assertEqual([device.name for device in diff["create"]], ["r2"])
+        self.assertEqual(
+            diff["changes"]["r1"], [("site", "", "A"), ("tags", [], ["lab"])]
+        )
+        self.assertEqual([device.name for device in diff["delete"]], ["old"])
+        apply_device_diff(diff)
+        self.assertEqual(
+            sorted(NetworkDevice.objects.values_list("name", flat=True)), ["r1", "r2"]
+        )
+        self.assertEqual(NetworkDevice.objects.get(name="r2").groups, ["core"])
+
+    def test_unchanged_hosts_cost_one_query(self):
+        NetworkDevice.objects.create(name="r1", **HOST)
+        with self.assertNumQueries(1):
+            diff = diff_devices({"r1": HOST})
+        self.assertEqual((diff["create"], diff["update"]), ([], []))
+
+    def test_malformed_hosts_are_reported(self):
+        diff = diff_devices(
+            {
+                "list-data": {**HOST, "data": ["site", "A"]},
+                "string-groups": {**HOST, "groups": "core"},
+                "string-tags": {**HOST, "data": {"tags": "lab"}},
+                "not-a-mapping": "10.0.0.1",
+                "no-platform": {"hostname": "10.0.0.1"},
+            }
+        )
+        self.assertEqual(diff["create"], [])
+        self.assertEqual(
+            diff["errors"],
+            {
+                "list-data": "data is not a mapping",
+                "string-groups": "groups is not a list of names",
+                "string-tags": "tags is not a list of names",
+                "not-a-mapping": "Host entry is not a mapping",
+                "no-platform": "Missing required field 'platform'",
+            },
+        )
+
+
+class SyncDevicesCommandTests(TestCase):
+    def sync(self, hosts, *args):
+        directory = self.enterContext(tempfile.TemporaryDirectory())
+        path = Path(directory) / "hosts.yaml"
+        path.write_text(yaml.safe_dump(hosts))
+        out = io.StringIO()
+        call_command("sync_devices", "--hosts-file", str(path), *args, stdout=out)
+        return out.getvalue()
+
+    def test_dry_run_writes_nothing(self):
+        output = self.sync({"r1": HOST}, "--dry-run")
+        self.assertIn("Added device r1", output)
+        self.assertFalse(NetworkDevice.objects.exists())
+
+    def test_prune(self):
+        NetworkDevice.objects.create(name="old", **HOST)
+        output = self.sync({"r1": HOST}, "--prune")
+        self.assertIn("Added: 1, Updated: 0, Deleted: 1, Unchanged: 0", output)
+        self.assertEqual(
+            list(NetworkDevice.objects.values_list("name", flat=True)), ["r1"]
+        )
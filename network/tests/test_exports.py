@@ -0,0 +1,52 @@
+import csv
+import io
+import json
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from .utils import reset_caches, write_logs
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        reset_caches()
+        self.user = User.objects.create(username="ops")
+        self.other = User.objects.create(username="other")
+        self.client.force_login(self.user)
+        write_logs(
+            "show_ip", [(f"r{n}", f"Gi0/{n} up") for n in range(12)], user=self.user
+        )
+        write_logs("show_ip", [("r0", "not mine")], user=self.other)
+
+    def export(self, **params):
+        response = self.client.get("/execution-logs/export/", params)
+        return response, b"".join(response.streaming_content).decode()
+
+    def test_export_ndjson(self):
+        response, body = self.export(format="ndjson", device_name="r0")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        records = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(
+            [(record["device_name"], record["output"]) for record in records],
+            [("r0", "Gi0/0 up")],
+        )
+
+    def test_export_csv(self):
+        response, body = self.export(format="csv")
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual(len(rows), 12)
+        self.assertEqual(rows[0]["device_name"], "r11")  # newest first
+        self.assertIn(
+            'attachment; filename="tasklogs-', response["Content-Disposition"]
+        )
+
+    def test_export_rejects_bad_requests(self):
+        self.assertEqual(
+            self.client.get("/execution-logs/export/", {"format": "xml"}).status_code,
+            400,
+        )
+        response = self.client.get(
+            "/execution-logs/export/", {"format": "csv", "device_name": "nope"}
+        )
+        self.assertEqual(response.status_code, 400)
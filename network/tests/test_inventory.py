@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+
+from core.inventory import DjangoInventory, load_hosts
+from core.nornir_init import invalidate_inventory, inventory_version
+from network.devices import apply_device_diff, diff_devices
+from network.models import NetworkDevice
+
+HOST = {"hostname": "10.0.0.1", "platform": "ios", "username": "u", "password": "p"}
+GROUP_FILE = settings.BASE_DIR / "groups.yaml"
+
+
+class DjangoInventoryTests(TestCase):
+    def test_hosts_are_built_from_devices(self):
+        NetworkDevice.objects.create(
+            name="r1", groups=["ios", "missing"], site="A", tags=["lab"], **HOST
+        )
+        NetworkDevice.objects.create(name="r2", **{**HOST, "platform": ""})
+        with self.assertLogs("core.inventory", "WARNING"):
+            inventory = DjangoInventory(
+                group_file=GROUP_FILE, defaults={"platform": "eos"}
+            ).load()
+        r1, r2 = inventory.hosts["r1"], inventory.hosts["r2"]
+        self.assertEqual([group.name for group in r1.groups], ["ios"])
+        self.assertEqual((r1["site"], r1["tags"]), ("A", ["lab"]))
+        self.assertEqual(r1.get_connection_parameters("netmiko").platform, "cisco_ios")
+        self.assertEqual(r2.platform, "eos")
+
+    def test_named_devices_only(self):
+        for name in ("r1", "r2", "r3"):
+            NetworkDevice.objects.create(name=name, **HOST)
+        NetworkDevice.objects.create(name="r1", **{**HOST, "hostname": "10.0.0.9"})
+        hosts = load_hosts(["r3", "r1", "r9"], {}, None)
+        self.assertEqual(sorted(hosts), ["r1", "r3"])
+        # Duplicate names keep the oldest row
+        self.assertEqual(hosts["r1"].hostname, "10.0.0.1")
+
+    def test_malformed_rows_are_left_out_of_the_inventory(self):
+        NetworkDevice.objects.create(name="good", groups=[], **HOST)
+        NetworkDevice.objects.create(name="bad", groups="core", **HOST)
+        with self.assertLogs("core.inventory", "ERROR"):
+            hosts = load_hosts(None, {}, None)
+        self.assertEqual(list(hosts), ["good"])
+
+    def test_clean_requires_lists_of_names(self):
+        with self.assertRaises(ValidationError) as raised:
+            NetworkDevice(name="r1", groups="core", tags=[1], **HOST).clean()
+        self.assertEqual(set(raised.exception.message_dict), {"groups", "tags"})
+
+
+class InventoryVersionTests(TestCase):
+    def test_inventory_version_is_shared(self):
+        version = inventory_version()
+        invalidate_inventory()
+        invalidate_inventory()
+        self.assertEqual(inventory_version(), version + 2)
+
+    def test_device_writes_bump_the_version(self):
+        version = inventory_version()
+        apply_device_diff(diff_devices({"r1": HOST}))
+        self.assertEqual(inventory_version(), version + 1)
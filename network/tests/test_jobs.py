@@ -0,0 +1,78 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from nornir.core.task import Result
+
+from network.jobs import claim_job, enqueue_job, requeue_running_jobs, run_job
+from network.models import Job, NetworkDevice, TaskLog
+
+from .utils import reset_caches
+
+
+def fake_show_ip(task, use_cache=True):
+    return Result(host=task.host, result=f"{task.host.name} up")
+
+
+class ClaimJobTests(TestCase):
+    def test_jobs_are_claimed_oldest_first_and_once(self):
+        first = enqueue_job("show_ip", ["r1"])
+        second = enqueue_job("show_ip", ["r2"])
+        self.assertEqual(claim_job("w1"), first)
+        self.assertEqual(claim_job("w2"), second)
+        self.assertIsNone(claim_job("w3"))
+        first.refresh_from_db()
+        self.assertEqual((first.status, first.worker), ("running", "w1"))
+
+    def test_losing_the_race_moves_on_to_the_next_job(self):
+        first = enqueue_job("show_ip", ["r1"])
+        second = enqueue_job("show_ip", ["r2"])
+        now = timezone.now
+
+        def claimed_meanwhile():
+            # Runs between this worker's SELECT and its UPDATE
+            Job.objects.filter(pk=first.pk, status="queued").update(
+                status="running", worker="w2"
+            )
+            return now()
+
+        with mock.patch("network.jobs.timezone.now", side_effect=claimed_meanwhile):
+            job = claim_job("w1")
+        self.assertEqual(job, second)
+        first.refresh_from_db()
+        self.assertEqual(first.worker, "w2")
+
+    def test_requeue_running_jobs(self):
+        enqueue_job("show_ip", ["r1"])
+        claim_job("w1")
+        self.assertEqual(requeue_running_jobs(), 1)
+        self.assertEqual(claim_job("w2").worker, "w2")
+
+
+@override_settings(PREFLIGHT={"enabled": False})
+@mock.patch.dict("network.jobs.TASK_MAP", {"show_ip": fake_show_ip})
+class RunJobTests(TestCase):
+    def setUp(self):
+        reset_caches()
+        self.user = User.objects.create(username="ops")
+        NetworkDevice.objects.create(
+            name="r1", hostname="10.0.0.1", platform="ios", username="u", password="p"
+        )
+
+    def test_results_are_logged_per_host(self):
+        job = run_job(enqueue_job("show_ip", ["r1"], user=self.user))
+        self.assertEqual(job.status, "completed")
+        log = TaskLog.objects.get(job=job)
+        self.assertEqual((log.device_name, log.status), ("r1", "success"))
+        self.assertEqual(log.user, self.user)
+
+    def test_devices_missing_from_the_inventory_are_logged_as_skipped(self):
+        job = run_job(enqueue_job("show_ip", ["r1", "gone"], user=self.user))
+        self.assertEqual(job.status, "completed")
+        self.assertEqual(
+            dict(TaskLog.objects.filter(job=job).values_list("device_name", "status")),
+            {"r1": "success", "gone": "skipped"},
+        )
+        log = TaskLog.objects.get(job=job, device_name="gone")
+        self.assertEqual(log.output, "Not in inventory")
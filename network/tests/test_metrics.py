@@ -0,0 +1,83 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from network.jobs import enqueue_job
+from network.metrics import bucket_le, record_timings, render_metrics
+from network.models import TaskLog, TimingBucket
+
+from .utils import write_logs
+
+
+def timed_log(connect_time=None, command_time=None, output_bytes=None):
+    return TaskLog(
+        task_type="show_ip",
+        device_name="r1",
+        connect_time=connect_time,
+        command_time=command_time,
+        output_bytes=output_bytes,
+    )
+
+
+@override_settings(METRICS_SECONDS_BUCKETS=[0.1, 1], METRICS_BYTES_BUCKETS=[1024])
+class RecordTimingsTests(TestCase):
+    def buckets(self, metric):
+        return dict(
+            TimingBucket.objects.filter(metric=metric).values_list("le", "count")
+        )
+
+    def test_bucket_le(self):
+        self.assertEqual(bucket_le(0.1, (0.1, 1)), "0.1")
+        self.assertEqual(bucket_le(0.5, (0.1, 1)), "1.0")
+        self.assertEqual(bucket_le(5, (0.1, 1)), "+Inf")
+
+    def test_observations_are_added_up(self):
+        logs = [
+            timed_log(connect_time=0.05, command_time=0.5, output_bytes=100),
+            timed_log(connect_time=None, command_time=2.0, output_bytes=5000),
+        ]
+        record_timings(logs, write_time=0.01)
+        record_timings(logs[:1])
+        self.assertEqual(self.buckets("connect_seconds"), {"0.1": 2})
+        self.assertEqual(self.buckets("command_seconds"), {"1.0": 2, "+Inf": 1})
+        self.assertEqual(self.buckets("output_bytes"), {"1024.0": 2, "+Inf": 1})
+        self.assertEqual(self.buckets("write_seconds"), {"0.1": 1})
+        self.assertAlmostEqual(
+            TimingBucket.objects.get(metric="command_seconds", le="1.0").total, 1.0
+        )
+
+    def test_render_metrics(self):
+        record_timings([timed_log(command_time=0.5), timed_log(command_time=3.0)])
+        write_logs("show_ip", [("r1", "up")])
+        enqueue_job("show_ip", ["r1"])
+        lines = render_metrics().splitlines()
+        # Buckets are cumulative and empty ones are listed
+        for line in (
+            'netauto_task_command_seconds_bucket{task_type="show_ip",le="0.1"} 0',
+            'netauto_task_command_seconds_bucket{task_type="show_ip",le="1.0"} 1',
+            'netauto_task_command_seconds_bucket{task_type="show_ip",le="+Inf"} 2',
+            'netauto_task_command_seconds_sum{task_type="show_ip"} 3.5',
+            'netauto_task_command_seconds_count{task_type="show_ip"} 2',
+            'netauto_task_runs_total{task_type="show_ip",status="success"} 1',
+            'netauto_task_runs_total{task_type="show_ip",status="skipped"} 0',
+            'netauto_jobs{status="queued"} 1',
+            'netauto_jobs{status="failed"} 0',
+        ):
+            self.assertIn(line, lines)
+        self.assertIn("# TYPE netauto_task_parse_seconds histogram", lines)
+
+
+class MetricsViewTests(TestCase):
+    def test_anonymous_requests_are_refused(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 401)
+
+    @override_settings(METRICS_TOKEN="s3cret")
+    def test_bearer_token(self):
+        response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer s3cret")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer nope")
+        self.assertEqual(response.status_code, 401)
+
+    def test_logged_in_users(self):
+        self.client.force_login(User.objects.create(username="ops"))
+        self.assertContains(self.client.get("/metrics"), "netauto_jobs")
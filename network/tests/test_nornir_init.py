@@ -0,0 +1,48 @@
+from django.test import TestCase
+
+from core.nornir_init import (
+    get_nornir,
+    get_nornir_view,
+    invalidate_inventory,
+    nornir_cache_info,
+)
+from network.models import NetworkDevice
+
+from .utils import reset_caches
+
+
+def create_device(name):
+    return NetworkDevice.objects.create(
+        name=name, hostname="10.0.0.1", platform="ios", username="u", password="p"
+    )
+
+
+class NornirCacheTests(TestCase):
+    def setUp(self):
+        reset_caches()
+        create_device("r1")
+
+    def test_instance_is_reused_until_the_inventory_changes(self):
+        nr = get_nornir()
+        hits = nornir_cache_info()["hits"]
+        self.assertIs(get_nornir(), nr)
+        self.assertEqual(nornir_cache_info()["hits"], hits + 1)
+
+        create_device("r2")
+        invalidate_inventory()
+        reloaded = get_nornir()
+        self.assertIsNot(reloaded, nr)
+        self.assertEqual(sorted(reloaded.inventory.hosts), ["r1", "r2"])
+        self.assertEqual(nornir_cache_info()["hosts"], 2)
+
+    def test_view_selects_hosts_by_name(self):
+        create_device("r2")
+        view = get_nornir_view(["r2", "missing"])
+        self.assertEqual(list(view.inventory.hosts), ["r2"])
+
+    def test_views_keep_their_own_failed_hosts(self):
+        nr = get_nornir()
+        view = get_nornir_view(nr=nr)
+        view.data.failed_hosts.add("r1")
+        self.assertEqual(get_nornir_view(nr=nr).data.failed_hosts, set())
+        self.assertIs(view.inventory.hosts["r1"], nr.inventory.hosts["r1"])
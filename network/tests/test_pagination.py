@@ -0,0 +1,92 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from network.models import NetworkDevice, TaskLog
+from network.pagination import KeysetPaginator
+
+from .utils import reset_caches, write_logs
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        write_logs("show_ip", [(f"r{n}", f"out {n}") for n in range(25)])
+        # Equal timestamps leave the id to break the ties
+        TaskLog.objects.update(timestamp=timezone.now())
+        self.paginator = KeysetPaginator(
+            TaskLog.objects.all(), ordering=("-timestamp", "-id"), per_page=10
+        )
+
+    def test_pages_cover_every_row_once(self):
+        seen = []
+        page = self.paginator.get_page()
+        self.assertFalse(page.has_previous)
+        while True:
+            seen.extend(log.pk for log in page)
+            if not page.has_next:
+                break
+            page = self.paginator.get_page(page.next_cursor)
+        self.assertEqual(
+            seen, list(TaskLog.objects.order_by("-id").values_list("id", flat=True))
+        )
+
+    def test_previous_cursor(self):
+        first = self.paginator.get_page()
+        second = self.paginator.get_page(first.next_cursor)
+        back = self.paginator.get_page(second.previous_cursor)
+        self.assertEqual([log.pk for log in back], [log.pk for log in first])
+        self.assertFalse(back.has_previous)
+
+    def test_invalid_cursor_shows_the_first_page(self):
+        page = self.paginator.get_page("not-a-cursor")
+        self.assertEqual(len(page), 10)
+        self.assertFalse(page.has_previous)
+
+    def test_count_only_when_asked(self):
+        self.assertIsNone(self.paginator.get_page().count)
+        paginator = KeysetPaginator(
+            TaskLog.objects.all(), ("-timestamp", "-id"), with_count=True
+        )
+        self.assertEqual(paginator.get_page().count, 25)
+
+
+class PaginatedViewTests(TestCase):
+    def setUp(self):
+        reset_caches()
+        self.user = User.objects.create(username="ops")
+        self.client.force_login(self.user)
+
+    def test_execution_logs_pages(self):
+        write_logs("show_ip", [(f"r{n}", "up") for n in range(12)], user=self.user)
+        response = self.client.get("/execution-logs/")
+        self.assertEqual(len(response.context["tasklogs"]), 10)
+        cursor = response.context["page_obj"].next_cursor
+        response = self.client.get("/execution-logs/", {"cursor": cursor})
+        self.assertEqual(len(response.context["tasklogs"]), 2)
+
+    def test_execution_logs_filter(self):
+        write_logs("show_ip", [(f"r{n}", "up") for n in range(12)], user=self.user)
+        response = self.client.get("/execution-logs/", {"device_name": "r3"})
+        self.assertEqual(
+            [log.device_name for log in response.context["tasklogs"]], ["r3"]
+        )
+
+    def test_device_list_pages(self):
+        NetworkDevice.objects.bulk_create(
+            NetworkDevice(
+                name=f"r{n}",
+                hostname=f"10.0.0.{n}",
+                platform="ios",
+                username="u",
+                password="p",
+            )
+            for n in range(15)
+        )
+        response = self.client.get("/devices/")
+        page = response.context["page_obj"]
+        self.assertEqual(len(page), 10)
+        response = self.client.get(
+            "/devices/", {"cursor": page.next_cursor, "count": 1}
+        )
+        self.assertEqual(len(response.context["devices"]), 5)
+        self.assertEqual(response.context["page_obj"].count, 15)
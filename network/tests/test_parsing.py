@@ -0,0 +1,66 @@
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core import parsing
+from core.fake_ssh import FakeDevice
+from core.parsing import get_template, parse_output, submit_parse
+from network.models import InterfaceStatus, ParsedOutput
+from network.results import TaskLogSink
+
+from .utils import host_result
+
+BRIEF = FakeDevice("r1", interfaces=3).show_ip_interface_brief()
+
+
+class ParseOutputTests(SimpleTestCase):
+    def test_rows_have_lowercase_keys(self):
+        rows = parse_output("cisco_ios", "show ip interface brief", BRIEF)
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(
+            {key: rows[1][key] for key in ("interface", "ip_address", "status")},
+            {
+                "interface": "GigabitEthernet0/1",
+                "ip_address": "10.0.1.1",
+                "status": "up",
+            },
+        )
+
+    def test_templates_are_compiled_once_per_command(self):
+        template = get_template("cisco_ios", "show ip interface brief")
+        self.assertIs(get_template("cisco_ios", "show  IP interface brief"), template)
+        self.assertIsNone(get_template("cisco_ios", "show bogus"))
+        self.assertIn(("cisco_ios", "show bogus"), parsing._templates)
+
+    def test_commands_without_a_template(self):
+        self.assertIsNone(parse_output("cisco_ios", "show bogus", "anything"))
+
+    @override_settings(TEXTFSM_PARSE_WORKERS=0)
+    def test_inline_parsing_returns_a_done_future(self):
+        future = submit_parse("cisco_ios", "show ip interface brief", BRIEF)
+        rows, seconds = future.result(timeout=0)
+        self.assertEqual(len(rows), 3)
+        self.assertGreaterEqual(seconds, 0)
+
+
+@override_settings(TEXTFSM_PARSE_WORKERS=0)
+class ParsedOutputTests(TestCase):
+    def test_sink_stores_parsed_rows(self):
+        with TaskLogSink("show_ip", flush_interval=3600, parse=True) as sink:
+            log = sink.add("r1", host_result(BRIEF), platform="cisco_ios")
+            sink.add("r2", host_result("garbage"), platform="cisco_ios")
+            sink.add("r3", host_result(BRIEF))  # no platform, not parsed
+        parsed = ParsedOutput.objects.get(task_log=log)
+        self.assertEqual(parsed.command, "show ip interface brief")
+        self.assertEqual(len(parsed.rows), 3)
+        self.assertIsNotNone(log.parse_time)
+        self.assertEqual(
+            list(
+                InterfaceStatus.objects.filter(device_name="r1")
+                .order_by("interface")
+                .values_list("interface", "status")
+            ),
+            [(f"GigabitEthernet0/{n}", "up") for n in range(3)],
+        )
+        self.assertEqual(
+            list(ParsedOutput.objects.values_list("device_name", flat=True)),
+            ["r1", "r2"],
+        )
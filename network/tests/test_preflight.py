@@ -0,0 +1,77 @@
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.nornir_init import init_nornir
+from core.preflight import (
+    DEFAULT_PREFLIGHT_SETTINGS,
+    backoff_seconds,
+    preflight,
+    record_probes,
+)
+from network.models import HostHealth
+
+HOSTS = """
+r1:
+  hostname: 10.0.0.1
+  platform: ios
+r2:
+  hostname: 10.0.0.2
+  port: 2222
+  platform: ios
+"""
+OPTIONS = {**DEFAULT_PREFLIGHT_SETTINGS, "failure_threshold": 2, "backoff": 60}
+
+
+class BackoffTests(TestCase):
+    def test_doubles_up_to_the_maximum(self):
+        options = {**OPTIONS, "max_backoff": 300}
+        self.assertEqual(
+            [backoff_seconds(failures, options) for failures in range(1, 7)],
+            [0, 60, 120, 240, 300, 300],
+        )
+
+    def test_breaker_opens_and_closes(self):
+        now = timezone.now()
+        targets = {"r1": ("10.0.0.1", 22)}
+        for _ in range(2):
+            health = {row.device_name: row for row in HostHealth.objects.all()}
+            record_probes(targets, {"r1": "refused"}, health, now, OPTIONS)
+        row = HostHealth.objects.get()
+        self.assertEqual(row.consecutive_failures, 2)
+        self.assertEqual(row.open_until, now + timedelta(seconds=60))
+
+        record_probes(targets, {}, {"r1": row}, now, OPTIONS)
+        self.assertFalse(HostHealth.objects.exists())
+
+
+@override_settings(PREFLIGHT={**OPTIONS, "failure_threshold": 1})
+class PreflightTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        hosts = Path(directory.name) / "hosts.yaml"
+        hosts.write_text(HOSTS)
+        self.nr = init_nornir(host_file=hosts, group_file=hosts.with_name("none"))
+
+    def test_unreachable_hosts_are_held_back(self):
+        with mock.patch(
+            "core.preflight.probe_hosts", return_value={"r2": "refused"}
+        ) as probe:
+            reachable, unreachable = preflight(self.nr)
+        self.assertEqual(
+            probe.call_args.args[0],
+            {"r1": ("10.0.0.1", 22), "r2": ("10.0.0.2", 2222)},
+        )
+        self.assertEqual(list(reachable.inventory.hosts), ["r1"])
+        self.assertEqual(unreachable, {"r2": ("failure", "Unreachable: refused")})
+
+        # The breaker is open now: r2 is skipped without a probe
+        with mock.patch("core.preflight.probe_hosts", return_value={}) as probe:
+            reachable, unreachable = preflight(self.nr)
+        self.assertEqual(list(probe.call_args.args[0]), ["r1"])
+        self.assertEqual(unreachable["r2"][0], "skipped")
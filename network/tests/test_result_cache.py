@@ -0,0 +1,84 @@
+import threading
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from core.result_cache import ResultCache, is_read_only, shared_result_cache
+from network.counters import counter_value
+
+
+class ResultCacheTests(SimpleTestCase):
+    def test_hit_within_ttl(self):
+        cache = ResultCache(ttl=60)
+        runs = []
+        for _ in range(2):
+            cache.get_or_run("r1", "show  version", lambda: runs.append(1) or "out")
+        self.assertEqual(len(runs), 1)
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    def test_concurrent_requests_share_one_run(self):
+        cache = ResultCache(ttl=60)
+        started, release = threading.Event(), threading.Event()
+        runs = []
+
+        def run():
+            runs.append(1)
+            started.set()
+            release.wait(5)
+            return "out"
+
+        results = []
+        first = threading.Thread(
+            target=lambda: results.append(cache.get_or_run("r1", "show ver", run))
+        )
+        first.start()
+        started.wait(5)
+        second = threading.Thread(
+            target=lambda: results.append(cache.get_or_run("r1", "show ver", run))
+        )
+        second.start()
+        while cache.stats()["coalesced"] == 0:
+            time.sleep(0.001)
+        release.set()
+        first.join()
+        second.join()
+        self.assertEqual((results, len(runs)), (["out", "out"], 1))
+
+    def test_invalidation_during_a_run_isnt_stored(self):
+        cache = ResultCache(ttl=60)
+
+        def run():
+            cache.invalidate_host("r1")  # a config change lands meanwhile
+            return "before the change"
+
+        cache.get_or_run("r1", "show run", run)
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_bypass_refreshes_the_entry(self):
+        cache = ResultCache(ttl=60)
+        cache.get_or_run("r1", "show ver", lambda: "old")
+        cache.get_or_run("r1", "show ver", lambda: "new", bypass=True)
+        self.assertEqual(cache.get_or_run("r1", "show ver", lambda: "x"), "new")
+
+    def test_read_only_commands(self):
+        self.assertTrue(is_read_only("show ip int brief"))
+        self.assertFalse(is_read_only("write memory"))
+        self.assertFalse(is_read_only("show run | redirect flash:x"))
+
+
+class SharedInvalidationTests(TestCase):
+    def test_invalidation_reaches_other_processes(self):
+        mine, theirs = ResultCache(ttl=60), ResultCache(ttl=60)
+        with mock.patch("core.result_cache.get_result_cache", return_value=mine):
+            with shared_result_cache(["r1"]):
+                mine.get_or_run("r1", "show ver", lambda: "old")
+        with mock.patch("core.result_cache.get_result_cache", return_value=theirs):
+            with shared_result_cache(["r1"]):
+                theirs.invalidate_host("r1")  # e.g. save_config
+        self.assertEqual(counter_value("result_cache:r1"), 1)
+
+        with mock.patch("core.result_cache.get_result_cache", return_value=mine):
+            with shared_result_cache(["r1"]):
+                output = mine.get_or_run("r1", "show ver", lambda: "new")
+        self.assertEqual(output, "new")
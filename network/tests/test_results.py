@@ -0,0 +1,135 @@
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.db import connections
+from django.test import TestCase, TransactionTestCase
+from nornir.core.task import Result
+
+from core.nornir_init import init_nornir
+from core.tasks import CommandBatch
+from network.models import TaskLog
+from network.results import TaskLogSink
+
+from .utils import host_result
+
+HOSTS = """
+r1:
+  hostname: 10.0.0.1
+  groups: [ios]
+r2:
+  hostname: 10.0.0.2
+  groups: [ios]
+"""
+
+
+def echo(task):
+    return Result(host=task.host, result=f"{task.host.name} up")
+
+
+class TaskLogSinkTests(TestCase):
+    def test_rows_are_written_a_chunk_at_a_time(self):
+        sink = TaskLogSink("show_ip", chunk_size=2, flush_interval=3600)
+        with sink:
+            sink.add("r1", host_result("one"))
+            self.assertEqual(TaskLog.objects.count(), 0)
+            sink.add("r2", host_result("two"))
+            self.assertEqual(TaskLog.objects.count(), 2)
+            sink.add("r3", host_result("three"))
+            self.assertEqual(sink.written, 2)
+        self.assertEqual(sink.written, 3)
+        self.assertEqual(
+            {log.device_name: log.output for log in TaskLog.objects.all()},
+            {"r1": "one", "r2": "two", "r3": "three"},
+        )
+
+    def test_a_flush_is_one_transaction(self):
+        sink = TaskLogSink("show_ip", flush_interval=3600)
+        for n in range(5):
+            sink.add(f"r{n}", host_result(f"out {n}"))
+        with mock.patch(
+            "network.results.record_task_stats", side_effect=RuntimeError("boom")
+        ):
+            with self.assertRaises(RuntimeError):
+                sink.flush()
+        self.assertFalse(TaskLog.objects.exists())
+        self.assertEqual(sink.written, 0)
+
+    def test_failures_log_the_exception(self):
+        result = host_result(None, failed=True)
+        result.exception = TimeoutError("Connection timed out")
+        with TaskLogSink("show_ip", flush_interval=3600) as sink:
+            log = sink.add("r1", result)
+        self.assertEqual((log.status, log.output), ("failure", "Connection timed out"))
+
+    def test_batch_rows_are_grouped(self):
+        batch = CommandBatch()
+        batch.add("show version", "IOS 15.2", False, 0.1)
+        batch.add("show bogus", "% Invalid input", True, 0.1)
+        sink = TaskLogSink("custom_command", custom_command="x", flush_interval=3600)
+        with sink:
+            logs = sink.add("r1", host_result(batch))
+        self.assertEqual([log.batch_index for log in logs], [0, 1])
+        self.assertEqual(len({log.batch_id for log in logs}), 1)
+        self.assertEqual(
+            [log.custom_command for log in logs], ["show version", "show bogus"]
+        )
+        self.assertEqual([log.status for log in logs], ["success", "failure"])
+
+    def test_processor_records_hosts_as_they_finish(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        hosts = Path(directory.name) / "hosts.yaml"
+        hosts.write_text(HOSTS)
+        nr = init_nornir(host_file=hosts, group_file=settings.BASE_DIR / "groups.yaml")
+        sink = TaskLogSink("show_ip", flush_interval=3600, release_results=True)
+        result = nr.with_processors([sink]).run(task=echo)
+        self.assertEqual(sink.written, 2)
+        self.assertIsNone(result["r1"][0].result)
+        log = TaskLog.objects.get(device_name="r1")
+        self.assertEqual(log.output, "r1 up")
+        self.assertIsNotNone(log.duration)
+
+
+class ThreadedFlushTests(TransactionTestCase):
+    def closed_on(self):
+        # Threads whose connection the sink closed
+        threads = []
+        close = type(connections["default"]).close
+
+        def record(conn):
+            threads.append(threading.current_thread().name)
+            return close(conn)
+
+        self.enterContext(
+            mock.patch.object(type(connections["default"]), "close", record)
+        )
+        return threads
+
+    def test_idle_rows_are_flushed_by_the_timer(self):
+        closed = self.closed_on()
+        sink = TaskLogSink("show_ip", flush_interval=0.05)
+        sink.add("r1", host_result("one"))
+        deadline = time.monotonic() + 5
+        while not sink.written and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(TaskLog.objects.get().output, "one")
+        self.assertEqual(len(closed), 1)
+        self.assertNotEqual(closed[0], threading.main_thread().name)
+
+    def test_runner_threads_close_their_connection_after_a_flush(self):
+        closed = self.closed_on()
+        sink = TaskLogSink("show_ip", chunk_size=1, flush_interval=3600)
+        thread = threading.Thread(
+            target=sink.add, args=("r1", host_result("one")), name="runner"
+        )
+        thread.start()
+        thread.join()
+        self.assertEqual(sink.written, 1)
+        self.assertEqual(closed, ["runner"])
+
+        sink.add("r2", host_result("two"))  # the main thread keeps its own
+        self.assertEqual(closed, ["runner"])
@@ -0,0 +1,125 @@
+import io
+import tempfile
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from network.models import OutputBlob, TaskLog, TaskTotal
+from network.retention import (
+    filter_records,
+    open_archive,
+    parse_timestamp,
+    purge_task_logs,
+    read_archive,
+    retention_policies,
+)
+
+from .utils import write_logs
+
+
+class PurgeTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        write_logs("show_ip", [("r1", "old output"), ("r2", "shared output")])
+        TaskLog.objects.update(timestamp=timezone.now() - timedelta(days=40))
+        write_logs("show_ip", [("r3", "shared output")])
+
+    def test_purge_archives_then_deletes(self):
+        [(label, logs)] = retention_policies({"default": 30})
+        archive = open_archive(self.directory.name, label)
+        self.assertEqual(purge_task_logs(logs, archive, batch_size=1), 2)
+
+        self.assertEqual(
+            list(TaskLog.objects.values_list("device_name", flat=True)), ["r3"]
+        )
+        # Still referenced by r3's log
+        self.assertEqual(
+            sorted(blob.text() for blob in OutputBlob.objects.all()), ["shared output"]
+        )
+        # Rollups outlive the rows
+        self.assertEqual(TaskTotal.objects.get(task_type="show_ip").success_count, 3)
+
+        records = list(read_archive([self.directory.name]))
+        self.assertEqual(
+            [(record["device_name"], record["output"]) for record in records],
+            [("r1", "old output"), ("r2", "shared output")],
+        )
+        self.assertEqual(records[0]["task_type"], "show_ip")
+
+    def test_dry_run_counts_only(self):
+        [(_, logs)] = retention_policies({"default": 30})
+        self.assertEqual(purge_task_logs(logs, dry_run=True), 2)
+        self.assertEqual(TaskLog.objects.count(), 3)
+
+    def test_task_types_kept_forever(self):
+        self.assertEqual(retention_policies({"default": None}), [])
+        [(label, logs)] = retention_policies({"default": None, "show_ip": 30})
+        self.assertEqual((label, logs.count()), ("show_ip", 2))
+
+
+@override_settings(TASKLOG_RETENTION_DAYS={"default": 30})
+class PurgeCommandTests(TestCase):
+    def setUp(self):
+        self.directory = self.enterContext(tempfile.TemporaryDirectory())
+        write_logs("show_ip", [("r1", "Gi0/1 up"), ("r2", "Gi0/2 down")])
+        TaskLog.objects.update(timestamp=timezone.now() - timedelta(days=40))
+
+    def call(self, name, *args):
+        out = io.StringIO()
+        call_command(name, *args, stdout=out)
+        return out.getvalue()
+
+    def test_purge_then_query_the_archive(self):
+        output = self.call("purge_task_logs", "--archive-dir", self.directory)
+        self.assertIn("Purged 2 rows", output)
+        self.assertFalse(TaskLog.objects.exists())
+        output = self.call(
+            "query_task_log_archive", self.directory, "--contains", "down", "--count"
+        )
+        self.assertEqual(output.strip(), "1")
+
+    def test_dry_run(self):
+        output = self.call("purge_task_logs", "--dry-run")
+        self.assertIn("2 rows would be purged", output)
+        self.assertEqual(TaskLog.objects.count(), 2)
+
+
+class FilterRecordsTests(TestCase):
+    records = [
+        {
+            "device_name": "r1",
+            "task_type": "show_ip",
+            "status": "success",
+            "timestamp": "2025-01-01T10:00:00+00:00",
+            "output": "Gi0/1 up",
+            "custom_command": None,
+        },
+        {
+            "device_name": "r2",
+            "task_type": "custom_command",
+            "status": "failure",
+            "timestamp": "2025-01-03T10:00:00+00:00",
+            "output": "",
+            "custom_command": "show LOGGING",
+        },
+    ]
+
+    def filter(self, **filters):
+        return [
+            record["device_name"] for record in filter_records(self.records, **filters)
+        ]
+
+    def test_filters(self):
+        self.assertEqual(self.filter(device="r1"), ["r1"])
+        self.assertEqual(self.filter(status="failure"), ["r2"])
+        self.assertEqual(self.filter(task_type="show_ip", status="failure"), [])
+        self.assertEqual(self.filter(contains="logging"), ["r2"])
+        self.assertEqual(self.filter(contains="GI0/1"), ["r1"])
+
+    def test_time_range(self):
+        since = parse_timestamp("2025-01-02T00:00:00+00:00")
+        self.assertEqual(self.filter(since=since), ["r2"])
+        self.assertEqual(self.filter(until=since), ["r1"])
@@ -0,0 +1,113 @@
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.test import SimpleTestCase, override_settings
+from nornir.core.task import Result
+from nornir.plugins.runners import ThreadedRunner
+
+from core.nornir_init import init_nornir
+from core.runners import AdaptiveRunner, build_runner, runner_config
+
+HOSTS = "\n".join(
+    f"{name}:\n  hostname: 10.0.0.{n}\n  groups: [{group}]"
+    for n, (name, group) in enumerate(
+        [("c1", "core"), ("c2", "core"), ("c3", "core"), ("a1", "access")]
+        + [(f"a{n}", "access") for n in range(2, 6)]
+    )
+)
+GROUPS = """
+core:
+  data: {}
+access:
+  data:
+    max_sessions: 2
+"""
+
+
+class ConcurrencyProbe:
+    """Task recording how many hosts of each group run at once."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = Counter()
+        self.peak = Counter()
+
+    def __call__(self, task):
+        group = task.host.groups[0].name
+        with self.lock:
+            self.running[group] += 1
+            self.peak[group] = max(self.peak[group], self.running[group])
+        time.sleep(0.02)
+        with self.lock:
+            self.running[group] -= 1
+        return Result(host=task.host, result="ok")
+
+
+class AdaptiveRunnerTests(SimpleTestCase):
+    def setUp(self):
+        self.runner = AdaptiveRunner(
+            num_workers=16,
+            min_workers=2,
+            initial_workers=4,
+            target_latency=1.0,
+            max_failure_rate=0.2,
+        )
+
+    def test_doubles_then_grows_by_one_after_a_slowdown(self):
+        fast = [(0.1, False)] * 4
+        self.assertEqual(self.runner._adjust(4, 16, fast), (8, 16))
+        limit, threshold = self.runner._adjust(8, 16, [(2.0, False)] * 8)
+        self.assertEqual((limit, threshold), (4, 4))
+        self.assertEqual(self.runner._adjust(limit, threshold, fast), (5, 4))
+
+    def test_backs_off_on_failures(self):
+        window = [(0.1, True)] * 2 + [(0.1, False)] * 6
+        self.assertEqual(self.runner._adjust(8, 16, window), (4, 4))
+        self.assertEqual(self.runner._adjust(3, 16, [(0.1, True)] * 3), (2, 2))
+
+    def test_stays_within_bounds(self):
+        self.assertEqual(self.runner._adjust(16, 16, [(0.1, False)] * 16), (16, 16))
+        self.assertEqual(self.runner._adjust(10, 16, [(0.1, False)] * 10), (16, 16))
+        runner = AdaptiveRunner(num_workers=4, min_workers=8, initial_workers=10)
+        self.assertEqual((runner.min_workers, runner.initial_workers), (4, 4))
+
+    def test_group_caps(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        hosts = Path(directory.name) / "hosts.yaml"
+        hosts.write_text(HOSTS)
+        groups = hosts.with_name("groups.yaml")
+        groups.write_text(GROUPS)
+        nr = init_nornir(host_file=hosts, group_file=groups)
+
+        probe = ConcurrencyProbe()
+        runner = AdaptiveRunner(
+            num_workers=8, initial_workers=8, group_limits={"core": 1}
+        )
+        result = nr.with_runner(runner).run(task=probe, name="probe")
+        self.assertEqual(len(result), 8)
+        self.assertFalse(result.failed)
+        self.assertEqual(probe.peak, Counter({"core": 1, "access": 2}))
+
+
+class RunnerConfigTests(SimpleTestCase):
+    @override_settings(NORNIR_RUNNER={"plugin": "threaded", "num_workers": 7})
+    def test_threaded(self):
+        self.assertEqual(
+            runner_config(), {"plugin": "threaded", "options": {"num_workers": 7}}
+        )
+        runner = build_runner(num_workers=3)
+        self.assertIsInstance(runner, ThreadedRunner)
+        self.assertEqual(runner.num_workers, 3)
+
+    @override_settings(
+        NORNIR_RUNNER={"plugin": "adaptive", "num_workers": 40, "min_workers": 5}
+    )
+    def test_adaptive(self):
+        runner = build_runner()
+        self.assertIsInstance(runner, AdaptiveRunner)
+        self.assertEqual((runner.num_workers, runner.min_workers), (40, 5))
+        self.assertEqual(build_runner("threaded").num_workers, 40)
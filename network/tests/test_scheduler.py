@@ -0,0 +1,166 @@
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from network.models import ScheduleEntry
+from network.scheduler import (
+    PollScheduler,
+    get_poll_schedule,
+    next_slot,
+    schedule_offset,
+    sync_schedule,
+)
+
+SCHEDULE = {
+    "show_ip": {"interval": 300, "groups": {"core": 60}},
+    "backup_config": {"interval": 3600, "groups": {}},
+}
+
+
+def inventory(**hosts):
+    """Stand-in for a Nornir inventory of ``name=[group, ...]`` hosts."""
+    return SimpleNamespace(
+        hosts={
+            name: SimpleNamespace(groups=[SimpleNamespace(name=g) for g in groups])
+            for name, groups in hosts.items()
+        }
+    )
+
+
+def entry(task_type, device_name, **kwargs):
+    kwargs.setdefault("next_run_at", timezone.now() - timedelta(seconds=5))
+    return ScheduleEntry.objects.create(
+        task_type=task_type, device_name=device_name, interval=300, **kwargs
+    )
+
+
+class ScheduleTests(TestCase):
+    @override_settings(
+        POLL_SCHEDULE={
+            "show_ip": {"interval": 300, "groups": {"core": 60}},
+            "backup_config": ["interval", 86400],
+            "save_config": {"interval": "daily"},
+            "custom_command": {"interval": 60},
+        }
+    )
+    def test_malformed_entries_are_skipped(self):
+        with self.assertLogs("network.scheduler", "ERROR") as logs:
+            schedule = get_poll_schedule()
+        self.assertEqual(
+            schedule, {"show_ip": {"interval": 300, "groups": {"core": 60}}}
+        )
+        self.assertEqual(len(logs.records), 2)
+
+    def test_slots_are_stable_and_spread(self):
+        now = timezone.now()
+        offsets = {schedule_offset("show_ip", f"r{n}", 300) for n in range(50)}
+        self.assertTrue(all(0 <= offset < 300 for offset in offsets))
+        self.assertGreater(len(offsets), 40)
+        slot = next_slot("show_ip", "r1", 300, now)
+        self.assertTrue(now < slot <= now + timedelta(seconds=300))
+        self.assertEqual(
+            next_slot("show_ip", "r1", 300, slot), slot + timedelta(seconds=300)
+        )
+
+    @override_settings(POLL_SCHEDULE=SCHEDULE)
+    def test_sync_follows_the_inventory(self):
+        self.assertEqual(
+            sync_schedule(inventory(r1=["core"], r2=[]), SCHEDULE), (4, 0, 0)
+        )
+        intervals = dict(
+            ScheduleEntry.objects.filter(task_type="show_ip").values_list(
+                "device_name", "interval"
+            )
+        )
+        self.assertEqual(intervals, {"r1": 60, "r2": 300})
+        # r1 leaves the core group and r2 is removed
+        self.assertEqual(sync_schedule(inventory(r1=[]), SCHEDULE), (0, 1, 2))
+        self.assertEqual(
+            ScheduleEntry.objects.get(task_type="show_ip", device_name="r1").interval,
+            300,
+        )
+
+
+class PollSchedulerTests(TestCase):
+    def setUp(self):
+        self.scheduler = PollScheduler(nr=mock.Mock(), schedule=SCHEDULE)
+        # Batches are only submitted, not run
+        self.addCleanup(self.scheduler._executor.shutdown)
+        self.scheduler._executor = mock.Mock()
+
+    def submitted(self):
+        return {
+            task_type: [e.device_name for e in entries]
+            for _, task_type, entries in (
+                call.args for call in self.scheduler._executor.submit.call_args_list
+            )
+        }
+
+    def test_tick_batches_due_entries_per_task(self):
+        entry("show_ip", "r1")
+        entry("show_ip", "r2")
+        entry("backup_config", "r3")
+        entry("show_ip", "r4", next_run_at=timezone.now() + timedelta(minutes=1))
+        entry("save_config", "r5")  # not in this scheduler's schedule
+        self.assertEqual(self.scheduler.tick(), 3)
+        self.assertEqual(
+            self.submitted(), {"show_ip": ["r1", "r2"], "backup_config": ["r3"]}
+        )
+        self.assertEqual(self.scheduler.busy, {"r1", "r2", "r3"})
+        self.assertEqual(self.scheduler.running, 2)
+        running = ScheduleEntry.objects.filter(in_flight=True)
+        self.assertEqual(running.count(), 3)
+        self.assertTrue(all(e.last_lag >= 5 for e in running))
+        # In-flight entries aren't started again
+        self.assertEqual(self.scheduler.tick(), 0)
+
+    def test_busy_devices_wait_for_their_run(self):
+        entry("show_ip", "r1")
+        entry("backup_config", "r1")
+        self.assertEqual(self.scheduler.tick(), 1)
+        self.scheduler.busy.add("r2")
+        entry("show_ip", "r2")
+        self.assertEqual(self.scheduler.tick(), 0)
+
+    def test_batches_are_capped(self):
+        self.scheduler.max_batches = 1
+        entry("show_ip", "r1", next_run_at=timezone.now() - timedelta(minutes=1))
+        entry("backup_config", "r2")
+        self.assertEqual(self.scheduler.tick(), 1)
+        self.assertEqual(self.submitted(), {"show_ip": ["r1"]})
+        self.assertEqual(self.scheduler.tick(), 0)
+
+    def test_finish_records_status_and_next_slot(self):
+        entries = [entry("show_ip", name, in_flight=True) for name in "abc"]
+        self.scheduler.finish(
+            entries, failed={"b", "c"}, unreachable={"c": ("skipped", "open")}
+        )
+        now = timezone.now()
+        statuses = {}
+        for e in ScheduleEntry.objects.all():
+            self.assertFalse(e.in_flight)
+            self.assertGreater(e.next_run_at, now)
+            statuses[e.device_name] = e.last_status
+        self.assertEqual(statuses, {"a": "success", "b": "failed", "c": "skipped"})
+
+
+class ScheduleViewTests(TestCase):
+    def test_schedule(self):
+        self.client.force_login(User.objects.create(username="ops"))
+        entry("show_ip", "r1")
+        entry("show_ip", "r2", in_flight=True)
+        entry("backup_config", "r1", last_status="failed")
+        response = self.client.get("/schedule/", {"task_type": "show_ip"})
+        self.assertEqual(len(response.context["entries"]), 2)
+        summary = {row["task_type"]: row for row in response.context["summary"]}
+        self.assertEqual(
+            {task: row["devices"] for task, row in summary.items()},
+            {"show_ip": 2, "backup_config": 1},
+        )
+        self.assertEqual(summary["show_ip"]["running"], 1)
+        self.assertEqual(summary["show_ip"]["overdue"], 1)
+        self.assertEqual(summary["backup_config"]["failed"], 1)
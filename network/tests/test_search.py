@@ -0,0 +1,79 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from network.models import SearchDocument
+from network.search import parse_query, search
+
+from .test_configs import CONFIG, backup
+from .utils import write_logs
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="ops")
+        self.other = User.objects.create(username="other")
+
+    def test_parse_query(self):
+        self.assertEqual(
+            parse_query('Gi0/1 "ip address 10.0" up*'),
+            ["Gi0/1", "ip address 10.0", "up*"],
+        )
+
+    def test_outputs_are_limited_to_own_logs(self):
+        write_logs("show_ip", [("r1", "Gi0/1 up mine")], user=self.user)
+        write_logs("show_ip", [("r2", "Gi0/1 up theirs")], user=self.other)
+        [result] = search(self.user, "up")
+        self.assertEqual([log.device_name for log in result["logs"]], ["r1"])
+        self.assertIn(("up", True), result["snippet"])
+        self.assertEqual(search(self.user, "theirs"), [])
+
+    def test_logs_per_result(self):
+        write_logs("show_ip", [(f"r{n}", "same") for n in range(4)], user=self.user)
+        [result] = search(self.user, "same", logs_per_result=3)
+        self.assertEqual(len(result["logs"]), 3)
+        self.assertTrue(result["more"])
+
+    def test_long_commands_match_by_prefix(self):
+        command = "show running-config | include " + "x" * 300
+        write_logs(
+            "custom_command", [("r1", "")], user=self.user, custom_command=command
+        )
+        [result] = search(self.user, "running-config")
+        self.assertEqual(result["kind"], "command")
+        self.assertEqual(result["logs"][0].custom_command, command)
+        self.assertEqual(search(self.other, "running-config"), [])
+
+    def test_only_the_latest_version_is_indexed(self):
+        backup(CONFIG + "snmp-server location alpha\n")
+        backup(CONFIG + "snmp-server location beta\n")
+        self.assertEqual(SearchDocument.objects.filter(kind="config").count(), 1)
+        self.assertEqual(search(None, "alpha"), [])
+        [result] = search(None, "beta")
+        self.assertEqual(result["config"].version, 2)
+
+    def test_hidden_matches_cost_no_queries_per_document(self):
+        write_logs(
+            "show_ip",
+            [(f"r{n}", f"Gi0/1 up {n}") for n in range(300)],
+            user=self.other,
+        )
+        write_logs("show_ip", [("r1", "Gi0/1 up mine")], user=self.user)
+        # Per page of ranked ids: the ids, their documents and the user's logs;
+        # then the one visible blob
+        with self.assertNumQueries(7):
+            [result] = search(self.user, "up")
+        self.assertEqual(result["logs"][0].device_name, "r1")
+
+
+class SearchViewTests(TestCase):
+    def test_search_shows_own_logs_only(self):
+        user = User.objects.create(username="ops")
+        other = User.objects.create(username="other")
+        self.client.force_login(user)
+        write_logs("show_ip", [(f"r{n}", f"Gi0/{n} up") for n in range(3)], user=user)
+        write_logs("show_ip", [("r0", "not mine")], user=other)
+        response = self.client.get("/search/", {"q": "up"})
+        self.assertEqual(len(response.context["results"]), 3)
+        self.assertContains(response, "<mark>up</mark>")
+        response = self.client.get("/search/", {"q": "mine"})
+        self.assertEqual(response.context["results"], [])
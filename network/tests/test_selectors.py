@@ -0,0 +1,124 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from core.nornir_init import invalidate_inventory
+from network.device_selectors import DeviceIndex, SelectorError, resolve_selector
+from network.forms import DeviceForm, TaskForm
+from network.models import DeviceSelector, NetworkDevice
+
+from .utils import reset_caches
+
+RECORDS = [
+    ("r1", "ios", ["core"], "A", "access", ["lab"]),
+    ("r2", "ios", ["core"], "A", "distribution", []),
+    ("r3", "nxos", ["dc"], "B", "access", ["lab", "edge"]),
+    ("r4", "eos", [], "B", "", []),
+]
+
+
+class ResolveSelectorTests(TestCase):
+    def setUp(self):
+        self.index = DeviceIndex(RECORDS)
+
+    def resolve(self, query):
+        return resolve_selector(query, self.index)
+
+    def test_terms_are_intersected(self):
+        self.assertEqual(self.resolve("site:A role:access"), {"r1"})
+
+    def test_values_are_alternatives(self):
+        self.assertEqual(self.resolve("platform:nxos,eos"), {"r3", "r4"})
+
+    def test_exclusion_and_wildcard(self):
+        self.assertEqual(self.resolve("-tag:lab"), {"r2", "r4"})
+        self.assertEqual(self.resolve("*"), {"r1", "r2", "r3", "r4"})
+
+    def test_bare_names_and_prefixes(self):
+        self.assertEqual(self.resolve("r1 r3"), {"r1", "r3"})
+        self.assertEqual(self.resolve("role:dist*"), {"r2"})
+
+    def test_saved_selector(self):
+        DeviceSelector.objects.create(name="labs", query="tag:lab")
+        self.assertEqual(self.resolve("@labs site:B"), {"r3"})
+
+    def test_saved_selector_loop_is_an_error(self):
+        DeviceSelector.objects.create(name="loop", query="@loop")
+        with self.assertRaises(SelectorError):
+            self.resolve("@loop")
+
+    def test_unknown_field_is_an_error(self):
+        with self.assertRaises(SelectorError):
+            self.resolve("colour:red")
+
+
+class DeviceFormTests(TestCase):
+    def setUp(self):
+        reset_caches()
+
+    def test_selector_sees_devices_written_after_the_index_was_built(self):
+        self.assertFalse(
+            TaskForm({"task_type": "show_ip", "selector": "r1"}).is_valid()
+        )
+        NetworkDevice.objects.create(
+            name="r1", hostname="10.0.0.1", platform="ios", username="u", password="p"
+        )
+        # As sync_devices does, possibly in another process
+        invalidate_inventory()
+        form = TaskForm({"task_type": "show_ip", "selector": "r1"})
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.cleaned_data["devices"], ["r1"])
+
+    def test_tags_are_edited_as_text(self):
+        device = NetworkDevice.objects.create(
+            name="r1",
+            hostname="10.0.0.1",
+            platform="ios",
+            username="u",
+            password="p",
+            tags=["lab"],
+        )
+        self.assertEqual(DeviceForm(instance=device)["tags"].value(), "lab")
+        form = DeviceForm(
+            {
+                "hostname": "10.0.0.1",
+                "name": "r1",
+                "site": "A",
+                "role": "edge",
+                "tags": "edge, lab ,edge,",
+            },
+            instance=device,
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+        form.save()
+        device.refresh_from_db()
+        self.assertEqual(
+            (device.site, device.role, device.tags), ("A", "edge", ["edge", "lab"])
+        )
+
+
+class DeviceSelectViewTests(TestCase):
+    def setUp(self):
+        reset_caches()
+        self.client.force_login(User.objects.create(username="ops"))
+        for name, site in (("r1", "A"), ("r2", "B")):
+            NetworkDevice.objects.create(
+                name=name,
+                hostname="10.0.0.1",
+                platform="ios",
+                username="u",
+                password="p",
+                site=site,
+            )
+        invalidate_inventory()
+
+    def test_preview(self):
+        response = self.client.get("/devices/select/", {"q": "site:A"})
+        self.assertEqual(response.json()["devices"], ["r1"])
+        self.assertIn(
+            "site:A",
+            self.client.get("/devices/select/", {"q": "site:"}).json()["suggestions"],
+        )
+
+    def test_error(self):
+        response = self.client.get("/devices/select/", {"q": "colour:red"})
+        self.assertIn("error", response.json())
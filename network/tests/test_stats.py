@@ -0,0 +1,132 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from network.models import TaskLog, TaskStat, TaskTotal
+from network import stats
+from network.stats import dashboard_stats, record_task_stats
+
+from .utils import write_logs
+
+
+def task_log(device_name, status="success", timestamp=None, task_type="show_ip"):
+    return TaskLog(
+        device_name=device_name,
+        task_type=task_type,
+        status=status,
+        timestamp=timestamp or timezone.now(),
+    )
+
+
+class TaskStatTests(TestCase):
+    def test_rows_are_created_then_added_to(self):
+        now = timezone.now()
+        yesterday = now - timedelta(days=1)
+        record_task_stats(
+            [
+                task_log("r1", timestamp=yesterday),
+                task_log("r1", "failure", now),
+                task_log("r2", timestamp=now),
+            ]
+        )
+        record_task_stats([task_log("r1", timestamp=now), task_log("r3", "failure")])
+
+        stats = {
+            (row.day, row.device_name): row
+            for row in TaskStat.objects.filter(task_type="show_ip")
+        }
+        today = timezone.localdate(now)
+        self.assertEqual(len(stats), 4)
+        row = stats[(today, "r1")]
+        self.assertEqual((row.success_count, row.failure_count), (1, 1))
+        self.assertEqual((row.last_run_at, row.last_success_at), (now, now))
+        row = stats[(timezone.localdate(yesterday), "r1")]
+        self.assertEqual((row.success_count, row.last_success_at), (1, yesterday))
+        self.assertIsNone(stats[(today, "r3")].last_success_at)
+
+        total = TaskTotal.objects.get(task_type="show_ip")
+        self.assertEqual((total.success_count, total.failure_count), (3, 2))
+
+    def test_older_rows_dont_move_last_run_back(self):
+        now = timezone.now()
+        record_task_stats([task_log("r1", timestamp=now)])
+        record_task_stats([task_log("r1", "failure", now - timedelta(minutes=5))])
+        row = TaskStat.objects.get()
+        self.assertEqual((row.last_run_at, row.last_success_at), (now, now))
+
+    def test_skipped_rows_are_not_failures(self):
+        now = timezone.now()
+        record_task_stats([task_log("r1", timestamp=now)])
+        later = now + timedelta(minutes=5)
+        record_task_stats([task_log("r1", "skipped", later), task_log("r2", "skipped")])
+        row = TaskStat.objects.get(device_name="r1")
+        self.assertEqual(
+            (row.success_count, row.failure_count, row.skipped_count), (1, 0, 1)
+        )
+        # Nothing was run
+        self.assertEqual(row.last_run_at, now)
+        self.assertIsNone(TaskStat.objects.get(device_name="r2").last_run_at)
+        total = TaskTotal.objects.get()
+        self.assertEqual(
+            (total.failure_count, total.skipped_count, total.last_run_at), (0, 2, now)
+        )
+
+    def test_queries_dont_grow_with_the_number_of_devices(self):
+        logs = [task_log(f"r{n}") for n in range(1000)]
+        with CaptureQueriesContext(connection) as created:
+            record_task_stats(logs)
+        with CaptureQueriesContext(connection) as updated:
+            record_task_stats(logs)
+        self.assertLess(len(created), 20)
+        self.assertLess(len(updated), 20)
+        self.assertEqual(
+            set(TaskStat.objects.values_list("success_count", flat=True)), {2}
+        )
+        self.assertEqual(TaskTotal.objects.get().success_count, 2000)
+
+    def test_rows_inserted_meanwhile_are_added_to(self):
+        record_task_stats([task_log("r1")])
+        read = stats._existing_stats
+        calls = []
+
+        def missed_the_insert(keys):
+            # The first read runs before another writer inserts r1's row
+            calls.append(keys)
+            return {} if len(calls) == 1 else read(keys)
+
+        with mock.patch.object(stats, "_existing_stats", missed_the_insert):
+            record_task_stats([task_log("r1"), task_log("r2")])
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(
+            dict(TaskStat.objects.values_list("device_name", "success_count")),
+            {"r1": 2, "r2": 1},
+        )
+
+
+class DashboardTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create(username="ops"))
+
+    def test_dashboard_reads_the_rollup(self):
+        write_logs("show_ip", [("r1", "up"), ("r2", "up"), ("r3", "up")])
+        record_task_stats([task_log("r1", "failure")])
+        TaskLog.objects.all().delete()  # totals outlive purged rows
+        response = self.client.get("/dashboard/")
+        self.assertEqual(response.context["task_success_rate"], 75.0)
+        self.assertEqual(response.context["task_failure_rate"], 25.0)
+
+    def test_skipped_rows_leave_the_rates_alone(self):
+        record_task_stats([task_log("r1"), task_log("r2", "skipped")])
+        self.assertEqual(dashboard_stats()["skipped"], 1)
+        response = self.client.get("/dashboard/")
+        self.assertEqual(response.context["task_success_rate"], 100.0)
+
+    def test_last_backup(self):
+        now = timezone.now()
+        record_task_stats([task_log("r1", task_type="backup_config", timestamp=now)])
+        self.assertEqual(dashboard_stats()["last_backup"], now)
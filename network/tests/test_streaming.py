@@ -0,0 +1,134 @@
+import json
+import uuid
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from network.jobs import enqueue_job, job_progress
+from network.models import Job, TaskLog
+from network.streaming import job_events, sse_event
+
+from .utils import write_logs
+
+
+def parse_events(messages):
+    events = []
+    for message in messages:
+        fields = dict(
+            line.split(": ", 1) for line in message.strip().splitlines() if ": " in line
+        )
+        if "event" in fields:
+            events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+@async_to_sync
+async def collect(job, last_id=0):
+    return [message async for message in job_events(job, last_id, poll_interval=0)]
+
+
+class JobStatusTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="ops")
+        self.client.force_login(self.user)
+        self.job = enqueue_job("show_ip", ["r1", "r2", "r3"], user=self.user)
+        write_logs(
+            "show_ip", [("r1", "one"), ("r2", "two")], user=self.user, job=self.job
+        )
+
+    def test_only_results_after_since_are_returned(self):
+        status = self.client.get(f"/jobs/{self.job.pk}/status/").json()
+        self.assertEqual((status["completed"], status["total"]), (2, 3))
+        self.assertEqual([host["host"] for host in status["hosts"]], ["r1", "r2"])
+
+        write_logs("show_ip", [("r3", "three")], user=self.user, job=self.job)
+        status = self.client.get(
+            f"/jobs/{self.job.pk}/status/", {"since": status["last_id"]}
+        ).json()
+        self.assertEqual([host["host"] for host in status["hosts"]], ["r3"])
+        self.assertEqual(status["completed"], 3)
+
+    def test_results_are_paged(self):
+        status = job_progress(self.job, limit=1)
+        self.assertTrue(status["more"])
+        self.assertIsNone(status["timings"])
+        status = job_progress(self.job, since=status["last_id"], limit=1)
+        self.assertEqual([host["host"] for host in status["hosts"]], ["r2"])
+        self.assertFalse(status["more"])
+
+    def test_batch_counts_once_per_host(self):
+        batch = uuid.uuid4()
+        TaskLog.objects.bulk_create(
+            [
+                TaskLog(
+                    device_name="r3",
+                    task_type="custom_command",
+                    status=status,
+                    batch_id=batch,
+                    batch_index=index,
+                    job=self.job,
+                    user=self.user,
+                )
+                for index, status in enumerate(["success", "failure"])
+            ]
+        )
+        status = job_progress(self.job)
+        self.assertEqual(
+            (status["completed"], status["succeeded"], status["failed"]), (3, 2, 1)
+        )
+
+    def test_bad_since_and_other_users(self):
+        response = self.client.get(f"/jobs/{self.job.pk}/status/", {"since": "x"})
+        self.assertEqual(len(response.json()["hosts"]), 2)
+        self.client.force_login(User.objects.create(username="other"))
+        self.assertEqual(
+            self.client.get(f"/jobs/{self.job.pk}/status/").status_code, 404
+        )
+
+
+class JobEventTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="ops")
+        self.job = enqueue_job("show_ip", ["r1", "r2"], user=self.user)
+        self.logs = write_logs(
+            "show_ip", [("r1", "one"), ("r2", "two")], user=self.user, job=self.job
+        )
+        Job.objects.filter(pk=self.job.pk).update(status="completed")
+
+    def test_every_host_then_done(self):
+        events = parse_events(collect(self.job))
+        self.assertEqual(
+            [(event, data.get("host"), data["completed"]) for event, data in events],
+            [("host", "r1", 1), ("host", "r2", 2), ("done", None, 2)],
+        )
+        self.assertEqual(events[0][1]["output"], "one")
+        self.assertEqual(events[-1][1]["status"], "completed")
+
+    def test_resuming_after_the_last_event_id(self):
+        events = parse_events(collect(self.job, last_id=self.logs[0].pk))
+        self.assertEqual(
+            [(event, data.get("host")) for event, data in events],
+            [("host", "r2"), ("done", None)],
+        )
+        self.assertEqual(events[0][1]["completed"], 2)
+
+    def test_sse_event_format(self):
+        self.assertEqual(
+            sse_event("host", {"host": "r1"}, 7),
+            'id: 7\nevent: host\ndata: {"host": "r1"}\n\n',
+        )
+
+    async def test_stream_view(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(f"/jobs/{self.job.pk}/stream/")
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        messages = [message.decode() async for message in response.streaming_content]
+        self.assertEqual(
+            [event for event, _ in parse_events(messages)], ["host", "host", "done"]
+        )
+
+    def test_stream_view_under_wsgi_falls_back_to_polling(self):
+        self.client.force_login(self.user)
+        response = self.client.get(f"/jobs/{self.job.pk}/stream/")
+        self.assertEqual(response.status_code, 204)
@@ -0,0 +1,48 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from network.models import WorkerStats
+from network.worker_stats import (
+    STALE_AFTER,
+    remove_worker_stats,
+    report_worker_stats,
+)
+
+
+class WorkerStatsTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create(username="ops"))
+
+    def test_report_and_remove(self):
+        report_worker_stats("a:1", "job")
+        row = WorkerStats.objects.get()
+        self.assertEqual(row.role, "job")
+        self.assertIn("in_use", row.stats["connection_pool"])
+        remove_worker_stats("a:1")
+        self.assertFalse(WorkerStats.objects.exists())
+
+    def test_nornir_stats_adds_up_live_workers(self):
+        now = timezone.now()
+        pool = {"hits": 3, "misses": 1}
+        for worker, updated_at in (
+            ("a:1", now),
+            ("b:2", now),
+            ("c:3", now - timedelta(seconds=STALE_AFTER + 1)),
+        ):
+            WorkerStats.objects.create(
+                worker=worker,
+                role="job",
+                updated_at=updated_at,
+                stats={"connection_pool": pool, "result_cache": pool},
+            )
+        stats = self.client.get("/nornir/stats/").json()
+        self.assertEqual(
+            [worker["stale"] for worker in stats["workers"]], [False, False, True]
+        )
+        self.assertEqual(
+            stats["totals"]["result_cache"], {"hits": 6, "misses": 2, "hit_rate": 0.75}
+        )
+        self.assertIn("web", stats)
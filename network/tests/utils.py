@@ -0,0 +1,86 @@
+import asyncio
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+import yaml
+from django.conf import settings
+from django.core.cache import cache
+
+from core.fake_ssh import FakeDevice, fake_inventory, serve_fake_devices
+from core.nornir_init import init_nornir, invalidate_nornir_cache
+from network.choices import invalidate_filter_choices
+from network.device_selectors import _index_cache
+from network.results import TaskLogSink
+
+FAKE_BASE_PORT = 21022  # apart from run_fake_devices and run_benchmarks
+
+
+def host_result(output, failed=False):
+    """Stand-in for the Nornir MultiResult of one host."""
+    return SimpleNamespace(failed=failed, result=output, exception=None)
+
+
+def write_logs(task_type, outputs, user=None, **kwargs):
+    """Log ``{host: output}`` through a TaskLogSink and return the TaskLogs."""
+    with TaskLogSink(task_type, user=user, flush_interval=3600, **kwargs) as sink:
+        return [sink.add(host, host_result(output)) for host, output in outputs]
+
+
+def reset_caches():
+    """Forget process-wide caches keyed on rows the test rollbacks reuse."""
+    cache.clear()
+    invalidate_filter_choices()
+    invalidate_nornir_cache()
+    _index_cache.update(key=None, index=None)
+
+
+class FakeDevices:
+    """Serve ``count`` fake IOS devices from a background event loop.
+
+    Used as a context manager; ``hosts`` holds their SimpleInventory hosts
+    and ``write_inventory`` stores them in a hosts file for init_nornir.
+    """
+
+    def __init__(self, count, base_port=FAKE_BASE_PORT, **options):
+        self.devices = [FakeDevice(f"r{n}", **options) for n in range(count)]
+        self.base_port = base_port
+        self.hosts = fake_inventory(self.devices, base_port=base_port)
+
+    def __enter__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.servers = asyncio.run_coroutine_threadsafe(
+            serve_fake_devices(self.devices, base_port=self.base_port), self.loop
+        ).result()
+        return self
+
+    async def _stop(self):
+        for server in self.servers:
+            server.close()
+            await server.wait_closed()
+        # Sessions still open end with the farm
+        sessions = asyncio.all_tasks() - {asyncio.current_task()}
+        for session in sessions:
+            session.cancel()
+        await asyncio.gather(*sessions, return_exceptions=True)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        asyncio.run_coroutine_threadsafe(self._stop(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+    def write_inventory(self, directory):
+        path = Path(directory) / "hosts.yaml"
+        path.write_text(yaml.safe_dump(self.hosts))
+        return path
+
+
+def fake_nornir(devices, directory):
+    """Return a Nornir over the fake ``devices`` with the project's groups."""
+    return init_nornir(
+        host_file=devices.write_inventory(directory),
+        group_file=settings.BASE_DIR / "groups.yaml",
+    )
@@ -7,11 +7,41 @@ urlpatterns = [
     path(
         "network-task/", views.task_view, name="network_task"
     ),  # Network configuration task
+    path("jobs/<int:job_id>/", views.job_detail, name="job_detail"),  # Job progress
+    path(
+        "jobs/<int:job_id>/status/", views.job_status, name="job_status"
+    ),  # Job progress as JSON
+    path(
+        "jobs/<int:job_id>/stream/", views.job_stream, name="job_stream"
+    ),  # Per-host results as Server-Sent Events
+    path(
+        "nornir/stats/", views.nornir_stats, name="nornir_stats"
+    ),  # Nornir cache and connection pool counters
+    path("metrics", views.metrics_view, name="metrics"),  # Prometheus metrics
     path(
         "execution-logs/", views.execution_logs, name="execution_logs"
     ),  # Task execution logs
+    path(
+        "execution-logs/export/", views.export_logs, name="export_logs"
+    ),  # Filtered logs as a CSV or NDJSON download
+    path(
+        "execution-logs/<int:log_id>/", views.tasklog_detail, name="tasklog_detail"
+    ),  # Single log with its output
+    path(
+        "configs/<str:device_name>/", views.config_history, name="config_history"
+    ),  # Config versions of a device
+    path(
+        "configs/<str:device_name>/<int:version>/",
+        views.config_version,
+        name="config_version",
+    ),  # One config version with its diff
+    path("schedule/", views.schedule_view, name="schedule"),  # Polling schedule
+    path("search/", views.search_view, name="search"),  # Full-text search
     path("dashboard/", views.dashboard_view, name="dashboard"),  # Network dashboard
     path("devices/", views.device_list_view, name="device_list"),  # Device list page
+    path(
+        "devices/select/", views.device_select, name="device_select"
+    ),  # Selector autocomplete and preview
     path(
         "devices/<int:device_id>/edit/", views.edit_device, name="edit_device"
     ),  # Edit device
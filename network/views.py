@@ -1,17 +1,40 @@
+import difflib
 import logging
+import time
 
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
-from datetime import timedelta
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from nornir.core.filter import F
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
 
-from core.nornir_init import init_nornir
-from core.tasks import save_config, show_ip, run_custom_command
+from core.nornir_init import invalidate_inventory
 
+from .configs import reconstruct_config
+from .exports import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, aiterate, export_lines
 from .forms import DeviceForm, TaskForm, TaskLogFilterForm
-from .models import NetworkDevice, TaskLog
+from .jobs import enqueue_job, job_progress
+from .metrics import render_metrics
+from .device_selectors import SelectorError, resolve_selector, suggest
+from .models import (
+    ConfigVersion,
+    DeviceSelector,
+    Job,
+    NetworkDevice,
+    ScheduleEntry,
+    TaskLog,
+)
+from .pagination import KeysetPaginator
+from .scheduler import schedule_summary
+from .search import search, search_backend
+from .stats import dashboard_stats
+from .streaming import job_events
+from .worker_stats import process_stats, worker_stats_summary
 
 logger = logging.getLogger(__name__)
 
@@ -21,120 +44,319 @@ def home_view(request):
     return render(request, "home.html", {"request": request})
 
 
-TASK_MAP = {
-    "show_ip": show_ip,
-    "save_config": save_config,
-    "custom_command": run_custom_command,
-}
-
-
-def process_task_result(result, task_type, user, custom_command=None):
-    """Helper function to process task results and create logs."""
-    execution_output = {}
-
-    for host, task_result in result.items():
-        output = (
-            task_result.result if not task_result.failed else str(task_result.exception)
-        )
-        status = "failure" if task_result.failed else "success"
-        execution_output[host] = {"output": output, "status": status}
-
-        TaskLog.objects.create(
-            device_name=host,
-            task_type=task_type,
-            output=output,
-            status=status,
-            user=user,
-            custom_command=custom_command if task_type == "custom_command" else None,
-        )
-
-        if task_result.failed:
-            logger.error(f"Task {task_type} failed on {host}: {task_result.exception}")
-        else:
-            logger.info(f"Task {task_type} successful on {host}")
-
-    return execution_output
-
-
 @login_required
 def task_view(request):
-    nr = init_nornir()
-    device_choices = [(h, h) for h in nr.inventory.hosts.keys()]
-    execution_output = None
     error_message = None
 
     if request.method == "POST":
-        form = TaskForm(request.POST, device_choices=device_choices)
+        form = TaskForm(request.POST)
         if form.is_valid():
             task_type = form.cleaned_data["task_type"]
             selected_devices = form.cleaned_data["devices"]
+            if form.cleaned_data["save_as"]:
+                DeviceSelector.objects.create(
+                    name=form.cleaned_data["save_as"],
+                    query=form.cleaned_data["selector"],
+                    user=request.user,
+                )
             custom_command = form.cleaned_data.get("custom_command")
-            task_func = TASK_MAP[task_type]
+            num_workers = form.cleaned_data.get("num_workers")
 
             try:
-                subset = (
-                    nr.filter(F(name__in=selected_devices)) if selected_devices else nr
-                )
-                if task_type == "custom_command":
-                    result = subset.run(task=task_func, command=custom_command)
-                else:
-                    result = subset.run(task=task_func)
-                execution_output = process_task_result(
-                    result, task_type, request.user, custom_command
+                job = enqueue_job(
+                    task_type,
+                    selected_devices,
+                    request.user,
+                    custom_command,
+                    num_workers=num_workers,
+                    parse=form.cleaned_data.get("parse", False),
+                    use_cache=not form.cleaned_data.get("bypass_cache", False),
+                    stop_on_error=form.cleaned_data.get("stop_on_error", False),
                 )
             except Exception as e:
                 error_message = str(e)
-                logger.exception(f"Error executing task {task_type}: {e}")
+                logger.exception(f"Error queueing task {task_type}: {e}")
+            else:
+                if "application/json" in request.headers.get("Accept", ""):
+                    return JsonResponse(
+                        {
+                            "job_id": job.pk,
+                            "status": job.status,
+                            "status_url": reverse("job_status", args=[job.pk]),
+                        },
+                        status=202,
+                    )
+                return redirect("job_detail", job_id=job.pk)
     else:
-        form = TaskForm(device_choices=device_choices)
+        form = TaskForm(initial={"selector": request.GET.get("selector", "")})
 
     return render(
         request,
         "task_form.html",
         {
             "form": form,
-            "execution_output": execution_output,
             "error_message": error_message,
         },
     )
 
 
+@login_required
+def job_detail(request, job_id):
+    """Show a queued job and poll its per-host progress."""
+    job = get_object_or_404(Job, id=job_id, user=request.user)
+    return render(request, "job_detail.html", {"job": job})
+
+
+@login_required
+def job_status(request, job_id):
+    """Return the job's progress and the host results after ``?since=<id>``."""
+    job = get_object_or_404(Job, id=job_id, user=request.user)
+    try:
+        since = int(request.GET.get("since", 0))
+    except ValueError:
+        since = 0
+    return JsonResponse(job_progress(job, since=since))
+
+
+@login_required
+async def job_stream(request, job_id):
+    """Stream each host's result as Server-Sent Events while the job runs."""
+    user = await request.auser()
+    job = await Job.objects.filter(id=job_id, user=user).afirst()
+    if job is None:
+        raise Http404("No Job matches the given query.")
+
+    if not isinstance(request, ASGIRequest):
+        # A WSGI worker would buffer the whole stream; 204 tells EventSource
+        # to stop so the page falls back to polling job_status.
+        return HttpResponse(status=204)
+
+    try:
+        last_id = int(request.headers.get("Last-Event-ID", 0))
+    except ValueError:
+        last_id = 0
+
+    response = StreamingHttpResponse(
+        job_events(job, last_id=last_id), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+def metrics_view(request):
+    """Expose task timing histograms and counters in the Prometheus format.
+
+    Scrapers authenticate with ``Authorization: Bearer <METRICS_TOKEN>``;
+    logged-in users can open the page too.
+    """
+    token = getattr(settings, "METRICS_TOKEN", None)
+    bearer = request.headers.get("Authorization", "").removeprefix("Bearer ")
+    if not request.user.is_authenticated and not (
+        token and constant_time_compare(bearer, token)
+    ):
+        return HttpResponse("Authentication required\n", status=401)
+    return HttpResponse(
+        render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@login_required
+def nornir_stats(request):
+    """Return the Nornir, connection pool and result cache counters.
+
+    Tasks run in the job workers and the polling daemon, which report their
+    counters to the database; "web" is only this web server process.
+    """
+    return JsonResponse({**worker_stats_summary(), "web": process_stats()})
+
+
+def pagination_querystring(request):
+    """Return the current query string without the pagination cursor."""
+    params = request.GET.copy()
+    params.pop("cursor", None)
+    return params.urlencode()
+
+
 @login_required
 def execution_logs(request):
     tasklogs_list = TaskLog.objects.filter(user=request.user)
     form = TaskLogFilterForm(request.GET or None)
 
     if form.is_valid():
-        device_name = form.cleaned_data.get("device_name")
-        task_type = form.cleaned_data.get("task_type")
-        status = form.cleaned_data.get("status")
-        start_date = form.cleaned_data.get("start_date")
-        end_date = form.cleaned_data.get("end_date")
-
-        if device_name:
-            tasklogs_list = tasklogs_list.filter(device_name=device_name)
-        if task_type:
-            tasklogs_list = tasklogs_list.filter(task_type=task_type)
-        if status:
-            tasklogs_list = tasklogs_list.filter(status=status)
-        if start_date:
-            tasklogs_list = tasklogs_list.filter(timestamp__gte=start_date)
-        if end_date:
-            # Add one day to the end_date to include the entire day
-            tasklogs_list = tasklogs_list.filter(
-                timestamp__lt=end_date + timedelta(days=1)
+        tasklogs_list = form.filter_queryset(tasklogs_list)
+
+    paginator = KeysetPaginator(
+        tasklogs_list,
+        ordering=("-timestamp", "-id"),
+        per_page=10,
+        with_count=bool(request.GET.get("count")),
+    )
+    tasklogs = paginator.get_page(request.GET.get("cursor"))
+
+    return render(
+        request,
+        "execution_logs.html",
+        {
+            "tasklogs": tasklogs,
+            "page_obj": tasklogs,
+            "form": form,
+            "querystring": pagination_querystring(request),
+        },
+    )
+
+
+@login_required
+def export_logs(request):
+    """Stream the filtered execution logs as a CSV or NDJSON download."""
+    fmt = request.GET.get("format", "csv")
+    if fmt not in EXPORT_FORMATS:
+        return HttpResponse(f"Unknown export format {fmt!r}\n", status=400)
+    form = TaskLogFilterForm(request.GET)
+    if not form.is_valid():
+        # Exporting everything instead would hide the typo in a huge file
+        return HttpResponse(f"Invalid filters: {form.errors.as_text()}\n", status=400)
+
+    logs = form.filter_queryset(TaskLog.objects.filter(user=request.user))
+    lines = export_lines(
+        logs.order_by("-timestamp", "-id"),
+        fmt,
+        getattr(settings, "TASKLOG_EXPORT_CHUNK_SIZE", EXPORT_CHUNK_SIZE),
+    )
+    content_type, extension = EXPORT_FORMATS[fmt]
+    response = StreamingHttpResponse(
+        aiterate(lines) if isinstance(request, ASGIRequest) else lines,
+        content_type=content_type,
+    )
+    filename = f"tasklogs-{timezone.localtime():%Y%m%d-%H%M%S}.{extension}"
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@login_required
+def tasklog_detail(request, log_id):
+    """Show a single TaskLog with its full command output."""
+    log = get_object_or_404(
+        TaskLog.objects.select_related("output_blob", "parsed"),
+        id=log_id,
+        user=request.user,
+    )
+    parsed = getattr(log, "parsed", None)
+    columns = list(parsed.rows[0]) if parsed and parsed.rows else []
+    rows = (
+        [[row.get(column) for column in columns] for row in parsed.rows]
+        if columns
+        else []
+    )
+    # The other commands run with this one in the same batch
+    batch = (
+        TaskLog.objects.filter(batch_id=log.batch_id, user=request.user)
+        .only("id", "custom_command", "status", "duration", "batch_index")
+        .order_by("batch_index")
+        if log.batch_id
+        else []
+    )
+    return render(
+        request,
+        "tasklog_detail.html",
+        {
+            "log": log,
+            "parsed": parsed,
+            "columns": columns,
+            "rows": rows,
+            "batch": batch,
+        },
+    )
+
+
+@login_required
+def config_history(request, device_name):
+    """List the stored config versions of a device, newest first."""
+    versions = ConfigVersion.objects.filter(device_name=device_name).defer("data")
+    paginator = KeysetPaginator(versions, ordering=("-version",), per_page=20)
+    page = paginator.get_page(request.GET.get("cursor"))
+    if not page.object_list and not request.GET.get("cursor"):
+        raise Http404("No config versions for this device.")
+    return render(
+        request,
+        "config_history.html",
+        {
+            "device_name": device_name,
+            "versions": page,
+            "page_obj": page,
+            "querystring": pagination_querystring(request),
+        },
+    )
+
+
+@login_required
+def config_version(request, device_name, version):
+    """Show one config version and its diff against the previous version."""
+    config = get_object_or_404(
+        ConfigVersion.objects.defer("data"), device_name=device_name, version=version
+    )
+    text = reconstruct_config(device_name, version)
+    diff = None
+    if version > 1:
+        previous = reconstruct_config(device_name, version - 1)
+        diff = "\n".join(
+            difflib.unified_diff(
+                previous.split("\n"),
+                text.split("\n"),
+                f"version {version - 1}",
+                f"version {version}",
+                lineterm="",
             )
+        )
+    return render(
+        request,
+        "config_version.html",
+        {"config": config, "text": text, "diff": diff},
+    )
 
-    tasklogs_list = tasklogs_list.order_by("-timestamp")
 
-    paginator = Paginator(tasklogs_list, 10)
-    page_number = request.GET.get("page")
-    tasklogs = paginator.get_page(page_number)
+@login_required
+def search_view(request):
+    """Full-text search over task output, custom commands and latest configs."""
+    query = request.GET.get("q", "").strip()
+    results = []
+    elapsed = None
+    if query:
+        start = time.perf_counter()
+        results = search(request.user, query)
+        elapsed = (time.perf_counter() - start) * 1000
+    return render(
+        request,
+        "search.html",
+        {
+            "query": query,
+            "results": results,
+            "elapsed": elapsed,
+            "available": search_backend() is not None,
+        },
+    )
+
 
+@login_required
+def schedule_view(request):
+    """Polling daemon schedule: per-task lag summary and the next devices due."""
+    entries = ScheduleEntry.objects.all()
+    task_type = request.GET.get("task_type")
+    if task_type:
+        entries = entries.filter(task_type=task_type)
+    paginator = KeysetPaginator(entries, ordering=("next_run_at", "id"), per_page=50)
+    page = paginator.get_page(request.GET.get("cursor"))
     return render(
         request,
-        "execution_logs.html",
-        {"tasklogs": tasklogs, "page_obj": tasklogs, "form": form},
+        "schedule.html",
+        {
+            "summary": schedule_summary(),
+            "entries": page,
+            "page_obj": page,
+            "task_type": task_type,
+            "querystring": pagination_querystring(request),
+        },
     )
 
 
@@ -144,30 +366,23 @@ def dashboard_view(request):
     Display the network automation dashboard with device status and recent tasks.
     """
     # Get base data
-    # Get base data
     devices = NetworkDevice.objects.all().order_by("name")
     recent_tasks = TaskLog.objects.all().order_by("-timestamp")[:10]
 
     # Calculate device count
     device_count = devices.count()
 
-    # Calculate task success rate and failure rate
-    total_tasks = TaskLog.objects.count()
+    # Task totals and last backup come from the TaskTotal rollup, not the raw log
+    stats = dashboard_stats()
+    total_tasks = stats["success"] + stats["failure"]
     if total_tasks > 0:
-        successful_tasks = TaskLog.objects.filter(status="success").count()
-        task_success_rate = round((successful_tasks / total_tasks) * 100, 1)
+        task_success_rate = round((stats["success"] / total_tasks) * 100, 1)
         task_failure_rate = round(100 - task_success_rate, 1)
     else:
         task_success_rate = 0
         task_failure_rate = 0
 
-    # Get last backup time
-    last_backup = (
-        TaskLog.objects.filter(task_type="save_config", status="success")
-        .order_by("-timestamp")
-        .first()
-    )
-    last_backup_time = last_backup.timestamp if last_backup else "N/A"
+    last_backup_time = stats["last_backup"] or "N/A"
 
     context = {
         "devices": devices,
@@ -184,22 +399,49 @@ def dashboard_view(request):
 @login_required
 def device_list_view(request):
     """Display a list of network devices."""
-    devices = NetworkDevice.objects.all().order_by("hostname")
-    paginator = Paginator(devices, 10)
-    page_number = request.GET.get("page")
-    device_list = paginator.get_page(page_number)
+    paginator = KeysetPaginator(
+        NetworkDevice.objects.all(),
+        ordering=("hostname", "id"),
+        per_page=10,
+        with_count=bool(request.GET.get("count")),
+    )
+    device_list = paginator.get_page(request.GET.get("cursor"))
     return render(
-        request, "device_list.html", {"devices": device_list, "page_obj": device_list}
+        request,
+        "device_list.html",
+        {
+            "devices": device_list,
+            "page_obj": device_list,
+            "querystring": pagination_querystring(request),
+        },
     )
 
 
+@login_required
+def device_select(request):
+    """Autocomplete and preview for the device selector widget."""
+    query = request.GET.get("q", "")
+    response = {"suggestions": suggest(query), "count": 0, "devices": []}
+    if query.strip():
+        try:
+            devices = sorted(resolve_selector(query))
+        except SelectorError as e:
+            response["error"] = str(e)
+        else:
+            response["count"] = len(devices)
+            response["devices"] = devices[:20]
+    return JsonResponse(response)
+
+
 @login_required
 def edit_device(request, device_id):
     device = get_object_or_404(NetworkDevice, id=device_id)
     if request.method == "POST":
         form = DeviceForm(request.POST, instance=device)
         if form.is_valid():
-            form.save()
+            with transaction.atomic():
+                form.save()
+                invalidate_inventory()
             messages.success(request, f"Device {device.hostname} updated successfully")
             return redirect("device_list")
     else:
@@ -212,6 +454,8 @@ def delete_device(request, device_id):
     device = get_object_or_404(NetworkDevice, id=device_id)
     if request.method == "POST":
         hostname = device.hostname
-        device.delete()
+        with transaction.atomic():
+            device.delete()
+            invalidate_inventory()
         messages.success(request, f"Device {hostname} deleted successfully")
     return redirect("device_list")
@@ -0,0 +1,81 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from core.connection_pool import get_connection_pool
+from core.nornir_init import nornir_cache_info
+from core.result_cache import get_result_cache
+
+from .models import WorkerStats
+
+REPORT_INTERVAL = 60  # seconds between reports of an idle worker
+STALE_AFTER = REPORT_INTERVAL * 3  # a worker silent this long is left out
+
+
+def process_stats():
+    """Return the Nornir cache, connection pool and result cache counters."""
+    cache = get_result_cache()
+    return {
+        "nornir_cache": nornir_cache_info(),
+        "connection_pool": get_connection_pool().stats(),
+        "result_cache": cache.stats() if cache else None,
+    }
+
+
+def report_worker_stats(worker, role):
+    """Store this process's counters under ``worker`` for /nornir/stats/."""
+    WorkerStats.objects.update_or_create(
+        worker=worker,
+        defaults={"role": role, "stats": process_stats(), "updated_at": timezone.now()},
+    )
+
+
+def remove_worker_stats(worker):
+    """Drop the row of a worker that is shutting down."""
+    WorkerStats.objects.filter(worker=worker).delete()
+
+
+def _add_counters(total, counters):
+    for name, value in counters.items():
+        if isinstance(value, (int, float)) and name != "hit_rate":
+            total[name] = total.get(name, 0) + value
+
+
+def _with_hit_rate(counters):
+    requests = counters.get("hits", 0) + counters.get("misses", 0)
+    counters["hit_rate"] = round(counters["hits"] / requests, 3) if requests else 0.0
+    return counters
+
+
+def worker_stats_summary(now=None):
+    """Return every worker's last report and the counters added up.
+
+    Workers that haven't reported for STALE_AFTER seconds are listed as
+    stale and left out of the totals; they have probably exited.
+    """
+    now = now or timezone.now()
+    cutoff = now - timedelta(seconds=STALE_AFTER)
+    workers = []
+    totals = {"connection_pool": {}, "result_cache": {}}
+    for row in WorkerStats.objects.order_by("role", "worker"):
+        stale = row.updated_at < cutoff
+        workers.append(
+            {
+                "worker": row.worker,
+                "role": row.role,
+                "updated_at": row.updated_at.isoformat(),
+                "stale": stale,
+                **row.stats,
+            }
+        )
+        if stale:
+            continue
+        for section, total in totals.items():
+            _add_counters(total, row.stats.get(section) or {})
+    return {
+        "workers": workers,
+        "totals": {
+            section: _with_hit_rate(total) if total else None
+            for section, total in totals.items()
+        },
+    }
@@ -129,6 +129,113 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 LOGOUT_REDIRECT_URL = "/"
 
+# Netmiko connection pool shared by tasks within a process. Each host's session
+# goes back to the pool as soon as its task finishes.
+NETMIKO_POOL = {
+    "enabled": True,
+    "max_size": 200,  # idle sessions kept open
+    "max_in_use": 500,  # sessions checked out at once; more wait for one
+    "checkout_timeout": 300,  # seconds to wait before failing the host
+    "idle_timeout": 300,  # seconds, keep below the devices' exec-timeout
+    "health_check": True,  # probe the prompt before reusing a session
+}
+
+# Nornir inventory. "DjangoInventory" builds hosts from NetworkDevice rows
+# (kept in step with hosts.yaml by sync_devices) and loads only the devices a
+# job selects; "SimpleInventory" reads host_file. Groups always come from
+# group_file. "defaults" applies to every host, e.g. {"platform": "ios"}.
+NORNIR_INVENTORY = {
+    "plugin": "DjangoInventory",
+    "host_file": BASE_DIR / "hosts.yaml",
+    "group_file": BASE_DIR / "groups.yaml",
+    "defaults": {},
+}
+
+# Nornir runner. "threaded" runs num_workers hosts at a time; "adaptive"
+# starts at initial_workers and grows or backs off between min_workers and
+# num_workers from observed per-host latency and failure rate; "asyncio" runs
+# up to async_workers sessions on one event loop (requires asyncssh).
+NORNIR_RUNNER = {
+    "plugin": "threaded",
+    "num_workers": 50,
+    "async_workers": 1000,
+    "min_workers": 2,
+    "initial_workers": 10,
+    "target_latency": 30.0,  # seconds per host before backing off
+    "max_failure_rate": 0.2,
+    "group_limits": {},  # e.g. {"core": 4}; groups may also set data.max_sessions
+}
+
+# TaskLog rows are written in bulk, one transaction per flush
+TASKLOG_BATCH_SIZE = 500
+TASKLOG_FLUSH_INTERVAL = 2.0  # seconds between incremental flushes
+
+# Bucket upper bounds of the TaskLog timing and output size histograms served
+# at /metrics. Prometheus scrapers send "Authorization: Bearer <token>"; leave
+# the token unset to allow only logged-in users.
+METRICS_SECONDS_BUCKETS = [0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+METRICS_BYTES_BUCKETS = [256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304]
+METRICS_TOKEN = None
+
+# Config backups store a full snapshot every N versions, deltas in between
+CONFIG_SNAPSHOT_INTERVAL = 20
+
+# Processes that parse show output with ntc-templates; 0 parses inline
+TEXTFSM_PARSE_WORKERS = 2
+
+# Polling daemon (run_nornir_tasks --daemon): seconds between runs of each
+# task, optionally overridden per inventory group, e.g. {"core": 60}. Every
+# device gets a fixed offset inside its interval so polls are spread out.
+POLL_SCHEDULE = {
+    "show_ip": {"interval": 300, "groups": {}},
+    "backup_config": {"interval": 86400, "groups": {}},
+}
+POLL_TICK = 1.0  # seconds between checks for due devices
+POLL_MAX_BATCHES = 8  # task batches running at once
+
+# Per-process cache of read-only command output keyed by (device, command).
+# Identical requests within the TTL reuse the output, concurrent ones in the
+# same process share a single execution, and any other command drops the
+# device's entries in every process from its next run on.
+RESULT_CACHE = {
+    "enabled": True,
+    "ttl": 30,  # seconds
+    "max_entries": 10000,  # least recently used entries are evicted first
+    "read_only": [r"^show\s", r"^sh\s"],  # regexes of cacheable commands
+}
+
+# Reachability preflight before every run: each device's SSH port is probed
+# in parallel and devices that don't answer are logged as skipped at once
+# instead of holding a runner worker until the connection times out. After
+# failure_threshold failed probes in a row a device is skipped without a
+# probe for "backoff" seconds, doubled after every further failure up to
+# max_backoff, and then probed again.
+PREFLIGHT = {
+    "enabled": True,
+    "timeout": 1.0,  # seconds to wait for the TCP handshake
+    "concurrency": 500,  # probes in flight at once
+    "failure_threshold": 3,
+    "backoff": 60,  # seconds
+    "max_backoff": 3600,  # seconds
+}
+
+# Cached execution-log filter choices. Every read checks the newest
+# TaskLogChoice id, so values logged by any process show up at once.
+TASKLOG_CHOICES_CACHE_TIMEOUT = 300
+
+# Days TaskLog rows are kept, per task type, before purge_task_logs archives
+# them to TASKLOG_ARCHIVE_DIR and deletes them. "default" covers the other
+# task types; None keeps rows forever. Dashboard totals and /metrics come from
+# rollups and are not affected by a purge.
+TASKLOG_RETENTION_DAYS = {
+    "default": 90,
+    "show_ip": 30,
+    "backup_config": 365,
+}
+TASKLOG_ARCHIVE_DIR = BASE_DIR / "archive"
+TASKLOG_PURGE_BATCH_SIZE = 500  # rows archived and deleted per transaction
+TASKLOG_EXPORT_CHUNK_SIZE = 2000  # rows read per query by the CSV/NDJSON export
+
 # Logging Configuration
 LOGGING = {
     "version": 1,